@@ -0,0 +1,103 @@
+import calendar
+import datetime as dt
+import logging
+from typing import Callable, Generic, Iterable, Iterator, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# any leap year will do: it maps every (month, day) pair,
+# including February 29, to an ordinal day of year
+_LEAP_YEAR = 2000
+DAYS_IN_INDEX = 366
+FEB_28 = dt.date(_LEAP_YEAR, 2, 28).timetuple().tm_yday - 1
+FEB_29 = FEB_28 + 1
+
+
+def recurring_date(month: int, day: int) -> dt.date:
+    """
+    Return the (month, day) date in a leap year, which keeps
+    February 29 for dates where the year does not matter.
+    Raise ValueError (or TypeError) for a non-existing date.
+    """
+    return dt.date(_LEAP_YEAR, month, day)
+
+
+def day_of_year(month: int, day: int) -> int:
+    """
+    Return zero-based ordinal of the (month, day) pair in a leap year,
+    i.e. a number in range 0..365 which is the same for every year.
+    Raise ValueError (or TypeError) for a non-existing date.
+    """
+    return recurring_date(month, day).timetuple().tm_yday - 1
+
+
+class BirthdayIndex(Generic[T]):
+    """
+    In-memory index of yearly recurring dates (e.g. birthdays).
+    Items are put into 366 buckets by ordinal day of year, so items
+    for any given date are read from a single bucket in constant time.
+    `key` returns `(month, day)` pair of an item, or `ordinal`
+    returns its day of year if items have it precomputed;
+    items with a non-existing date are skipped.
+
+    Items born on February 29 are celebrated on February 28
+    in non-leap years.
+    """
+
+    def __init__(
+        self,
+        items: Iterable[T],
+        key: Callable[[T], tuple[int, int]] = None,
+        ordinal: Callable[[T], int] = None,
+    ) -> None:
+        self.buckets: list[list[T]] = [[] for _ in range(DAYS_IN_INDEX)]
+        self.skipped = 0
+        size = 0
+        for item in items:
+            try:
+                position = (
+                    ordinal(item) if ordinal else day_of_year(*key(item))
+                )
+            except (TypeError, ValueError) as e:
+                self.skipped += 1
+                logger.error(f"date conversion failure: {e}; skipped {item}")
+                continue
+            self.buckets[position].append(item)
+            size += 1
+        self.size = size
+
+    def on(self, date: dt.date) -> list[T]:
+        """Return items which fall on the given date."""
+        ordinal = date.timetuple().tm_yday - 1
+        if calendar.isleap(date.year):
+            return list(self.buckets[ordinal])
+        if ordinal >= FEB_29:
+            # non-leap year ordinals lack February 29
+            ordinal += 1
+        elif ordinal == FEB_28:
+            return self.buckets[FEB_28] + self.buckets[FEB_29]
+        return list(self.buckets[ordinal])
+
+    def upcoming(
+        self, today: dt.date, days: int
+    ) -> Iterator[tuple[dt.date, T]]:
+        """
+        Yield `(date, item)` pairs for items which fall on
+        the next `days` days after `today` (today excluded)
+        in chronological order. Windows crossing New Year are supported.
+        """
+        for delta in range(1, days + 1):
+            date = today + dt.timedelta(days=delta)
+            for item in self.on(date):
+                yield date, item
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(size={self.size}, "
+            f"skipped={self.skipped})"
+        )
@@ -1,6 +1,19 @@
+from functools import cache
+
 from aiogram import Bot, Dispatcher
 
 from . import settings
 
-bot = Bot(token=settings.BOT_TOKEN)
-dispatcher = Dispatcher(bot)
+
+@cache
+def get_dispatcher() -> Dispatcher:
+    return Dispatcher(Bot(token=settings.BOT_TOKEN))
+
+
+def __getattr__(name: str):
+    # bot is created on first use, e.g. by `find_bot("app.bot:bot")`
+    if name == "bot":
+        return get_dispatcher().bot
+    if name == "dispatcher":
+        return get_dispatcher()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,131 @@
+import hashlib
+import logging
+import pickle
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, BinaryIO
+
+from app import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def file_hash(
+    file: str | Path | BinaryIO, chunk_size: int = 1024 * 1024
+) -> str:
+    """
+    Return SHA-256 hex digest of file contents.
+    File may be passed as a path or a binary file-like object.
+    """
+    digest = hashlib.sha256()
+    if hasattr(file, "read"):
+        position = file.tell()
+        file.seek(0)
+        while chunk := file.read(chunk_size):
+            digest.update(chunk)
+        file.seek(position)
+        return digest.hexdigest()
+
+    with open(file, "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ParseCache:
+    """
+    Cache for parsed file contents keyed by the file content hash.
+    Keeps up to `maxsize` most recently used entries in memory.
+    If `cache_dir` is set, entries are also pickled to disk,
+    so they survive program restarts. Files pickled with
+    another `version` of cached values are ignored.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str | Path = None,
+        maxsize: int = 4,
+        version: int = None,
+    ):
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.maxsize = maxsize
+        self.version = version
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        # parsing may run in executor threads
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> Path:
+        if self.version is None:
+            return self.cache_dir / f"{key}.pickle"
+        return self.cache_dir / f"{key}.v{self.version}.pickle"
+
+    def get(self, key: str) -> Any | None:
+        """Return cached value for `key` or None if there is none."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                metrics.count_cache_lookup("parse", hit=True)
+                return self._entries[key]
+
+        if self.cache_dir is not None and self._path(key).is_file():
+            try:
+                with open(self._path(key), "rb") as f:
+                    value = pickle.load(f)
+            except Exception as e:
+                logger.warning(f"Corrupted parse cache file skipped: {e}")
+            else:
+                with self._lock:
+                    self._remember(key, value)
+                    self.hits += 1
+                metrics.count_cache_lookup("parse", hit=True)
+                return value
+
+        with self._lock:
+            self.misses += 1
+        metrics.count_cache_lookup("parse", hit=False)
+        return None
+
+    def set(self, key: str, value: Any) -> None:
+        """Cache `value` under `key` in memory and on disk if enabled."""
+        with self._lock:
+            self._remember(key, value)
+        if self.cache_dir is None:
+            return
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp_path = self._path(key).with_suffix(".tmp")
+            with open(tmp_path, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            tmp_path.replace(self._path(key))
+        except OSError as e:
+            logger.warning(f"Parse cache could not be saved to disk: {e}")
+
+    def _remember(self, key: str, value: Any) -> None:
+        # caller holds `_lock`
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop all in-memory entries and reset statistics."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(size={len(self)}, "
+            f"hits={self.hits}, misses={self.misses})"
+        )
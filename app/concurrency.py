@@ -0,0 +1,194 @@
+import asyncio
+import logging
+from collections import deque
+from concurrent.futures import (
+    Executor,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from functools import partial
+from typing import Any, Awaitable, Callable, Hashable, Iterable
+
+from app import settings
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls with the same key into one.
+    While a call for a key is in flight, other callers with the same key
+    do not start a new one, but wait for its result (or exception).
+    Counts `calls` actually made and `coalesced` calls that shared
+    the result of an in-flight one.
+    """
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.coalesced = 0
+        self._in_flight: dict[Hashable, asyncio.Future] = {}
+
+    async def do(
+        self,
+        key: Hashable,
+        func: Callable[..., Awaitable],
+        *args,
+        **kwargs,
+    ) -> Any:
+        """Await `func(*args, **kwargs)` or the in-flight call for `key`."""
+        future = self._in_flight.get(key)
+        if future is None:
+            self.calls += 1
+            future = asyncio.ensure_future(func(*args, **kwargs))
+            self._in_flight[key] = future
+            future.add_done_callback(lambda f: self._forget(key, f))
+        else:
+            self.coalesced += 1
+        # cancellation of one caller must not cancel the shared call
+        return await asyncio.shield(future)
+
+    def _forget(self, key: Hashable, future: asyncio.Future) -> None:
+        if self._in_flight.get(key) is future:
+            del self._in_flight[key]
+        if not future.cancelled() and future.exception() is not None:
+            logger.debug(f"Single flight call [{key}] failed")
+
+    def in_flight(self, key: Hashable) -> bool:
+        return key in self._in_flight
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(calls={self.calls}, "
+            f"coalesced={self.coalesced}, in_flight={len(self._in_flight)})"
+        )
+
+
+class Offloader:
+    """
+    Runs blocking functions in an executor, so they do not block
+    the event loop. `kind` is one of:
+        `thread` - thread pool, suits I/O and GIL-releasing work;
+        `process` - process pool, suits CPU-bound work
+                    (function and arguments must be picklable);
+        `inline` - no offloading, function is called directly.
+    Executor is created on first use.
+    """
+
+    KINDS = ("thread", "process", "inline")
+
+    def __init__(
+        self, kind: str = "thread", max_workers: int = None, name: str = ""
+    ) -> None:
+        if kind not in self.KINDS:
+            raise ValueError(
+                f"Unknown executor kind `{kind}`; expected one of {self.KINDS}"
+            )
+        self.kind = kind
+        self.max_workers = max_workers
+        self.name = name
+        self._executor = None
+
+    @property
+    def executor(self) -> Executor | None:
+        if self._executor is None and self.kind != "inline":
+            if self.kind == "thread":
+                self._executor = ThreadPoolExecutor(
+                    self.max_workers, thread_name_prefix=self.name
+                )
+            else:
+                self._executor = ProcessPoolExecutor(self.max_workers)
+        return self._executor
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """Await result of `func(*args, **kwargs)` run in the executor."""
+        if self.kind == "inline":
+            return func(*args, **kwargs)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor, partial(func, *args, **kwargs)
+        )
+
+    def shutdown(self, wait: bool = True) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}({self.name}, kind={self.kind}, "
+            f"max_workers={self.max_workers})"
+        )
+
+
+parse_offloader = Offloader(
+    settings.PARSE_EXECUTOR, settings.PARSE_EXECUTOR_WORKERS, "parse"
+)
+
+
+def percentile(samples: Iterable[float], q: float) -> float:
+    """Return `q` percentile (`q` in 0..100) of samples or 0 if empty."""
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(len(ordered) * q / 100))
+    return ordered[index]
+
+
+class LoopLagMonitor:
+    """
+    Measures event loop lag: how much later than scheduled
+    a periodic `interval` sleep wakes up. Keeps last `maxlen` samples.
+    """
+
+    def __init__(self, interval: float = 0.05, maxlen: int = 1200) -> None:
+        self.interval = interval
+        self.samples = deque(maxlen=maxlen)
+        self.max_lag = 0.0
+        self._task = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        if not self.is_running:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            started_at = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - started_at - self.interval)
+            self.samples.append(lag)
+            self.max_lag = max(self.max_lag, lag)
+
+    @property
+    def last_lag(self) -> float:
+        return self.samples[-1] if self.samples else 0.0
+
+    def percentile(self, q: float) -> float:
+        """Return lag percentile (`q` in 0..100) over kept samples."""
+        return percentile(self.samples, q)
+
+    def reset(self) -> None:
+        self.samples.clear()
+        self.max_lag = 0.0
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(p50={self.percentile(50):.4f}s, "
+            f"p99={self.percentile(99):.4f}s, max={self.max_lag:.4f}s)"
+        )
+
+
+lag_monitor = LoopLagMonitor()
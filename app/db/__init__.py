@@ -1,32 +1,153 @@
-from contextlib import contextmanager
+from contextlib import asynccontextmanager, contextmanager
+from functools import cache, partial
 
-from sqlalchemy import create_engine
+from sqlalchemy import Engine, create_engine, event, make_url
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 
 from app import settings
 
 app_db = settings.DB["app"]
 jobstore_db = settings.DB["jobstore"]
 
-db_engine = create_engine(
-    f"{app_db['engine']}:////{settings.BASE_DIR}/{app_db['name']}",
-    echo=settings.DEBUG,
-)
+
+def set_sqlite_pragmas(dbapi_connection, connection_record, pragmas: dict):
+    """Apply `pragmas` to a new SQLite connection."""
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+    finally:
+        cursor.close()
+
+
+def _sqlite_engine_options(
+    url: str, echo: bool, pool_size: int, pool_timeout: float, poolclass
+) -> dict:
+    options = dict(echo=settings.DB_ECHO if echo is None else echo)
+    if make_url(url).database not in (None, "", ":memory:"):
+        options.update(
+            poolclass=poolclass,
+            pool_size=pool_size or settings.DB_POOL_SIZE,
+            pool_timeout=pool_timeout or settings.DB_POOL_TIMEOUT,
+            max_overflow=0,
+        )
+    return options
+
+
+def _listen_sqlite_pragmas(engine: Engine, pragmas: dict = None) -> None:
+    pragmas = settings.SQLITE_PRAGMAS if pragmas is None else pragmas
+    event.listen(
+        engine, "connect", partial(set_sqlite_pragmas, pragmas=pragmas)
+    )
+
+
+def create_sqlite_engine(
+    url: str,
+    pragmas: dict = None,
+    echo: bool = None,
+    pool_size: int = None,
+    pool_timeout: float = None,
+) -> Engine:
+    """
+    Create SQLite engine with connection profile from settings:
+    pragmas applied on connect (WAL journal, `synchronous=NORMAL` etc.)
+    and a pool of `pool_size` connections shared by the event loop
+    and executor threads. In-memory databases keep default pool.
+    """
+    engine = create_engine(
+        url,
+        **_sqlite_engine_options(
+            url, echo, pool_size, pool_timeout, QueuePool
+        ),
+    )
+    _listen_sqlite_pragmas(engine, pragmas)
+    return engine
+
+
+def create_async_sqlite_engine(
+    url: str,
+    pragmas: dict = None,
+    echo: bool = None,
+    pool_size: int = None,
+    pool_timeout: float = None,
+) -> AsyncEngine:
+    """
+    Same as `create_sqlite_engine`, but for async driver
+    (e.g. `sqlite+aiosqlite://`) used with `AsyncSession`.
+    """
+    engine = create_async_engine(
+        url,
+        **_sqlite_engine_options(
+            url, echo, pool_size, pool_timeout, AsyncAdaptedQueuePool
+        ),
+    )
+    _listen_sqlite_pragmas(engine.sync_engine, pragmas)
+    return engine
+
+
+# engines are created on first use, not on import
+
+
+@cache
+def get_db_engine() -> Engine:
+    return create_sqlite_engine(
+        f"{app_db['engine']}:////{settings.BASE_DIR}/{app_db['name']}"
+    )
+
+
+@cache
+def get_async_db_engine() -> AsyncEngine:
+    return create_async_sqlite_engine(
+        f"{app_db['engine']}+aiosqlite:////{settings.BASE_DIR}/"
+        f"{app_db['name']}"
+    )
+
+
+@cache
+def get_jobstore_engine() -> Engine:
+    return create_sqlite_engine(
+        f"{jobstore_db['engine']}:////{settings.BASE_DIR}/"
+        f"{jobstore_db['name']}"
+    )
+
 
 Session = scoped_session(sessionmaker())
 
-jobstore_engine = create_engine(
-    f"{jobstore_db['engine']}:////{settings.BASE_DIR}/{jobstore_db['name']}",
-    echo=settings.DEBUG,
-)
+AsyncSessionMaker = async_sessionmaker(expire_on_commit=False)
 
 
 @contextmanager
 def get_session():
-    Session.configure(bind=db_engine)
+    """
+    Session bound to the app database.
+    Rolls back on error and re-raises it.
+    """
+    Session.configure(bind=get_db_engine())
     try:
         yield Session
     except Exception:
         Session.rollback()
+        raise
     finally:
         Session.close()
+
+
+@asynccontextmanager
+async def get_async_session() -> AsyncSession:
+    """
+    Async counterpart of `get_session`: session for async managers,
+    e.g. `Birthday.async_queries`. Rolls back on error and re-raises it.
+    """
+    async with AsyncSessionMaker(bind=get_async_db_engine()) as session:
+        try:
+            yield session
+        except Exception:
+            await session.rollback()
+            raise
@@ -2,7 +2,7 @@ import logging
 
 from sqlalchemy import event
 
-from app.scheduler import add_job
+from app.scheduler import Scheduler
 
 from . import models
 
@@ -10,9 +10,10 @@ logger = logging.getLogger(__name__)
 
 
 def after_tg_chat_insert(mapper, connection, target):
-    """Add job after tg chat insert in DB."""
+    """Schedule mailing job for tg chat time slot after its insert in DB."""
     logger.info("issued chat creation signal")
-    add_job(target.tg_chat_id)
+    if target.utc_minute is not None:
+        Scheduler.add_mailing_slot(target.utc_minute)
 
 
 def load_events():
@@ -0,0 +1,54 @@
+import logging
+
+from sqlalchemy import Engine, MetaData, inspect, text
+from sqlalchemy.schema import CreateColumn
+
+from .models import Base
+
+logger = logging.getLogger(__name__)
+
+
+def upgrade_schema(engine: Engine, metadata: MetaData = None) -> list[str]:
+    """
+    Bring existing database schema up to date with `metadata` models:
+    create missing tables, add missing columns and indexes.
+    Only additive changes are applied, as SQLite `ALTER TABLE` allows,
+    so new columns must be nullable or computed (virtual).
+    Return descriptions of applied changes.
+    """
+    metadata = metadata or Base.metadata
+    applied = []
+    with engine.begin() as conn:
+        inspector = inspect(conn)
+        for table in metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                table.create(conn)
+                applied.append(f"create table {table.name}")
+                continue
+
+            existing_columns = {
+                column["name"] for column in inspector.get_columns(table.name)
+            }
+            for column in table.columns:
+                if column.name in existing_columns:
+                    continue
+                ddl = CreateColumn(column).compile(dialect=conn.dialect)
+                conn.execute(
+                    text(f"ALTER TABLE {table.name} ADD COLUMN {ddl}")
+                )
+                applied.append(f"add column {table.name}.{column.name}")
+
+            existing_indexes = {
+                index["name"] for index in inspector.get_indexes(table.name)
+            }
+            for index in table.indexes:
+                if index.name not in existing_indexes:
+                    index.create(conn)
+                    applied.append(f"create index {index.name}")
+
+        if applied:
+            # let query planner know about new indexes
+            conn.execute(text("ANALYZE"))
+    for change in applied:
+        logger.info(f"Database schema upgrade: {change}")
+    return applied
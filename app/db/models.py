@@ -1,14 +1,39 @@
+import calendar
 import datetime as dt
+import time
 from functools import cache
-from typing import Any, Self, Sequence, Type, TypeVar
-
-from sqlalchemy import Column, Date, DateTime, Integer, String, func, select
+from typing import Any, Awaitable, Callable, Self, Sequence, Type, TypeVar
+
+import pytz
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    ColumnElement,
+    Computed,
+    Date,
+    DateTime,
+    Float,
+    Index,
+    Integer,
+    String,
+    Time,
+    bindparam,
+    delete,
+    false,
+    func,
+    or_,
+    select,
+    true,
+    tuple_,
+    update,
+)
 from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.engine.result import ScalarResult
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import DeclarativeBase, Mapped, Session, mapped_column
 
 from app import settings
-from tests.common import today as today_
+from app.utils import clock
 
 
 class Base(DeclarativeBase):
@@ -56,8 +81,10 @@ class BirthdayQueryManager(QueryManagerBase):
         self, session: Session, start: dt.date | str, end: dt.date | str
     ) -> list[Type[Base]]:
         """
-        Fetch all instances of `model` which have
-        `date` attribute between given date borders.
+        Fetch all instances of `model` which have birthday
+        (`month` and `day`, regardless of year) between given date borders.
+        Birthdays are stored in a leap year, so `date` itself
+        is not compared with the borders.
 
         Arguments for `start` and `end` may be passed as strings.
         In this case arguments must follow ISO format `yyyy-mm-dd'.
@@ -67,15 +94,48 @@ class BirthdayQueryManager(QueryManagerBase):
             try:
                 start = dt.date.fromisoformat(start)
             except ValueError:
-                start = dt.date.fromisoformat(f"{today_().year}-01-01")
+                start = dt.date.fromisoformat(f"{clock.today().year}-01-01")
         if isinstance(end, str):
             try:
                 end = dt.date.fromisoformat(end)
             except ValueError:
-                end = dt.date.fromisoformat(f"{today_().year}-12-31")
+                end = dt.date.fromisoformat(f"{clock.today().year}-12-31")
+
+        return self.recurring_between(session, start, end)
 
+    def _recurring_between(
+        self, start: dt.date, end: dt.date
+    ) -> ColumnElement[bool]:
+        """
+        Return condition matching instances of `model` which have
+        `month` and `day` (regardless of year) between given date borders.
+        Borders may be in different years, e.g. from Dec 30 to Jan 2.
+        February 29 falls on February 28 in non-leap years.
+        """
+        if end < start:
+            return false()
+        if (end - start).days >= 365:
+            return true()
+        month_day = tuple_(self.model.month, self.model.day)
+        first = tuple_(start.month, start.day)
+        last = (end.month, end.day)
+        if last == (2, 28) and not calendar.isleap(end.year):
+            last = (2, 29)
+        last = tuple_(*last)
+        if start.year == end.year:
+            return month_day.between(first, last)
+        return or_(month_day >= first, month_day <= last)
+
+    def recurring_between(
+        self, session: Session, start: dt.date, end: dt.date
+    ) -> list[Type[Base]]:
+        """
+        Fetch all instances of `model` which have birthday
+        (`month` and `day`, regardless of year) between given date borders.
+        Uses `month` and `day` index, so it does not scan the whole table.
+        """
         return session.scalars(
-            select(self.model).filter(self.model.date.between(start, end))
+            select(self.model).where(self._recurring_between(start, end))
         ).all()
 
     def today(
@@ -83,30 +143,58 @@ class BirthdayQueryManager(QueryManagerBase):
     ) -> list[Type[Base]]:
         """
         Fetch all instances of `model` which have
-        `date` attribute equal to today.
+        birthday (`month` and `day`) equal to today.
         """
-        today = today or today_()
-        return self.between(session, today, today)
+        today = today or clock.today()
+        return self.recurring_between(session, today, today)
 
     def future(
         self, session: Session, today: dt.date = None, delta: int = 3
     ) -> list[Type[Base]]:
         """Fetch all instances of `model` from db
-        which have `date` attribute between tomorrow and delta."""
-        today = today or today_()
+        which have birthday between tomorrow and delta."""
+        today = today or clock.today()
         start = today + dt.timedelta(days=1)
         end = today + dt.timedelta(days=delta)
-        return self.between(session, start, end)
+        return self.recurring_between(session, start, end)
 
     def future_all(
         self, session: Session, today: dt.date = None
     ) -> list[Type[Base]]:
         """Fetch all instances of `model` from db
-        which have `date` attribute greater than today."""
-        today = today or today_()
-        return session.scalars(
-            select(self.model).filter(self.model.date > today)
-        ).all()
+        which have birthday between tomorrow and the end of the year."""
+        today = today or clock.today()
+        start = today + dt.timedelta(days=1)
+        return self.recurring_between(
+            session, start, dt.date(today.year, 12, 31)
+        )
+
+
+class SyncReport:
+    """Numbers of rows changed by a table sync."""
+
+    def __init__(
+        self,
+        inserted: int = 0,
+        updated: int = 0,
+        deleted: int = 0,
+        unchanged: int = 0,
+    ) -> None:
+        self.inserted = inserted
+        self.updated = updated
+        self.deleted = deleted
+        self.unchanged = unchanged
+
+    @property
+    def changed(self) -> int:
+        return self.inserted + self.updated + self.deleted
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(inserted={self.inserted}, "
+            f"updated={self.updated}, deleted={self.deleted}, "
+            f"unchanged={self.unchanged})"
+        )
 
 
 class BirthdayManipulationManager:
@@ -125,6 +213,56 @@ class BirthdayManipulationManager:
         session.query(self.model).delete()
         session.bulk_insert_mappings(self.model, mappings)
 
+    def sync_table(
+        self,
+        session: Session,
+        mappings: Sequence[dict[str, Any]],
+        batch_size: int = 500,
+    ) -> SyncReport:
+        """
+        Make 'model' rows match given mappings by `name`:
+        insert new names, update changed dates and delete missing names.
+        Unchanged rows are not touched. Changes are written in batches
+        of `INSERT ... ON CONFLICT DO UPDATE` and `DELETE` statements
+        (compiled once and executed with many parameter sets) within
+        the session transaction, which caller should commit.
+        """
+        table = self.model.__table__
+        # plain core query: no ORM row processing for the whole table
+        current = dict(
+            session.connection()
+            .execute(select(table.c.name, table.c.date))
+            .all()
+        )
+        incoming = {m["name"]: m["date"] for m in mappings}
+        report = SyncReport()
+        upserts = []
+        for name, date in incoming.items():
+            if name not in current:
+                report.inserted += 1
+            elif current[name] != date:
+                report.updated += 1
+            else:
+                report.unchanged += 1
+                continue
+            upserts.append({"name": name, "date": date})
+        deletes = [name for name in current if name not in incoming]
+        report.deleted = len(deletes)
+
+        insert_stmt = sqlite_insert(table)
+        upsert_stmt = insert_stmt.on_conflict_do_update(
+            index_elements=("name",), set_=dict(date=insert_stmt.excluded.date)
+        )
+        delete_stmt = delete(table).where(table.c.name == bindparam("_name"))
+        for i in range(0, len(upserts), batch_size):
+            session.execute(upsert_stmt, upserts[i : i + batch_size])
+        for i in range(0, len(deletes), batch_size):
+            session.execute(
+                delete_stmt,
+                [{"_name": name} for name in deletes[i : i + batch_size]],
+            )
+        return report
+
     def bulk_save_objects(
         self, session: Session, birthdays: Sequence[Type[Base]]
     ) -> None:
@@ -146,8 +284,8 @@ class BirthdayManipulationManager:
             name=name, date=date
         )
         on_duplicate_update_stmt = insert_stmt.on_conflict_do_update(
-            index_elements=("name", "date"),
-            set_=dict(name=name, date=date),
+            index_elements=("name",),
+            set_=dict(date=date),
         )
         session.execute(on_duplicate_update_stmt)
 
@@ -164,17 +302,299 @@ class BirthdayManipulationManager:
             name=name, date=date
         )
         do_nothing_stmt = insert_stmt.on_conflict_do_nothing(
-            index_elements=("name", "date")
+            index_elements=("name",)
         )
         session.execute(do_nothing_stmt)
 
 
+def utc_minute(mailing_time: dt.time, timezone: str, date: dt.date) -> int:
+    """
+    Return minute of the day in UTC (0..1439) at which local
+    `mailing_time` in `timezone` comes on given `date`.
+    Depends on `date` for timezones with daylight saving time.
+    """
+    local = pytz.timezone(timezone).localize(
+        dt.datetime.combine(date, mailing_time)
+    )
+    utc = local.astimezone(pytz.utc)
+    return utc.hour * 60 + utc.minute
+
+
+class SubscriptionQueryManager:
+    """Class for querying chats subscribed to birthday mailing."""
+
+    def __init__(self, model: Type[Base]) -> None:
+        self.model = model
+
+    def count(self, session: Session) -> int:
+        """Count number of subscribed chats."""
+        return session.scalar(select(func.count(self.model.id)))
+
+    def chat_ids(self, session: Session, utc_minute: int = None) -> list[int]:
+        """
+        Fetch ids of subscribed chats, only of those
+        mailed at given `utc_minute` if it is provided.
+        """
+        stmt = select(self.model.tg_chat_id).order_by(self.model.id)
+        if utc_minute is not None:
+            stmt = stmt.where(self.model.utc_minute == utc_minute)
+        return session.scalars(stmt).all()
+
+    def utc_minutes(self, session: Session) -> list[int]:
+        """Fetch distinct UTC minutes of the day when chats are mailed."""
+        return session.scalars(
+            select(self.model.utc_minute)
+            .where(self.model.utc_minute.is_not(None))
+            .distinct()
+            .order_by(self.model.utc_minute)
+        ).all()
+
+
+class SubscriptionManipulationManager:
+    """Class for bulk subscribing and unsubscribing chats."""
+
+    def __init__(self, model: Type[Base]) -> None:
+        self.model = model
+
+    def subscribe(
+        self,
+        session: Session,
+        chat_ids: Sequence[int],
+        mailing_time: dt.time = None,
+        timezone: str = None,
+        today: dt.date = None,
+        batch_size: int = 500,
+    ) -> int:
+        """
+        Subscribe chats to birthday mailing at local `mailing_time`
+        in `timezone` (`settings.MAILING_TIME` and `settings.TIME_ZONE`
+        by default). Already subscribed chats get the new mailing time.
+        Rows are written in batches of one compiled
+        `INSERT ... ON CONFLICT DO UPDATE` statement within the session
+        transaction, which caller should commit.
+        Return number of chats.
+        Raise `pytz.UnknownTimeZoneError` for unknown `timezone`.
+        """
+        table = self.model.__table__
+        mailing_time = mailing_time or settings.MAILING_TIME
+        timezone = timezone or settings.TIME_ZONE.zone
+        minute = utc_minute(mailing_time, timezone, today or clock.today())
+        insert_stmt = sqlite_insert(table)
+        upsert_stmt = insert_stmt.on_conflict_do_update(
+            index_elements=("tg_chat_id",),
+            set_={
+                column: insert_stmt.excluded[column]
+                for column in ("mailing_time", "timezone", "utc_minute")
+            },
+        )
+        rows = [
+            {
+                "tg_chat_id": chat_id,
+                "mailing_time": mailing_time,
+                "timezone": timezone,
+                "utc_minute": minute,
+            }
+            for chat_id in dict.fromkeys(chat_ids)
+        ]
+        for i in range(0, len(rows), batch_size):
+            session.execute(upsert_stmt, rows[i : i + batch_size])
+        return len(rows)
+
+    def unsubscribe(
+        self, session: Session, chat_ids: Sequence[int], batch_size: int = 500
+    ) -> int:
+        """
+        Unsubscribe chats from birthday mailing in batches
+        within the session transaction. Return number of removed chats.
+        """
+        table = self.model.__table__
+        chat_ids = list(dict.fromkeys(chat_ids))
+        removed = 0
+        for i in range(0, len(chat_ids), batch_size):
+            result = session.execute(
+                delete(table).where(
+                    table.c.tg_chat_id.in_(chat_ids[i : i + batch_size])
+                )
+            )
+            removed += result.rowcount
+        return removed
+
+    def update_utc_minutes(
+        self, session: Session, today: dt.date = None
+    ) -> int:
+        """
+        Recompute `utc_minute` of all chats for `today`, e.g. after
+        daylight saving time change or for chats that have none.
+        Only distinct (`mailing_time`, `timezone`) pairs are computed
+        and only changed rows are written. Return number of such rows.
+        """
+        table = self.model.__table__
+        today = today or clock.today()
+        pairs = session.execute(
+            select(table.c.mailing_time, table.c.timezone).distinct()
+        ).all()
+        update_stmt = (
+            update(table)
+            .where(
+                table.c.mailing_time == bindparam("_time"),
+                table.c.timezone == bindparam("_timezone"),
+                table.c.utc_minute.is_distinct_from(bindparam("_minute")),
+            )
+            .values(utc_minute=bindparam("_minute"))
+        )
+        updated = 0
+        for mailing_time, timezone in pairs:
+            result = session.execute(
+                update_stmt,
+                {
+                    "_time": mailing_time,
+                    "_timezone": timezone,
+                    "_minute": utc_minute(mailing_time, timezone, today),
+                },
+            )
+            updated += result.rowcount
+        return updated
+
+
+class LeaseManipulationManager:
+    """
+    Class for taking and releasing named leases, e.g. scheduler
+    leadership. Expiry times are wall clock timestamps, so processes
+    sharing leases must have reasonably synchronized clocks.
+    """
+
+    def __init__(self, model: Type[Base]) -> None:
+        self.model = model
+
+    def _take(
+        self,
+        session: Session,
+        name: str,
+        holder: str,
+        ttl: float,
+        now: float,
+        renew: bool,
+    ) -> bool:
+        table = self.model.__table__
+        now = time.time() if now is None else now
+        insert_stmt = sqlite_insert(table).values(
+            name=name, holder=holder, expires_at=now + ttl
+        )
+        free = table.c.expires_at <= now
+        upsert_stmt = insert_stmt.on_conflict_do_update(
+            index_elements=("name",),
+            set_=dict(
+                holder=insert_stmt.excluded.holder,
+                expires_at=insert_stmt.excluded.expires_at,
+            ),
+            where=or_(table.c.holder == holder, free) if renew else free,
+        )
+        return session.execute(upsert_stmt).rowcount == 1
+
+    def acquire(
+        self,
+        session: Session,
+        name: str,
+        holder: str,
+        ttl: float,
+        now: float = None,
+    ) -> bool:
+        """
+        Take lease `name` for `holder` for `ttl` seconds or extend it
+        if `holder` already has it. Lease held by someone else is taken
+        only after it expires. Atomic: single `INSERT ... ON CONFLICT
+        DO UPDATE ... WHERE` statement within the session transaction,
+        which caller should commit right away.
+        Return whether `holder` has the lease.
+        """
+        return self._take(session, name, holder, ttl, now, renew=True)
+
+    def claim(
+        self,
+        session: Session,
+        name: str,
+        holder: str,
+        ttl: float,
+        now: float = None,
+    ) -> bool:
+        """
+        Same as `acquire`, but lease is taken only if nobody,
+        `holder` included, has it: a run lock for one-off work.
+        """
+        return self._take(session, name, holder, ttl, now, renew=False)
+
+    def release(self, session: Session, name: str, holder: str) -> bool:
+        """Release lease `name` if `holder` has it."""
+        table = self.model.__table__
+        result = session.execute(
+            delete(table).where(table.c.name == name, table.c.holder == holder)
+        )
+        return result.rowcount == 1
+
+    def holder(self, session: Session, name: str, now: float = None) -> str:
+        """Return current holder of unexpired lease `name`, if any."""
+        now = time.time() if now is None else now
+        return session.scalar(
+            select(self.model.holder).where(
+                self.model.name == name, self.model.expires_at > now
+            )
+        )
+
+    def purge_expired(self, session: Session, now: float = None) -> int:
+        """Delete expired leases. Return number of deleted leases."""
+        now = time.time() if now is None else now
+        table = self.model.__table__
+        result = session.execute(
+            delete(table).where(table.c.expires_at <= now)
+        )
+        return result.rowcount
+
+
+class AsyncManager:
+    """
+    Async counterpart of a sync query or manipulation manager.
+    Has the same methods, but they take `AsyncSession` and are awaited:
+    sync method runs on the session via `AsyncSession.run_sync`,
+    so database I/O goes through async driver and does not block
+    the event loop.
+    """
+
+    def __init__(
+        self,
+        manager: (
+            QueryManagerBase
+            | BirthdayManipulationManager
+            | SubscriptionQueryManager
+            | SubscriptionManipulationManager
+        ),
+    ) -> None:
+        self.manager = manager
+
+    def __getattr__(self, name: str) -> Callable[..., Awaitable[Any]]:
+        method = getattr(self.manager, name)
+
+        async def run_sync(session: AsyncSession, *args, **kwargs) -> Any:
+            return await session.run_sync(method, *args, **kwargs)
+
+        run_sync.__name__ = name
+        run_sync.__doc__ = method.__doc__
+        return run_sync
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.manager.__class__.__name__})"
+
+
 class Birthday(Base):
     __tablename__ = "birthday"
 
     id = Column(Integer, primary_key=True)
     name = Column(String(length=128), unique=True)
-    date = Column(Date)
+    date = Column(Date, index=True)
+    # virtual columns computed by SQLite from `date` for recurring queries
+    month = Column(Integer, Computed("CAST(strftime('%m', date) AS INTEGER)"))
+    day = Column(Integer, Computed("CAST(strftime('%d', date) AS INTEGER)"))
+
+    __table_args__ = (Index("ix_birthday_month_day", "month", "day"),)
 
     @classmethod
     @property
@@ -190,7 +610,109 @@ class Birthday(Base):
         """Setup data manipulation manager."""
         return BirthdayManipulationManager(cls)
 
+    @classmethod
+    @property
+    @cache
+    def async_queries(cls) -> AsyncManager:
+        """Setup async query manager."""
+        return AsyncManager(cls.queries)
+
+    @classmethod
+    @property
+    @cache
+    def async_operations(cls) -> AsyncManager:
+        """Setup async data manipulation manager."""
+        return AsyncManager(cls.operations)
+
     def __repr__(self) -> str:
         return (
             f"{self.__class__.__name__}({self.id}, {self.name}, {self.date})"
         )
+
+
+class TelegramChat(Base):
+    """Telegram chat subscribed to daily birthday mailing."""
+
+    __tablename__ = "tg_chat"
+
+    id = Column(Integer, primary_key=True)
+    tg_chat_id = Column(BigInteger, unique=True, index=True, nullable=False)
+    # local time and timezone chosen by chat
+    mailing_time = Column(
+        Time, nullable=False, default=lambda: settings.MAILING_TIME
+    )
+    timezone = Column(
+        String(length=64),
+        nullable=False,
+        server_default=settings.TIME_ZONE.zone,
+    )
+    # minute of the day in UTC: chats sharing it are mailed by one job
+    utc_minute = Column(Integer, index=True)
+    created_at = Column(DateTime, server_default=func.current_timestamp())
+
+    @classmethod
+    @property
+    @cache
+    def queries(cls) -> SubscriptionQueryManager:
+        """Setup query manager."""
+        return SubscriptionQueryManager(cls)
+
+    @classmethod
+    @property
+    @cache
+    def operations(cls) -> SubscriptionManipulationManager:
+        """Setup data manipulation manager."""
+        return SubscriptionManipulationManager(cls)
+
+    @classmethod
+    @property
+    @cache
+    def async_queries(cls) -> AsyncManager:
+        """Setup async query manager."""
+        return AsyncManager(cls.queries)
+
+    @classmethod
+    @property
+    @cache
+    def async_operations(cls) -> AsyncManager:
+        """Setup async data manipulation manager."""
+        return AsyncManager(cls.operations)
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}({self.id}, {self.tg_chat_id}, "
+            f"{self.mailing_time}, {self.timezone})"
+        )
+
+
+class Lease(Base):
+    """
+    Named lease held by one process until `expires_at` (timestamp),
+    e.g. scheduler leadership among bot replicas.
+    """
+
+    __tablename__ = "lease"
+
+    name = Column(String(length=128), primary_key=True)
+    holder = Column(String(length=128), nullable=False)
+    expires_at = Column(Float, nullable=False)
+
+    @classmethod
+    @property
+    @cache
+    def operations(cls) -> LeaseManipulationManager:
+        """Setup data manipulation manager."""
+        return LeaseManipulationManager(cls)
+
+    @classmethod
+    @property
+    @cache
+    def async_operations(cls) -> AsyncManager:
+        """Setup async data manipulation manager."""
+        return AsyncManager(cls.operations)
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}({self.name}, {self.holder}, "
+            f"{self.expires_at})"
+        )
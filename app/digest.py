@@ -0,0 +1,87 @@
+import datetime as dt
+import logging
+from typing import Awaitable, Callable, NamedTuple
+
+from app import metrics
+from app.concurrency import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+
+class DailyDigest(NamedTuple):
+    """
+    Immutable snapshot of birthday notifications for one day
+    rendered from birthday file with given `source_hash`.
+    """
+
+    date: dt.date
+    source_hash: str | None
+    messages: tuple[str, ...]
+
+    @property
+    def version(self) -> str:
+        return f"{self.date.isoformat()}:{self.source_hash}"
+
+
+DigestBuilder = Callable[[], Awaitable[DailyDigest | None]]
+
+
+class DigestHolder:
+    """
+    Keeps current `DailyDigest`. Digests are built by `refresh` and
+    swapped in as a whole, so readers always get a complete snapshot.
+    Concurrent refreshes share one build.
+    Counts `builds` (digests built), `swaps` (new versions swapped in)
+    and `reads`.
+    """
+
+    def __init__(self) -> None:
+        self.current = None
+        self.builds = 0
+        self.swaps = 0
+        self.reads = 0
+        self._flight = SingleFlight()
+
+    async def refresh(self, build: DigestBuilder) -> DailyDigest | None:
+        """
+        Build a new digest and swap it in if its version differs.
+        Return current digest.
+        """
+        return await self._flight.do("refresh", self._refresh, build)
+
+    async def _refresh(self, build: DigestBuilder) -> DailyDigest | None:
+        with metrics.stage_seconds.labels(stage="digest_build").time():
+            digest = await build()
+        self.builds += 1
+        if digest is not None and (
+            self.current is None or self.current.version != digest.version
+        ):
+            self.current = digest
+            self.swaps += 1
+            logger.info(f"Daily digest swapped in: {self}")
+        return self.current
+
+    async def get(
+        self, today: dt.date, build: DigestBuilder
+    ) -> DailyDigest | None:
+        """
+        Return digest for `today`, building it only if there is none yet.
+        Return None if it could not be built.
+        """
+        self.reads += 1
+        digest = self.current
+        if digest is None or digest.date != today:
+            metrics.count_cache_lookup("digest", hit=False)
+            digest = await self.refresh(build)
+        else:
+            metrics.count_cache_lookup("digest", hit=True)
+        if digest is None or digest.date != today:
+            return None
+        return digest
+
+    def __repr__(self) -> str:
+        version = self.current.version if self.current else None
+        return (
+            f"{self.__class__.__name__}(version={version}, "
+            f"builds={self.builds}, swaps={self.swaps}, reads={self.reads})"
+        )
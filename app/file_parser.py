@@ -1,42 +1,54 @@
-import asyncio
 import datetime as dt
+import hashlib
 import logging
 import operator
-from logging.config import fileConfig
-from typing import Sequence
+import sys
+from functools import lru_cache
+from typing import TYPE_CHECKING, BinaryIO, Sequence
 
-import numpy as np
-import pandas as pd
 from aiogram import Bot
-from aiohttp import ClientSession
 from yadisk_async.exceptions import UnauthorizedError
 
-from app.db import get_session
-from app.db.models import Birthday
-from app.yandex_disk import disk, download_file_from_yadisk
-
-from . import settings
+from app.db import get_async_session, get_session
+from app.db.models import Birthday, Lease, TelegramChat
+from app.yandex_disk import disk, fetch_file_from_yadisk
+
+from . import metrics, settings
+from .birthday_index import BirthdayIndex, day_of_year, recurring_date
+from .cache import ParseCache, file_hash
+from .concurrency import SingleFlight, parse_offloader
+from .digest import DailyDigest, DigestBuilder, DigestHolder
+from .leader import INSTANCE_ID
+from .mailing import Mailer, MailingReport
+from .profiling import profiler
 from .utils import (
     MsgProvider,
+    clock,
     find_bot,
     get_bot,
-    get_current_date,
     set_inline_button,
     timestamp_to_datetime_string,
 )
+from .xlsx import read_valid_rows
+
+if TYPE_CHECKING:
+    import pandas as pd
 
-fileConfig(fname="log_config.conf", disable_existing_loggers=False)
 logger = logging.getLogger(__name__)
 
 
 def excel_to_pd_dataframe(
-    file_path: str, columns: Sequence = None
-) -> pd.DataFrame:
-    """Translate excel file into pandas dataframe."""
+    file_path: str | BinaryIO, columns: Sequence = None
+) -> "pd.DataFrame":
+    """Translate excel file (path or file-like object) into pandas dataframe."""
+    # pandas takes a while to import and is needed only for parsing
+    import pandas as pd
+
     try:
-        df = pd.DataFrame(
-            pd.read_excel(file_path, engine="openpyxl"), columns=columns
-        )
+        with metrics.stage_seconds.labels(stage="parse").time():
+            df = pd.DataFrame(
+                pd.read_excel(file_path, engine="openpyxl"), columns=columns
+            )
     except FileNotFoundError as e:
         logger.error(f"Pandas could not find bday file: {e}")
         raise
@@ -77,21 +89,216 @@ def validate_df_row(data, schema) -> bool:
 
 
 def preprocess_pd_dataframe(
-    df: pd.DataFrame, validation_schema, columns: Sequence
+    df: "pd.DataFrame", validation_schema, columns: Sequence
 ) -> "zip":
     """
     Validate dataframe rows, drop invalid.
     Returns zip generator with given columns.
     """
-    #### refactor this
-    # df.replace(np.nan, "?", inplace=True)
+    from .validation import compile_schema
 
-    for i in df.index:
-        if not validate_df_row(df.loc[i], validation_schema):
-            df.drop(i, inplace=True)
+    with metrics.stage_seconds.labels(stage="validate").time():
+        valid, report = compile_schema(validation_schema).validate(df)
+        df.drop(df.index[~valid], inplace=True)
+    logger.info(f"Dataframe validation: {report}")
     return zip(*(getattr(df, col) for col in columns))
 
 
+class BirthdayRecord:
+    """
+    Validated birthday sheet row shared by the parser, the birthday
+    index and the notification formatter. Unpacks like a
+    `(day, month, name)` tuple; `ordinal` is the day of year
+    (see `day_of_year`) or None if the date does not exist.
+    Records are kept in memory for every sheet row, so they have
+    no instance dict and month names and names are interned.
+    """
+
+    __slots__ = ("day", "month", "name", "ordinal")
+
+    def __init__(self, day: int, month: str, name: str, ordinal: int | None):
+        self.day = day
+        self.month = month
+        self.name = name
+        self.ordinal = ordinal
+
+    @classmethod
+    def from_row(cls, day: int, month: str, name: str) -> "BirthdayRecord":
+        """Make record of a sheet row: lowercase month, strip name."""
+        month = sys.intern(month.lower().strip())
+        ordinal = month_day_ordinal(month, day)
+        return cls(day, month, sys.intern(name.strip()), ordinal)
+
+    def __iter__(self):
+        return iter((self.day, self.month, self.name))
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, BirthdayRecord):
+            return NotImplemented
+        return tuple(self) == tuple(other)
+
+    def __hash__(self) -> int:
+        return hash(tuple(self))
+
+    def __reduce__(self):
+        return self.__class__, (self.day, self.month, self.name, self.ordinal)
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}({self.day}, "
+            f"{self.month!r}, {self.name!r})"
+        )
+
+
+@lru_cache(maxsize=1024)
+def month_day_ordinal(month: str, day: int) -> int | None:
+    """Return day of year of a date or None if it does not exist."""
+    try:
+        return day_of_year(to_int_month(month), day)
+    except (TypeError, ValueError):
+        return None
+
+
+# bump when pickled records change, so stale cache files are not loaded
+PARSE_CACHE_VERSION = 2
+parse_cache = ParseCache(settings.PARSE_CACHE_DIR, version=PARSE_CACHE_VERSION)
+
+
+PARSE_ENGINES = ("pandas", "openpyxl")
+
+
+def read_birthday_records(
+    path_to_excel: str | BinaryIO,
+    columns: Sequence = None,
+    validation_schema=birthday_schema,
+    engine: str = None,
+) -> list[BirthdayRecord]:
+    """
+    Parse excel file into a list of validated `(day, month, name)` records
+    with lowercased month name and stripped name.
+    `engine` (`settings.PARSE_ENGINE` by default) is one of:
+        `pandas` - read the sheet into a dataframe and validate it;
+        `openpyxl` - stream and validate sheet rows one by one,
+                     without pandas.
+    """
+    columns = columns or settings.COLUMNS
+    engine = engine or settings.PARSE_ENGINE
+    if engine == "openpyxl":
+        rows = read_valid_rows(path_to_excel, validation_schema, columns)
+        with metrics.stage_seconds.labels(stage="parse").time():
+            return [BirthdayRecord.from_row(*row) for row in rows]
+    if engine == "pandas":
+        df = excel_to_pd_dataframe(path_to_excel, columns)
+        logger.info("Excel convert to dataframe [SUCCESS]")
+        rows = preprocess_pd_dataframe(df, validation_schema, columns)
+        return [BirthdayRecord.from_row(*row) for row in rows]
+    raise ValueError(
+        f"Unknown parse engine `{engine}`; expected one of {PARSE_ENGINES}"
+    )
+
+
+def parse_cache_key(
+    content_hash: str,
+    columns: Sequence = None,
+    validation_schema=birthday_schema,
+    engine: str = None,
+) -> str:
+    """
+    Return `parse_cache` key of file contents parsed with given
+    `read_birthday_records` options, since records depend on them too.
+    """
+    columns = tuple(columns or settings.COLUMNS)
+    engine = engine or settings.PARSE_ENGINE
+    options = repr((columns, validation_schema)).encode()
+    options_hash = hashlib.sha256(options).hexdigest()[:16]
+    return f"{content_hash}.{engine}.{options_hash}"
+
+
+def load_birthday_records(
+    path_to_excel: str | BinaryIO,
+    columns: Sequence = None,
+    validation_schema=birthday_schema,
+    content_hash: str = None,
+    engine: str = None,
+) -> list[BirthdayRecord]:
+    """
+    Same as `read_birthday_records`, but skip parsing if file
+    with the same contents has already been parsed the same way.
+    Pass `content_hash` (e.g. Yandex.Disk md5) to avoid hashing the file.
+    """
+    content_hash = content_hash or file_hash(path_to_excel)
+    key = parse_cache_key(content_hash, columns, validation_schema, engine)
+    records = parse_cache.get(key)
+    if records is None:
+        records = read_birthday_records(
+            path_to_excel, columns, validation_schema, engine
+        )
+        parse_cache.set(key, records)
+    else:
+        logger.info(f"Parsed file taken from cache: {parse_cache}")
+    return records
+
+
+async def aload_birthday_records(
+    path_to_excel: str | BinaryIO,
+    columns: Sequence = None,
+    validation_schema=birthday_schema,
+    content_hash: str = None,
+    engine: str = None,
+) -> list[BirthdayRecord]:
+    """
+    Async counterpart of `load_birthday_records`.
+    File hashing and parsing run in `parse_offloader` executor,
+    so the event loop keeps serving other updates meanwhile.
+    """
+    if content_hash is None:
+        content_hash = await parse_offloader.run(file_hash, path_to_excel)
+    key = parse_cache_key(content_hash, columns, validation_schema, engine)
+    records = parse_cache.get(key)
+    if records is None:
+        records = await parse_offloader.run(
+            read_birthday_records,
+            path_to_excel,
+            columns,
+            validation_schema,
+            engine,
+        )
+        parse_cache.set(key, records)
+    else:
+        logger.info(f"Parsed file taken from cache: {parse_cache}")
+    return records
+
+
+class FileDownloadError(Exception):
+    """Birthday file could not be downloaded from Yandex.Disk."""
+
+
+records_flight = SingleFlight()
+
+
+async def _fetch_birthday_records(
+    source_path: str, fallback_file: str = None, disk=disk
+) -> list[BirthdayRecord]:
+    try:
+        file = await fetch_file_from_yadisk(source_path, fallback_file, disk)
+    except Exception as e:
+        raise FileDownloadError(e) from e
+    return await aload_birthday_records(file.open(), content_hash=file.md5)
+
+
+async def fetch_birthday_records(
+    source_path: str, fallback_file: str = None, disk=disk
+) -> list[BirthdayRecord]:
+    """
+    Download birthday file from Yandex.Disk (if it has changed)
+    and parse it into records. Concurrent calls for the same file
+    share one download and parse.
+    """
+    return await records_flight.do(
+        source_path, _fetch_birthday_records, source_path, fallback_file, disk
+    )
+
+
 def to_int_month(month: str) -> int:
     """Return an integer mapping to a month."""
     months = {
@@ -111,6 +318,40 @@ def to_int_month(month: str) -> int:
     return months.get(month)
 
 
+def record_month_day(record: BirthdayRecord) -> tuple[int, int]:
+    """Return `(month, day)` pair of a birthday record."""
+    day, month, _ = record
+    return to_int_month(month), day
+
+
+def record_ordinal(record: BirthdayRecord) -> int:
+    """Return precomputed day of year of a birthday record."""
+    if record.ordinal is None:
+        raise ValueError(f"no such date: {record.day} {record.month}")
+    return record.ordinal
+
+
+# records list the current index was built from and the index itself
+_indexed_records = (None, None)
+
+
+def get_birthday_index(
+    records: Sequence[BirthdayRecord],
+) -> BirthdayIndex[BirthdayRecord]:
+    """
+    Return day-of-year index of birthday records.
+    Parsed records are cached per file contents, so the index is
+    built once per data refresh and reused while the file is unchanged.
+    """
+    global _indexed_records
+    indexed, index = _indexed_records
+    if indexed is not records:
+        index = BirthdayIndex(records, ordinal=record_ordinal)
+        _indexed_records = (records, index)
+        logger.info(f"Birthday index built: {index}")
+    return index
+
+
 def decline_month(month: str) -> str:
     """Return month name in the right declension in Russian."""
     if month.endswith("т"):
@@ -132,47 +373,37 @@ def get_formatted_bday_message(
 
 
 def collect_bdays(
-    path_to_excel: str,
+    path_to_excel: str | BinaryIO,
     today: dt.date,
     columns: Sequence = None,
     future_scope: int = None,
     validation_schema=birthday_schema,
+    content_hash: str = None,
 ) -> list[str]:
     columns = settings.COLUMNS or columns
+    records = load_birthday_records(
+        path_to_excel, columns, validation_schema, content_hash
+    )
+    return format_bday_notifications(records, today, future_scope)
+
+
+def format_bday_notifications(
+    records: Sequence[BirthdayRecord],
+    today: dt.date,
+    future_scope: int = None,
+) -> list[str]:
+    """Return messages about today and upcoming birthdays."""
     future_scope = settings.FUTURE_SCOPE or future_scope
-    today_notifications = []
-    future_notifications = []
+    index = get_birthday_index(records)
     result = []
-    df = excel_to_pd_dataframe(path_to_excel, columns)
-    logger.info("Excel convert to dataframe [SUCCESS]")
-    extracted_cols = preprocess_pd_dataframe(df, validation_schema, columns)
-    for row in extracted_cols:
-        day, month, name = row
-        month = month.lower().strip()
-        name = name.strip()
-        try:
-            birth_date = dt.date(today.year, to_int_month(month), day)
-        except TypeError as e:
-            logger.error(
-                f"date conversion failure: {e}" f"; scipped row for {name}"
-            )
-            continue
-        if birth_date == today:
-            today_notifications.append(
-                get_formatted_bday_message(
-                    today, day=day, month=month, name=name
-                )
-            )
-        elif (
-            dt.timedelta(days=1)
-            <= birth_date - today
-            <= dt.timedelta(days=future_scope)
-        ):
-            future_notifications.append(
-                get_formatted_bday_message(
-                    today, day=day, month=month, name=name
-                )
-            )
+    today_notifications = [
+        get_formatted_bday_message(today, day=day, month=month, name=name)
+        for day, month, name in index.on(today)
+    ]
+    future_notifications = [
+        get_formatted_bday_message(today, day=day, month=month, name=name)
+        for _, (day, month, name) in index.upcoming(today, future_scope)
+    ]
     if today_notifications:
         result.append(f"#деньрождения сегодня {''.join(today_notifications)}")
         # logger.info("TODAY BDAYS message sent successfuly")
@@ -189,40 +420,33 @@ def collect_bdays(
     return result
 
 
-async def preload_mailing_notifications(
-    bot: Bot, check_yadisk_token: bool = True  # session: ClientSession
-) -> None:
-    async with ClientSession() as session:
-        today = await get_current_date(session, settings.TIME_API_URL)
+daily_digest = DigestHolder()
+# run locks outlive the day of the mailing they guard
+RUN_LOCK_TTL = 2 * 24 * 3600
+# run lock of a mailing being sent, so a crashed mailing may be rerun
+SENDING_LOCK_TTL = 15 * 60
 
-    global preloaded_data
+
+async def build_daily_digest(
+    bot: Bot, check_yadisk_token: bool = True
+) -> DailyDigest | None:
+    """
+    Render today's birthday notifications into a `DailyDigest`.
+    Return None if birthday file is unavailable or broken.
+    """
+    today = clock.today()
     warning_message = None
-    # preloaded_data.clear()
     output_file = settings.BASE_DIR / settings.OUTPUT_FILE_NAME
-    # downloaded_from_yadisk = False
-    # if not await disk.check_token():
-    #     kbd = set_inline_button(
-    #         text="Получить код", callback_data="confirm_code"
-    #     )
-    #     await bot.send_message(
-    #         settings.BOT_MANAGER_TELEGRAM_ID,
-    #         "Токен безопасности Яндекс Диска устарел.\n"
-    #         "Для получения кода подвтерждения нажмите на кнопку ниже и "
-    #         "перейдите по ссылке.\nВ открывшейся вкладке браузера войдите в "
-    #         "Яндекс аккаунт, на котором хранится Excel файл с данными о днях "
-    #         "рождениях. После этого вы автоматически перейдете на страницу "
-    #         "получения кода подвтерждения. Скопируйте этот код и отправьте его "
-    #         "боту с командой /code.",
-    #         reply_markup=kbd,
-    #     )
-    #     logger.error("Could not download file from YaDisk - token expired!")
+    source, content_hash = output_file.as_posix(), None
     if check_yadisk_token:
         try:
-            await download_file_from_yadisk(
+            file = await fetch_file_from_yadisk(
                 settings.YADISK_FILEPATH, output_file.as_posix()
             )
         except Exception as e:
             logger.error(f"Unexpected YaDisk error: {e}")
+        else:
+            source, content_hash = file.open(), file.md5
     else:
         if output_file.is_file():
             updated_at = timestamp_to_datetime_string(
@@ -245,28 +469,29 @@ async def preload_mailing_notifications(
                 ),
             )
             logger.critical("No file with bdays found!")
-            return
+            return None
     try:
-        notifications = collect_bdays(
-            output_file.as_posix(), today, settings.COLUMNS, 3
+        if content_hash is None:
+            content_hash = await parse_offloader.run(file_hash, source)
+        records = await aload_birthday_records(
+            source, settings.COLUMNS, content_hash=content_hash
         )
+        notifications = format_bday_notifications(records, today, 3)
     except Exception as e:
         await bot.send_message(
             settings.BOT_MANAGER_TELEGRAM_ID,
             "При обработке файла с перечнем дней рождения произошла ошибка. Обратитесь к разработчику.",
         )
         logger.critical(f"File processing failed with error: {e}")
-        return
+        return None
 
-    preloaded_data.clear()  # clear all previous notifications if we have new ones
-    if warning_message:
-        preloaded_data.append(warning_message)
-    preloaded_data += notifications
+    messages = [warning_message] if warning_message else []
+    return DailyDigest(today, content_hash, tuple(messages + notifications))
 
 
-async def run_preload(bot_path: str) -> None:
-    bot = find_bot(bot_path)
-    if not (check_yadisk_token := await disk.check_token()):
+async def check_yadisk_token(bot: Bot) -> bool:
+    """Check YaDisk token and ask bot manager to renew it if expired."""
+    if not (token_valid := await disk.check_token()):
         kbd = set_inline_button(
             text="Получить код", callback_data="confirm_code"
         )
@@ -282,101 +507,176 @@ async def run_preload(bot_path: str) -> None:
             reply_markup=kbd,
         )
         logger.error("Could not download file from YaDisk - token expired!")
-    await preload_mailing_notifications(bot, check_yadisk_token)
+    return token_valid
 
 
-async def dispatch_message_to_chat(bot_path: str, chat_id: int) -> None:
-    if not preloaded_data:
-        await run_preload(bot_path)
+def _digest_builder(bot: Bot) -> DigestBuilder:
+    async def build() -> DailyDigest | None:
+        return await build_daily_digest(bot, await check_yadisk_token(bot))
+
+    return build
 
-    await asyncio.sleep(5)
 
+async def run_preload(bot_path: str) -> DailyDigest | None:
+    """Rebuild daily digest, e.g. after birthday file update."""
     bot = find_bot(bot_path)
-    for message in preloaded_data:
-        await bot.send_message(chat_id, message)
+    return await daily_digest.refresh(_digest_builder(bot))
+
+
+async def get_daily_digest(bot: Bot) -> DailyDigest | None:
+    """Return today's digest; it is built at most once per data refresh."""
+    return await daily_digest.get(clock.today(), _digest_builder(bot))
+
+
+async def dispatch_mailing(
+    bot_path: str, chat_ids: Sequence[int]
+) -> MailingReport:
+    """
+    Send today's birthday digest to all mailing chats at once.
+    Every chat gets the same snapshot, rendered once.
+    """
+    bot = find_bot(bot_path)
+    digest = await get_daily_digest(bot)
+    messages = digest.messages if digest else ()
+    report = await Mailer(bot).deliver(chat_ids, messages)
+    logger.info(f"Birthday mailing: {report}; {daily_digest}")
+    return report
+
+
+@profiler.wrap
+async def dispatch_slot_mailing(
+    bot_path: str, utc_minute: int
+) -> MailingReport:
+    """
+    Send today's birthday digest to chats mailed at `utc_minute`.
+    Each mailing is sent once a day even if several bot replicas
+    run it: the first one takes its run lock, others skip it.
+    The lock is held for the day only once the mailing is sent:
+    it is released if sending fails and expires soon if the bot crashes.
+    """
+    run_lock = f"birthday_mailing:{utc_minute}@{clock.today()}"
+    async with get_async_session() as session:
+        claimed = await Lease.async_operations.claim(
+            session, run_lock, INSTANCE_ID, ttl=SENDING_LOCK_TTL
+        )
+        await session.commit()
+    if not claimed:
+        logger.info(f"Mailing {run_lock} is already sent, skipped")
+        return MailingReport()
+    try:
+        async with get_async_session() as session:
+            chat_ids = await TelegramChat.async_queries.chat_ids(
+                session, utc_minute
+            )
+        report = await dispatch_mailing(bot_path, chat_ids)
+    except BaseException:
+        # let the mailing be sent again instead of skipping it all day
+        async with get_async_session() as session:
+            await Lease.async_operations.release(
+                session, run_lock, INSTANCE_ID
+            )
+            await session.commit()
+        raise
+    async with get_async_session() as session:
+        await Lease.async_operations.acquire(
+            session, run_lock, INSTANCE_ID, ttl=RUN_LOCK_TTL
+        )
+        await session.commit()
+    return report
+
+
+async def dispatch_message_to_chat(bot_path: str, chat_id: int) -> None:
+    """Send birthday notifications to a single chat."""
+    await dispatch_mailing(bot_path, [chat_id])
 
 
 from sqlalchemy.exc import SQLAlchemyError
 
 
 async def update_db_from_yadisk():
+    output_file = settings.BASE_DIR / settings.OUTPUT_FILE_NAME
     try:
-        await download_file_from_yadisk(
+        file = await fetch_file_from_yadisk(
             settings.YADISK_FILEPATH, output_file.as_posix()
         )
     except Exception as e:
         logger.error(f"Unexpected YaDisk error: {e}")
         raise
 
+    records = await aload_birthday_records(file.open(), content_hash=file.md5)
+    await asave_birthdays(birthday_rows(records))
+
+
+def birthday_rows(records: Sequence[BirthdayRecord]) -> list[dict]:
+    """
+    Return birthday table rows for records with existing dates.
+    Birthdays are queried by month and day only, so dates are stored
+    in a leap year and February 29 birthdays are kept in any year.
+    """
     birthdays = []
-    df = excel_to_pd_dataframe()
-    extracted_cols = preprocess_pd_dataframe(df)
-    for row in extracted_cols:
-        day, month, name = row
-        month = month.lower().strip()
-        name = name.strip()
+    for day, month, name in records:
         try:
-            birth_date = dt.date(today.year, to_int_month(month), day)
-        except TypeError as e:
+            birth_date = recurring_date(to_int_month(month), day)
+        except (TypeError, ValueError) as e:
             logger.error(
                 f"date conversion failure: {e}; " f"scipped row for {name}"
             )
             continue
         birthdays.append({"name": name, "date": birth_date})
-    with get_session() as session:
-        Birthday.operations.refresh_table(session)
-        # Birthday.operations.bulk_upsert(session, birthdays)
+    return birthdays
+
+
+def save_birthdays(birthdays: Sequence[dict]) -> None:
+    """Make birthday table contents match given mappings."""
+    db_sync_timer = metrics.stage_seconds.labels(stage="db_sync").time()
+    with db_sync_timer, get_session() as session:
+        report = Birthday.operations.sync_table(session, birthdays)
         try:
             session.commit()
         except SQLAlchemyError as e:
-            logger.error(f"Birthday bulk_upsert error: {e}; ")
+            logger.error(f"Birthday table sync error: {e}; ")
             raise
+    logger.info(f"Birthday table sync: {report}")
 
 
-class NotificationStorage(dict):
-    def __repr__(self) -> str:
-        return f"{self.__class__.__name__}({super().__repr__()})"
-
-
-Storage = NotificationStorage()
-bot = get_bot()
+async def asave_birthdays(birthdays: Sequence[dict]) -> None:
+    """Async counterpart of `save_birthdays`."""
+    db_sync_timer = metrics.stage_seconds.labels(stage="db_sync").time()
+    with db_sync_timer:
+        async with get_async_session() as session:
+            report = await Birthday.async_operations.sync_table(
+                session, birthdays
+            )
+            try:
+                await session.commit()
+            except SQLAlchemyError as e:
+                logger.error(f"Birthday table sync error: {e}; ")
+                raise
+    logger.info(f"Birthday table sync: {report}")
 
 
+@profiler.wrap
 async def preload_birthday_messages():
-    yadisk_token_valid = await disk.check_token()
-    if not yadisk_token_valid:
+    """
+    Build today's birthday digest unless a mailing has already built it
+    today and sync birthday table with the birthday file. YaDisk token
+    is checked (and its renewal requested) by the digest builder only.
+    """
+    bot = get_bot()
+    await get_daily_digest(bot)
+    try:
+        await update_db_from_yadisk()
+    except Exception as e:
         await bot.send_message(
-            settings.BOT_MANAGER_TELEGRAM_ID, text="callback"
+            settings.BOT_MANAGER_TELEGRAM_ID, text="Unexpected error"
         )
-        logger.warning("YaDisk token expired => file download skipped.")
-    else:
-        try:
-            await update_db_from_yadisk()
-        except Exception as e:
-            await bot.send_message(
-                settings.BOT_MANAGER_TELEGRAM_ID, text="Unexpected error"
-            )
-            logger.critical(f"Database update failure: {e}")
-            Storage.setdefault(
-                "warning",
-                "Не удалось обновить базу данных. данные актуальны на ...",
-            )
-        else:
-            Storage.pop("warning", None)
-    with get_session() as session:
-        today_birthdays = Birthday.queries.today(session)
-        future_birthdays = Birthday.queries.future(session)
-
-    if today_message := get_formatted_bday_message(today_birthdays):
-        Storage.setdefault("today", today_message)
-
-    if future_message := get_formatted_bday_message(future_birthdays):
-        Storage.setdefault("future", future_message)
+        logger.critical(f"Database update failure: {e}")
 
 
 async def dispatch_birthday_message_to_chat(
     bot_path: str, chat_id: int
 ) -> None:
     bot = find_bot(bot_path)
-    for message in Storage.values():
-        await bot.send_message(chat_id, message)
+    if digest := await get_daily_digest(bot):
+        for message in digest.messages:
+            await bot.send_message(chat_id, message)
@@ -1,8 +1,13 @@
 from aiogram import Dispatcher
 
+from app import settings
+from app.profiling import profiler
+
+from .admin import cmd_profile
 from .bdays import (
     cmd_add_chat_to_bdays_mailing,
     cmd_bdays,
+    cmd_remove_chat_from_bdays_mailing,
     cmd_verify_confirm_code,
     get_confirm_code,
 )
@@ -15,10 +20,23 @@ def register_common_handlers(dp: Dispatcher):
     dp.register_message_handler(cmd_test_thing, commands=["test"])
 
 
+def register_admin_handlers(dp: Dispatcher):
+    dp.register_message_handler(
+        cmd_profile,
+        commands=["profile"],
+        user_id=settings.BOT_MANAGER_TELEGRAM_ID,
+    )
+
+
 def register_bdays_handlers(dp: Dispatcher):
-    dp.register_message_handler(cmd_bdays, commands=["bdays"])
+    # handlers doing the heavy lifting are profiled while it is enabled
+    dp.register_message_handler(profiler.wrap(cmd_bdays), commands=["bdays"])
     dp.register_message_handler(cmd_verify_confirm_code, commands=["code"])
     dp.register_callback_query_handler(get_confirm_code, text="confirm_code")
     dp.register_message_handler(
-        cmd_add_chat_to_bdays_mailing, commands=["addchat"]
+        profiler.wrap(cmd_add_chat_to_bdays_mailing), commands=["addchat"]
+    )
+    dp.register_message_handler(
+        profiler.wrap(cmd_remove_chat_from_bdays_mailing),
+        commands=["removechat"],
     )
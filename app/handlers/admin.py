@@ -0,0 +1,37 @@
+from aiogram import types
+from aiogram.utils.parts import safe_split_text
+
+from app.profiling import profiler
+
+PROFILE_USAGE = (
+    "Использование: /profile on | off | top | hot\n"
+    "on/off - включить/выключить профилирование задач и команд;\n"
+    "top - самые долгие вызовы;\n"
+    "hot - самые затратные функции самого долгого вызова."
+)
+
+
+async def cmd_profile(message: types.Message):
+    """
+    Bot manager command for profiling scheduled jobs and handlers
+    at runtime. Without arguments shows profiler status.
+    """
+    action = message.get_args().strip().lower()
+    if action == "on":
+        profiler.enabled = True
+        text = f"Профилирование включено: {profiler}"
+    elif action == "off":
+        profiler.enabled = False
+        text = f"Профилирование выключено: {profiler}"
+    elif action == "top":
+        text = profiler.report()
+    elif action == "hot":
+        profiled = [call for call in profiler.slowest() if call.path]
+        if profiled:
+            text = f"{profiled[0].name}\n{profiler.hot_spots(profiled[0])}"
+        else:
+            text = "Профили вызовов пока не собраны."
+    else:
+        text = f"{profiler}\n{PROFILE_USAGE}"
+    for part in safe_split_text(text):
+        await message.answer(part)
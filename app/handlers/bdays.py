@@ -1,20 +1,16 @@
-import datetime as dt
 import logging
-import pathlib
 
 import yadisk_async
 from aiogram import Bot, types
-from aiohttp import ClientSession
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 
 from app import settings
-from app.bot import bot
 from app.db import Session, models
-from app.files import collect_bdays, get_file_from_yadisk
-from app.scheduler import add_job
+from app.files import collect_bdays, get_birthday_records
+from app.scheduler import Scheduler
 from app.utils import (
     MsgProvider,
-    get_current_date,
+    parse_mailing_schedule,
     set_inline_button,
     update_envar,
 )
@@ -23,25 +19,15 @@ from app.yandex_disk import disk
 logger = logging.getLogger(__name__)
 
 
-def is_file_fresh(path: pathlib.PosixPath) -> bool:
-    file_refresh_after = dt.timedelta(seconds=180)
-    if path.is_file():
-        last_modified = path.stat().st_mtime
-        modified_timestamp = dt.datetime.fromtimestamp(
-            last_modified, tz=settings.TIME_ZONE
-        )
-        now = dt.datetime.now(tz=settings.TIME_ZONE)
-        return (now - modified_timestamp) < file_refresh_after
-    return False
-
-
 async def get_bdays(msg_provider: MsgProvider) -> types.Message:
     """
     Main function for retrieving information about partner's birthdays.
     Uses `msg_provider` to work both with `/` commands sent by users
     via `aiogram.Message` and scheduled jobs sent via `aiogram.Bot` directly.
-    Flow:   1.Fetch excel file with birthday data from Yandex.Disk;
-            2.Parse excel file into pandas dataframe;
+    Flow:   1.Fetch excel file with birthday data from Yandex.Disk
+              into memory (skipped if file has not changed);
+            2.Parse excel file into birthday records
+              (shared by concurrent requests);
             3.Find today and future birthdays;
             4.Send formatted messages to chat-requester.
     If `Yandex.Disk` token is invalid sends a callback message with button
@@ -64,15 +50,11 @@ async def get_bdays(msg_provider: MsgProvider) -> types.Message:
     else:
         source_path = settings.YADISK_FILEPATH
         output_file = settings.BASE_DIR / settings.OUTPUT_FILE_NAME
-        if not is_file_fresh(output_file):
-            file = await get_file_from_yadisk(
-                msg_provider, disk, source_path, output_file.as_posix()
-            )
-        if file:
-            async with ClientSession() as session:
-                await collect_bdays(
-                    msg_provider, session, settings.OUTPUT_FILE_NAME
-                )
+        records = await get_birthday_records(
+            msg_provider, disk, source_path, output_file.as_posix()
+        )
+        if records is not None:
+            await collect_bdays(msg_provider, records)
 
 
 async def get_bdays_job(bot: Bot, chat_id: int):
@@ -86,16 +68,23 @@ async def get_bdays_job(bot: Bot, chat_id: int):
 
 async def cmd_add_chat_to_bdays_mailing(message: types.Message):
     """
-    Command for adding `get_birthday` job to scheduler for
-    the chat-requester.
-    Currently days and time are unavailable to choose.
-    Need to implement tihs later.
+    Command for adding the chat-requester to the daily
+    birthday mailing job. Mailing time and timezone may be passed
+    as arguments, e.g. `/addchat 08:30 Asia/Yekaterinburg`.
     """
 
     chat_id = message.chat.id
-    func = "app.file_parser:dispatch_message_to_chat"
     try:
-        job = add_job(func, chat_id)
+        mailing_time, timezone = parse_mailing_schedule(message.get_args())
+    except ValueError as e:
+        await message.answer(
+            "Неверное время или часовой пояс рассылки.\n"
+            "Пример: /addchat 08:30 Asia/Yekaterinburg"
+        )
+        logger.info(f"Invalid mailing schedule for chat {chat_id}: {e}")
+        return
+    try:
+        await Scheduler.subscribe_chats([chat_id], mailing_time, timezone)
     except Exception as e:
         logger.error(f"Job error: {e}")
         await message.answer(
@@ -107,31 +96,30 @@ async def cmd_add_chat_to_bdays_mailing(message: types.Message):
         await message.answer(
             "Ежедневная рассылка списка дней рождения партнеров "
             "для данного чата запланирована.\n"
-            "Рассылка осуществляется каждый день в 09:00 МСК."
+            "Рассылка осуществляется каждый день в "
+            f"{mailing_time:%H:%M} ({timezone})."
         )
-    # with Session() as session:
-    # session.add(models.TelegramChat(tg_chat_id=chat_id))
-    # try:
-    #     session.commit()
-    # except SQLAlchemyError as e:
-    #     await message.answer(
-    #         "Данный чат уже получает ежедневную рассылку "
-    #         "дней рождения партнеров."
-    #     )
-    #     logger.info(
-    #         f"Chat duplication attempt error; skipped for chat {chat_id}"
-    #     )
-    # else:
-    #     await message.answer(
-    #         "Ежедневная рассылка списка дней рождения партнеров "
-    #         "для данного чата запланирована.\n"
-    #         "Рассылка осуществляется каждый день в 09:00 МСК."
-    #     )
-    #     logger.info(f"Chat[{chat_id}] added to mailing list")
 
 
 async def cmd_remove_chat_from_bdays_mailing(message: types.Message):
-    pass
+    """Command for removing the chat-requester from the daily mailing."""
+    chat_id = message.chat.id
+    try:
+        removed = await Scheduler.unsubscribe_chats([chat_id])
+    except Exception as e:
+        logger.error(f"Job error: {e}")
+        await message.answer(
+            "Не удалось удалить чат из списка рассылки.\n"
+            "Попробуйте позднее."
+        )
+    else:
+        if removed:
+            logger.info(f"Chat[{chat_id}] removed from mailing list")
+            await message.answer(
+                "Ежедневная рассылка для данного чата отменена."
+            )
+        else:
+            await message.answer("Данный чат не получает рассылку.")
 
 
 async def cmd_bdays(message: types.Message):
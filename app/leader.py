@@ -0,0 +1,148 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from typing import AsyncContextManager, Callable
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import settings
+from app.db import get_async_session
+from app.db.models import Lease
+
+logger = logging.getLogger(__name__)
+
+# unique name of this bot process among replicas
+INSTANCE_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+SCHEDULER_LEASE = "scheduler"
+
+
+class LeaderElector:
+    """
+    Elects one leader among processes sharing a database by means of
+    lease `name` in `lease` table. Leader renews the lease every
+    `renew_interval` seconds, others try to take it just as often,
+    so lease of a crashed leader is taken over within
+    `ttl + renew_interval` seconds (at once if leader released it).
+    Leader steps down if it fails to renew the lease before it expires.
+    `on_elected` and `on_demoted` callbacks are called on changes.
+
+    The lease is not a fence. A leader whose process or event loop
+    stalls for longer than `ttl` still thinks it leads until its next
+    renewal attempt after the stall (up to `renew_interval` later), while
+    another replica may have taken over already. Jobs due in this window
+    may run on both, so jobs with side effects take a run lock
+    (`Lease.claim`, see `dispatch_slot_mailing`).
+    """
+
+    def __init__(
+        self,
+        name: str = SCHEDULER_LEASE,
+        holder: str = INSTANCE_ID,
+        ttl: float = settings.LEADER_LEASE_TTL,
+        renew_interval: float = settings.LEADER_RENEW_INTERVAL,
+        on_elected: Callable[[], None] = None,
+        on_demoted: Callable[[], None] = None,
+        session_factory: Callable[
+            [], AsyncContextManager[AsyncSession]
+        ] = get_async_session,
+    ) -> None:
+        self.name = name
+        self.holder = holder
+        self.ttl = ttl
+        self.renew_interval = renew_interval
+        self.on_elected = on_elected
+        self.on_demoted = on_demoted
+        self.session_factory = session_factory
+        self.is_leader = False
+        self.elections = 0
+        self.failures = 0
+        # monotonic time until which our lease surely holds
+        self._holds_until = 0.0
+        self._task = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def try_acquire(self) -> bool:
+        """Take or renew the lease. Return whether we are leader."""
+        started_at = time.monotonic()
+        try:
+            async with self.session_factory() as session:
+                acquired = await asyncio.wait_for(
+                    Lease.async_operations.acquire(
+                        session, self.name, self.holder, self.ttl
+                    ),
+                    self.renew_interval,
+                )
+                if acquired:
+                    # leader keeps the table clean of finished run locks
+                    await Lease.async_operations.purge_expired(session)
+                await session.commit()
+        except Exception as e:
+            self.failures += 1
+            logger.warning(f"Lease [{self.name}] renewal failed: {e!r}")
+            acquired = self.is_leader and time.monotonic() < self._holds_until
+        else:
+            if acquired:
+                self._holds_until = started_at + self.ttl
+        self._set_leader(acquired)
+        return acquired
+
+    async def release(self) -> None:
+        """Give the lease away, so another process takes it at once."""
+        if self.is_leader:
+            try:
+                async with self.session_factory() as session:
+                    await Lease.async_operations.release(
+                        session, self.name, self.holder
+                    )
+                    await session.commit()
+            except Exception as e:
+                logger.warning(f"Lease [{self.name}] release failed: {e!r}")
+        self._set_leader(False)
+
+    def _set_leader(self, is_leader: bool) -> None:
+        if is_leader == self.is_leader:
+            return
+        self.is_leader = is_leader
+        if is_leader:
+            self.elections += 1
+            logger.info(f"{self.holder} elected leader of [{self.name}]")
+            callback = self.on_elected
+        else:
+            logger.warning(f"{self.holder} is not leader of [{self.name}]")
+            callback = self.on_demoted
+        if callback is not None:
+            callback()
+
+    async def start(self) -> None:
+        """Make the first election attempt and keep trying in background."""
+        if not self.is_running:
+            await self.try_acquire()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.release()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.renew_interval)
+            await self.try_acquire()
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(name={self.name}, "
+            f"holder={self.holder}, is_leader={self.is_leader}, "
+            f"elections={self.elections}, failures={self.failures})"
+        )
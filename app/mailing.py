@@ -0,0 +1,188 @@
+import asyncio
+import logging
+import time
+from typing import Iterable, Sequence
+
+from aiogram import Bot
+from aiogram.utils.exceptions import RetryAfter, Unauthorized
+
+from app import metrics, settings
+from app.concurrency import percentile
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """
+    Lets callers through at most once per `interval` seconds on average,
+    with bursts of up to `burst` calls. Callers are let through
+    in order of `acquire` calls.
+    """
+
+    def __init__(self, interval: float, burst: int = 1) -> None:
+        self.interval = interval
+        self.burst = burst
+        # theoretical time of the next call
+        self._next_at = 0.0
+        self._paused_until = 0.0
+
+    def reserve(self) -> float:
+        """Reserve a call slot and return seconds to wait for it."""
+        now = time.monotonic()
+        next_at = max(self._next_at, now)
+        self._next_at = next_at + self.interval
+        return max(0.0, next_at - (self.burst - 1) * self.interval - now)
+
+    async def acquire(self) -> None:
+        if delay := self.reserve():
+            await asyncio.sleep(delay)
+        # slots reserved before a pause must wait for its end too
+        while (delay := self._paused_until - time.monotonic()) > 0:
+            await asyncio.sleep(delay)
+
+    def pause(self, seconds: float) -> None:
+        """Let no calls through for the next `seconds`."""
+        self._paused_until = max(
+            self._paused_until, time.monotonic() + seconds
+        )
+        self._next_at = max(self._next_at, self._paused_until)
+
+
+class MailingReport:
+    """
+    Mailing delivery statistics: number of messages `sent` and `failed`,
+    `retries` after flood control errors and delivery latencies
+    (seconds since mailing start) of sent messages.
+    """
+
+    def __init__(self) -> None:
+        self.sent = 0
+        self.failed = 0
+        self.retries = 0
+        self.latencies = []
+
+    def percentile(self, q: float) -> float:
+        """Return delivery latency percentile (`q` in 0..100)."""
+        return percentile(self.latencies, q)
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(sent={self.sent}, "
+            f"failed={self.failed}, retries={self.retries}, "
+            f"p50={self.percentile(50):.3f}s, "
+            f"p95={self.percentile(95):.3f}s, "
+            f"p99={self.percentile(99):.3f}s)"
+        )
+
+
+class Mailer:
+    """
+    Delivers the same messages to many chats at once.
+    Chats are taken from a queue by `concurrency` workers; messages
+    to one chat are sent in order. Sending respects Telegram limits:
+    `global_rate` messages per second for all chats, one message per
+    `chat_interval` seconds to a private chat and per `group_interval`
+    seconds to a group (chats with negative ids). On flood control error
+    (429) all sending is paused for `retry_after` seconds and the message
+    is retried up to `max_retries` times.
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        concurrency: int = settings.MAILING_CONCURRENCY,
+        global_rate: float = settings.TELEGRAM_GLOBAL_RATE,
+        chat_interval: float = settings.TELEGRAM_CHAT_INTERVAL,
+        group_interval: float = settings.TELEGRAM_GROUP_INTERVAL,
+        max_retries: int = settings.MAILING_MAX_RETRIES,
+    ) -> None:
+        self.bot = bot
+        self.concurrency = concurrency
+        self.global_limiter = RateLimiter(1 / global_rate)
+        self.chat_interval = chat_interval
+        self.group_interval = group_interval
+        self.max_retries = max_retries
+
+    async def deliver(
+        self, chat_ids: Iterable[int], messages: Sequence[str]
+    ) -> MailingReport:
+        """Send `messages` to every chat and return delivery report."""
+        report = MailingReport()
+        queue = asyncio.Queue()
+        for chat_id in dict.fromkeys(chat_ids):
+            queue.put_nowait(chat_id)
+        started_at = time.monotonic()
+
+        async def worker() -> None:
+            while not queue.empty():
+                chat_id = queue.get_nowait()
+                await self._deliver_to_chat(
+                    chat_id, messages, started_at, report
+                )
+
+        workers = min(self.concurrency, queue.qsize())
+        await asyncio.gather(*(worker() for _ in range(workers)))
+        return report
+
+    async def _deliver_to_chat(
+        self,
+        chat_id: int,
+        messages: Sequence[str],
+        started_at: float,
+        report: MailingReport,
+    ) -> None:
+        chat_limiter = RateLimiter(
+            self.group_interval if chat_id < 0 else self.chat_interval
+        )
+        for number, text in enumerate(messages):
+            reason = await self._send(chat_id, text, chat_limiter, report)
+            if reason is not None:
+                # chat is unavailable, do not try remaining messages
+                failed = len(messages) - number
+                report.failed += failed
+                metrics.delivery_failures.labels(reason=reason).inc(failed)
+                logger.warning(
+                    f"{failed} mailing messages to chat {chat_id} "
+                    f"were not delivered ({reason})"
+                )
+                return
+            report.sent += 1
+            report.latencies.append(time.monotonic() - started_at)
+
+    async def _send(
+        self,
+        chat_id: int,
+        text: str,
+        chat_limiter: RateLimiter,
+        report: MailingReport,
+    ) -> str | None:
+        """
+        Send one message, retrying after flood control errors.
+        Return the reason of failure (`retry_after`, `forbidden` or
+        `other`) or None if the message was sent.
+        """
+        for _ in range(self.max_retries + 1):
+            await chat_limiter.acquire()
+            await self.global_limiter.acquire()
+            try:
+                with metrics.stage_seconds.labels(stage="send").time():
+                    await self.bot.send_message(chat_id, text)
+            except RetryAfter as e:
+                report.retries += 1
+                logger.warning(
+                    f"Mailing to chat {chat_id} hit flood control: "
+                    f"retry in {e.timeout} s"
+                )
+                self.global_limiter.pause(e.timeout)
+                chat_limiter.pause(e.timeout)
+            except Unauthorized as e:
+                # bot was blocked or kicked from the chat
+                logger.error(f"Mailing to chat {chat_id} failed: {e}")
+                return "forbidden"
+            except Exception as e:
+                logger.error(f"Mailing to chat {chat_id} failed: {e}")
+                return "other"
+            else:
+                return None
+        logger.error(f"Mailing to chat {chat_id} failed: retries exhausted")
+        return "retry_after"
@@ -0,0 +1,351 @@
+import logging
+import math
+import threading
+import time
+from functools import partial
+from typing import Callable, Iterable, Sequence
+
+from aiohttp import web
+
+from app import settings
+from app.concurrency import lag_monitor
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# seconds; parsing of large files takes up to a minute
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60
+)  # fmt: skip
+
+
+class MetricsRegistry:
+    """
+    Keeps metrics and renders them in Prometheus text format.
+    While `enabled` is False metrics record nothing: `labels` of every
+    metric returns a shared no-op child, so instrumented code pays
+    for one attribute check only.
+    """
+
+    def __init__(self, enabled: bool = True) -> None:
+        self.enabled = enabled
+        self.metrics: list["Metric"] = []
+
+    def register(self, metric: "Metric") -> None:
+        if any(m.name == metric.name for m in self.metrics):
+            raise ValueError(f"Metric `{metric.name}` is already registered")
+        self.metrics.append(metric)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class _NullChild:
+    """Child of a metric of disabled registry: records nothing."""
+
+    def inc(self, amount: float = 1) -> None:
+        pass
+
+    def dec(self, amount: float = 1) -> None:
+        pass
+
+    def set(self, value: float) -> None:
+        pass
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        pass
+
+    def observe(self, value: float) -> None:
+        pass
+
+    def time(self) -> "_NullChild":
+        return self
+
+    def __enter__(self) -> None:
+        pass
+
+    def __exit__(self, *exc_info) -> None:
+        pass
+
+
+NULL_CHILD = _NullChild()
+
+
+def format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+def format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = (
+        f'{name}="{escape_label_value(value)}"'
+        for name, value in zip(names, values)
+    )
+    return "{" + ",".join(pairs) + "}"
+
+
+def escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Metric:
+    """
+    Base class of metrics with optional `labelnames`. Values of every
+    label combination are kept by a child returned by `labels`;
+    metrics without labels are used through `labels()`.
+    Children may be updated from executor threads.
+    """
+
+    kind = "untyped"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        registry: MetricsRegistry = None,
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.registry = registry if registry is not None else REGISTRY
+        self._children = {}
+        self._lock = threading.Lock()
+        self.registry.register(self)
+
+    def labels(self, **labels):
+        """Return child keeping value for given label values."""
+        if not self.registry.enabled:
+            return NULL_CHILD
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._make_child())
+        return child
+
+    def _make_child(self):
+        raise NotImplementedError
+
+    def render(self) -> Iterable[str]:
+        for key, child in list(self._children.items()):
+            labels = format_labels(self.labelnames, key)
+            yield f"{self.name}{labels} {format_value(child.get())}"
+
+
+class _ValueChild:
+    def __init__(self) -> None:
+        self.value = 0.0
+        self.function = None
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1) -> None:
+        self.inc(-amount)
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """Take value from `function` called on every scrape."""
+        self.function = function
+
+    def get(self) -> float:
+        if self.function is None:
+            return self.value
+        try:
+            return self.function()
+        except Exception as e:
+            logger.warning(f"Metric value could not be collected: {e!r}")
+            return math.nan
+
+
+class Counter(Metric):
+    """Monotonically increasing value, e.g. number of cache hits."""
+
+    kind = "counter"
+
+    def _make_child(self) -> _ValueChild:
+        return _ValueChild()
+
+
+class Gauge(Metric):
+    """Value which goes up and down, e.g. number of scheduled jobs."""
+
+    kind = "gauge"
+
+    def _make_child(self) -> _ValueChild:
+        return _ValueChild()
+
+
+class _Timer:
+    __slots__ = ("_child", "_started_at")
+
+    def __init__(self, child: "_HistogramChild") -> None:
+        self._child = child
+
+    def __enter__(self) -> None:
+        self._started_at = time.perf_counter()
+
+    def __exit__(self, *exc_info) -> None:
+        self._child.observe(time.perf_counter() - self._started_at)
+
+
+class _HistogramChild:
+    def __init__(self, buckets: Sequence[float]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self.counts[i] += 1
+                    break
+            self.sum += value
+            self.count += 1
+
+    def time(self) -> _Timer:
+        """Context manager observing duration of its block."""
+        return _Timer(self)
+
+
+class Histogram(Metric):
+    """
+    Distribution of observed values, e.g. stage durations in seconds,
+    counted in cumulative `buckets` (upper bounds).
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+        registry: MetricsRegistry = None,
+    ) -> None:
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _make_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def render(self) -> Iterable[str]:
+        for key, child in list(self._children.items()):
+            with child._lock:
+                counts = list(child.counts)
+                total, count = child.sum, child.count
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = format_labels(
+                    self.labelnames + ("le",), key + (format_value(bound),)
+                )
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {format_value(total)}"
+            yield f"{self.name}_count{labels} {count}"
+
+
+class MetricsServer:
+    """
+    Local HTTP server exposing `registry` metrics at `path`
+    for Prometheus to scrape.
+    """
+
+    def __init__(
+        self,
+        registry: MetricsRegistry,
+        host: str = settings.METRICS_HOST,
+        port: int = settings.METRICS_PORT,
+        path: str = "/metrics",
+    ) -> None:
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self.path = path
+        self._runner = None
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get(self.path, self.handle)
+        return app
+
+    async def handle(self, request: web.Request) -> web.Response:
+        return web.Response(
+            body=self.registry.render().encode(),
+            headers={"Content-Type": CONTENT_TYPE},
+        )
+
+    async def start(self) -> None:
+        if self._runner is None:
+            self._runner = web.AppRunner(self.make_app())
+            await self._runner.setup()
+            await web.TCPSite(self._runner, self.host, self.port).start()
+            logger.info(
+                f"Metrics served at http://{self.host}:{self.port}{self.path}"
+            )
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+REGISTRY = MetricsRegistry(enabled=settings.METRICS_ENABLED)
+
+# stages: download, parse, validate, db_sync, digest_build, send;
+# parse and validate run in `parse_offloader`, so they are not recorded
+# with `process` executor
+stage_seconds = Histogram(
+    "bdaybot_stage_duration_seconds",
+    "Duration of birthday pipeline stages.",
+    ["stage"],
+)
+cache_requests = Counter(
+    "bdaybot_cache_requests_total",
+    "Cache lookups by cache (yadisk_file, parse, digest) and result.",
+    ["cache", "result"],
+)
+
+
+def count_cache_lookup(cache: str, hit: bool) -> None:
+    cache_requests.labels(cache=cache, result="hit" if hit else "miss").inc()
+
+
+delivery_failures = Counter(
+    "bdaybot_delivery_failures_total",
+    "Mailing messages which could not be delivered, by reason "
+    "(retry_after, forbidden or other).",
+    ["reason"],
+)
+scheduler_jobs = Gauge(
+    "bdaybot_scheduler_jobs", "Number of jobs in the scheduler."
+)
+loop_lag = Gauge(
+    "bdaybot_event_loop_lag_seconds",
+    "Event loop lag over the last minute: p50, p99 and max (quantile 1).",
+    ["quantile"],
+)
+for quantile in (0.5, 0.99, 1):
+    loop_lag.labels(quantile=quantile).set_function(
+        partial(lag_monitor.percentile, quantile * 100)
+    )
+
+metrics_server = MetricsServer(REGISTRY)
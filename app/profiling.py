@@ -0,0 +1,185 @@
+import cProfile
+import datetime as dt
+import functools
+import heapq
+import io
+import itertools
+import logging
+import pstats
+import re
+import time
+from collections import deque
+from pathlib import Path
+from typing import Awaitable, Callable, NamedTuple, TypeVar
+
+from app import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class ProfiledCall(NamedTuple):
+    """One profiled invocation; `path` is None if it was only timed."""
+
+    name: str
+    started_at: dt.datetime
+    duration: float
+    path: Path | None
+
+
+class Profiler:
+    """
+    Opt-in profiler of coroutines: scheduled jobs and bot handlers.
+    While `enabled`, each invocation is run under `cProfile` and its
+    profile is saved to `output_dir` as `<time>-<name>.prof`
+    (only `max_files` latest are kept). The `top_n` slowest
+    invocations are kept for `report`.
+
+    `cProfile` records everything run in the thread, so the profile
+    includes other coroutines run by the loop meanwhile - a slow
+    mailing may be slow because of them. Only one invocation is
+    profiled at a time; concurrent ones are only timed.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = settings.PROFILING_ENABLED,
+        output_dir: str | Path = settings.PROFILE_DIR,
+        top_n: int = settings.PROFILE_TOP_N,
+        max_files: int = settings.PROFILE_MAX_FILES,
+    ) -> None:
+        self.enabled = enabled
+        self.output_dir = Path(output_dir)
+        self.top_n = top_n
+        self.max_files = max_files
+        self.calls = 0
+        self._slowest: list[tuple[float, int, ProfiledCall]] = []
+        self._files = deque()
+        self._active = False
+        self._counter = itertools.count()
+
+    async def run(self, name: str, awaitable: Awaitable[T]) -> T:
+        """Await `awaitable`, profiling it as `name` if enabled."""
+        if not self.enabled:
+            return await awaitable
+        profile = self._start_profile()
+        started_at = dt.datetime.now()
+        start = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            duration = time.perf_counter() - start
+            if profile is not None:
+                profile.disable()
+                self._active = False
+            self._record(name, started_at, duration, profile)
+
+    def wrap(self, func: Callable[..., Awaitable[T]], name: str = None):
+        """Return coroutine function profiling every call of `func`."""
+        name = name or func.__name__
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs) -> T:
+            return await self.run(name, func(*args, **kwargs))
+
+        return wrapper
+
+    def _start_profile(self) -> cProfile.Profile | None:
+        if self._active:
+            return None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError as e:
+            # another profiling tool is active
+            logger.warning(f"Profiling skipped: {e}")
+            return None
+        self._active = True
+        return profile
+
+    def _record(
+        self,
+        name: str,
+        started_at: dt.datetime,
+        duration: float,
+        profile: cProfile.Profile | None,
+    ) -> None:
+        self.calls += 1
+        path = None
+        if profile is not None:
+            path = self._save(name, started_at, profile)
+        call = ProfiledCall(name, started_at, duration, path)
+        entry = (duration, next(self._counter), call)
+        if len(self._slowest) < self.top_n:
+            heapq.heappush(self._slowest, entry)
+        else:
+            heapq.heappushpop(self._slowest, entry)
+        logger.info(f"Profiled {name}: {duration:.3f} s, {path}")
+
+    def _save(
+        self, name: str, started_at: dt.datetime, profile: cProfile.Profile
+    ) -> Path | None:
+        safe_name = re.sub(r"[^\w.-]", "_", name)
+        path = self.output_dir / (
+            f"{started_at:%Y%m%d-%H%M%S-%f}-{safe_name}.prof"
+        )
+        try:
+            self.output_dir.mkdir(parents=True, exist_ok=True)
+            profile.dump_stats(path)
+        except OSError as e:
+            logger.warning(f"Profile could not be saved: {e}")
+            return None
+        self._files.append(path)
+        while len(self._files) > self.max_files:
+            self._forget_profile(self._files.popleft())
+        return path
+
+    def _forget_profile(self, path: Path) -> None:
+        """Delete rotated out profile, kept calls are left only timed."""
+        path.unlink(missing_ok=True)
+        # keys are not changed, so the list stays a heap
+        self._slowest = [
+            (
+                (duration, number, call._replace(path=None))
+                if call.path == path
+                else (duration, number, call)
+            )
+            for duration, number, call in self._slowest
+        ]
+
+    def slowest(self) -> list[ProfiledCall]:
+        """Return kept slowest invocations, slowest first."""
+        return [call for *_, call in sorted(self._slowest, reverse=True)]
+
+    def report(self) -> str:
+        """Return text table of the slowest invocations."""
+        lines = [f"{self}", "Slowest calls:"]
+        for call in self.slowest():
+            path = call.path.name if call.path else "-"
+            lines.append(
+                f"{call.duration:8.3f} s  {call.started_at:%Y-%m-%d %H:%M:%S}"
+                f"  {call.name}  {path}"
+            )
+        return "\n".join(lines)
+
+    def hot_spots(self, call: ProfiledCall, limit: int = 15) -> str:
+        """Return functions of `call` profile by cumulative time."""
+        stream = io.StringIO()
+        stats = pstats.Stats(str(call.path), stream=stream)
+        stats.strip_dirs().sort_stats("cumulative").print_stats(limit)
+        return stream.getvalue()
+
+    def reset(self) -> None:
+        """Forget kept invocations; saved profiles stay on disk."""
+        self.calls = 0
+        self._slowest.clear()
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(enabled={self.enabled}, "
+            f"calls={self.calls}, output_dir={self.output_dir})"
+        )
+
+
+profiler = Profiler()
@@ -1,17 +1,34 @@
-from typing import Callable
+import datetime as dt
+import logging
+from typing import Iterable, Sequence
 
-from apscheduler.executors.asyncio import AsyncIOExecutor
+import pytz
+from apscheduler.events import (
+    EVENT_ALL_JOBS_REMOVED,
+    EVENT_JOB_ADDED,
+    EVENT_JOB_REMOVED,
+    SchedulerEvent,
+)
 from apscheduler.job import Job
 from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
+from sqlalchemy import Engine
 
-from app import settings
-from app.db import jobstore_engine, models
-from app.file_parser import (
-    dispatch_birthday_message_to_chat,
-    preload_birthday_messages,
-)
+from app import metrics, settings
+from app.db import get_async_session, get_jobstore_engine
+from app.db.models import TelegramChat
+from app.file_parser import dispatch_slot_mailing, preload_birthday_messages
+from app.leader import SCHEDULER_LEASE, LeaderElector
+from app.profiling import profiler
+from app.utils import clock
+
+MAILING_JOB_ID = "birthday_mailing"
+PRELOAD_JOB_ID = "birthday_preload"
+MAILING_REFRESH_JOB_ID = "mailing_slots_refresh"
+MAILING_SYNC_JOB_ID = "mailing_slots_sync"
+
+logger = logging.getLogger(__name__)
 
 
 class BotScheduler(AsyncIOScheduler):
@@ -22,62 +39,234 @@ class BotScheduler(AsyncIOScheduler):
 
     __doc__ += AsyncIOScheduler.__doc__
 
+    # whether this scheduler adds and removes jobs; among bot replicas
+    # sharing a jobstore only the scheduler leader does (see `lead`)
+    leading = True
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        if metrics.REGISTRY.enabled:
+            self.add_listener(
+                self._count_job_event,
+                EVENT_JOB_ADDED | EVENT_JOB_REMOVED | EVENT_ALL_JOBS_REMOVED,
+            )
+
+    def start(self, *args, **kwargs) -> None:
+        super().start(*args, **kwargs)
+        self.count_jobs()
+
+    def count_jobs(self) -> None:
+        """
+        Set `scheduler_jobs` metric to the number of jobs in jobstores.
+        Lists all jobs, so is only called on `start` and `lead`:
+        then the metric follows job events.
+        """
+        if metrics.REGISTRY.enabled:
+            metrics.scheduler_jobs.labels().set(len(self.get_jobs()))
+
+    def _count_job_event(self, event: SchedulerEvent) -> None:
+        if event.code == EVENT_JOB_ADDED:
+            metrics.scheduler_jobs.labels().inc()
+        elif event.code == EVENT_JOB_REMOVED:
+            metrics.scheduler_jobs.labels().dec()
+        else:
+            self.count_jobs()
+
+    def lead(self) -> None:
+        """
+        Take over jobs as the scheduler leader: (re)schedule daily jobs,
+        recompute mailing slots at once and resume running jobs.
+        """
+        self.leading = True
+        self.setup_daily_message_preload()
+        self.setup_mailing_slots_refresh(run_now=True)
+        self.setup_mailing_slots_sync()
+        # jobs replaced above were counted as added
+        self.count_jobs()
+        self.resume()
+        logger.info("Scheduler leads: jobs are run and managed here")
+
+    def follow(self) -> None:
+        """Leave running and managing jobs to the scheduler leader."""
+        self.leading = False
+        if self.running:
+            self.pause()
+        logger.info("Scheduler follows: jobs are left to the leader")
+
+    def setup_jobstore(self, engine: Engine = None) -> None:
+        """
+        Keep jobs in jobstore database (shared by bot replicas).
+        Need to be executed on each program startup before the scheduler
+        is started, otherwise jobs are kept in memory.
+        """
+        self.add_jobstore(
+            SQLAlchemyJobStore(engine=engine or get_jobstore_engine())
+        )
+
     def setup_daily_message_preload(self) -> Job:
         """
         Schedule daily birthday messages preload.
-        Need to be executed on each program startup.
+        Need to be executed by the scheduler leader (see `lead`).
         """
         return self.add_job(
             preload_birthday_messages,
             trigger=CronTrigger(day_of_week="mon-sun", hour=0, minute=10),
-            id=1,
+            id=PRELOAD_JOB_ID,
             replace_existing=True,
         )
 
-    def add_chat_to_birthday_mailing(self, chat_id: int) -> Job:
-        """Schedule daily birthday messages delivery to provided chat."""
+    def setup_mailing_slots_refresh(self, run_now: bool = False) -> Job:
+        """
+        Schedule daily recomputation of mailing slots, so chats follow
+        daylight saving time changes of their timezones.
+        Need to be executed by the scheduler leader (see `lead`).
+        """
+        options = {"next_run_time": clock.now()} if run_now else {}
         return self.add_job(
-            dispatch_birthday_message_to_chat,
-            trigger=CronTrigger(day_of_week="mon-sun", hour=9, minute=0),
-            id=str(chat_id),
+            refresh_mailing_slots,
+            trigger=CronTrigger(day_of_week="mon-sun", hour=0, minute=5),
+            id=MAILING_REFRESH_JOB_ID,
             replace_existing=True,
-            kwargs={"chat_id": chat_id},
+            **options,
         )
 
+    def setup_mailing_slots_sync(self) -> Job:
+        """
+        Schedule frequent check for mailing slots of chats subscribed
+        via other bot replicas, which leave jobs to the leader.
+        Need to be executed by the scheduler leader (see `lead`).
+        """
+        return self.add_job(
+            sync_mailing_slots,
+            trigger="interval",
+            seconds=settings.MAILING_SLOTS_SYNC_INTERVAL,
+            id=MAILING_SYNC_JOB_ID,
+            replace_existing=True,
+        )
+
+    def add_mailing_slot(self, utc_minute: int) -> Job:
+        """
+        Schedule daily birthday mailing at `utc_minute` of the day (UTC).
+        One job serves all chats whose local mailing time falls on this
+        minute: chat ids are fetched from the subscriptions table
+        when the job runs.
+        """
+        hour, minute = divmod(utc_minute, 60)
+        return self.add_job(
+            dispatch_slot_mailing,
+            trigger=CronTrigger(
+                day_of_week="mon-sun",
+                hour=hour,
+                minute=minute,
+                timezone=pytz.utc,
+            ),
+            id=mailing_job_id(utc_minute),
+            replace_existing=True,
+            kwargs={"bot_path": "app.bot:bot", "utc_minute": utc_minute},
+        )
+
+    def mailing_slots(self) -> list[Job]:
+        """Return scheduled mailing jobs, one per UTC minute."""
+        return [
+            job
+            for job in self.get_jobs()
+            if job.id.startswith(f"{MAILING_JOB_ID}:")
+        ]
+
+    def sync_mailing_slots(self, utc_minutes: Iterable[int]) -> None:
+        """
+        Keep exactly one mailing job per given UTC minute:
+        add missing jobs and remove jobs for other minutes.
+        """
+        wanted = {mailing_job_id(minute): minute for minute in utc_minutes}
+        for job in self.mailing_slots():
+            if wanted.pop(job.id, None) is None:
+                job.remove()
+        for utc_minute in wanted.values():
+            self.add_mailing_slot(utc_minute)
+
+    async def load_mailing_slots(self, today: dt.date = None) -> None:
+        """
+        Schedule mailing jobs for all subscriptions, with UTC minutes
+        recomputed for `today`.
+        """
+        async with get_async_session() as session:
+            await TelegramChat.async_operations.update_utc_minutes(
+                session, today or clock.today()
+            )
+            await session.commit()
+        await self.load_subscribed_slots()
+
+    async def load_subscribed_slots(self) -> None:
+        """Schedule mailing jobs for UTC minutes of all subscriptions."""
+        async with get_async_session() as session:
+            utc_minutes = await TelegramChat.async_queries.utc_minutes(session)
+        self.sync_mailing_slots(utc_minutes)
+
+    async def subscribe_chats(
+        self,
+        chat_ids: Sequence[int],
+        mailing_time: dt.time = None,
+        timezone: str = None,
+    ) -> int:
+        """
+        Subscribe chats to daily birthday mailing at local `mailing_time`
+        in `timezone` and make sure its mailing job exists. Replicas which
+        are not the scheduler leader only save the subscription: the leader
+        schedules its job within `settings.MAILING_SLOTS_SYNC_INTERVAL`.
+        """
+        async with get_async_session() as session:
+            count = await TelegramChat.async_operations.subscribe(
+                session, chat_ids, mailing_time, timezone, clock.today()
+            )
+            await session.commit()
+        if self.leading:
+            # moved chats may have left their previous slots empty
+            await self.load_subscribed_slots()
+        return count
+
+    async def unsubscribe_chats(self, chat_ids: Sequence[int]) -> int:
+        """
+        Unsubscribe chats from daily birthday mailing
+        and remove mailing jobs left without chats (by the scheduler
+        leader, just like in `subscribe_chats`).
+        """
+        async with get_async_session() as session:
+            count = await TelegramChat.async_operations.unsubscribe(
+                session, chat_ids
+            )
+            await session.commit()
+        if self.leading:
+            await self.load_subscribed_slots()
+        return count
+
+
+def mailing_job_id(utc_minute: int) -> str:
+    return f"{MAILING_JOB_ID}:{utc_minute // 60:02}:{utc_minute % 60:02}"
+
 
 Scheduler = BotScheduler(
-    jobstores={"default": SQLAlchemyJobStore(engine=jobstore_engine)},
     timezone=settings.TIME_ZONE,
-    executors={"default": AsyncIOExecutor()},
     job_defaults={"misfire_grace_time": 30, "coalesce": True},
 )
 
+# only the leader among bot replicas runs and manages scheduled jobs
+Scheduler.leading = False
+leader = LeaderElector(
+    SCHEDULER_LEASE, on_elected=Scheduler.lead, on_demoted=Scheduler.follow
+)
+
+
+# job functions are profiled by `profiler.wrap` where they are defined:
+# the jobstore refers to a job function by its module and name,
+# which have to resolve to the wrapper
+@profiler.wrap
+async def refresh_mailing_slots() -> None:
+    """Recompute mailing slots of `Scheduler` for today."""
+    await Scheduler.load_mailing_slots()
+
 
-def add_job(f: Callable | str, chat_id: int, **func_kwargs) -> Job:
-    """Add single bday_job to Scheduler for a single tg_chat."""
-    return Scheduler.add_job(
-        f,
-        # "app.handlers.bdays:get_bdays_job",
-        # trigger=CronTrigger(day_of_week="mon-sun", hour=23, minute=9),
-        "interval",
-        seconds=10,
-        # "cron",
-        # day_of_week="mon-sun",
-        # hour=9,
-        kwargs={"bot_path": "app.bot:bot", "chat_id": chat_id, **func_kwargs},
-        replace_existing=True,
-        id=str(chat_id),
-    )
-
-
-def add_preload_job():
-    return Scheduler.add_job(
-        "app.file_parser:run_preload",
-        "cron",
-        day_of_week="mon-sun",
-        hour=0,
-        minute=7,
-        kwargs={"bot_path": "app.bot:bot"},
-        replace_existing=True,
-        id="1",
-    )
+@profiler.wrap
+async def sync_mailing_slots() -> None:
+    """Schedule mailing slots of chats subscribed via other replicas."""
+    await Scheduler.load_subscribed_slots()
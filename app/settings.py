@@ -1,3 +1,4 @@
+import datetime as dt
 from pathlib import Path
 
 from decouple import config
@@ -15,9 +16,17 @@ YADISK_TOKEN_TEST = config("YADISK_TOKEN_TEST")
 YANDEX_APP_ID = config("YANDEX_APP_ID")
 YANDEX_SECRET_CLIENT = config("YANDEX_SECRET_CLIENT")
 YADISK_FILEPATH = "disk:/b_day/b_days.xlsx"
+YADISK_POOL_SIZE = config("YADISK_POOL_SIZE", default=10, cast=int)
+YADISK_KEEPALIVE_TIMEOUT = config(
+    "YADISK_KEEPALIVE_TIMEOUT", default=60.0, cast=float
+)
 
 OUTPUT_FILE_NAME = "temp.xlsx"
+PARSE_CACHE_DIR = config("PARSE_CACHE_DIR", default="")
 TIME_API_URL = "http://worldtimeapi.org/api/timezone/Europe/Moscow"
+CLOCK_SYNC_INTERVAL = config("CLOCK_SYNC_INTERVAL", default=3600, cast=float)
+CLOCK_RETRY_INTERVAL = config("CLOCK_RETRY_INTERVAL", default=60, cast=float)
+CLOCK_SYNC_TIMEOUT = config("CLOCK_SYNC_TIMEOUT", default=3, cast=float)
 
 COLUMNS = ("Дата", "месяц", "ФИО")
 FUTURE_SCOPE = 3
@@ -25,6 +34,82 @@ TIME_ZONE = timezone("Europe/Moscow")
 
 DEBUG = True
 
+# `polling` (getUpdates) or `webhook` (updates pushed to local web server)
+BOT_MODE = config("BOT_MODE", default="polling")
+# public base URL Telegram sends updates to, e.g. `https://example.com`
+WEBHOOK_HOST = config("WEBHOOK_HOST", default="")
+WEBHOOK_PATH = config("WEBHOOK_PATH", default="/webhook/bot")
+# checked against `X-Telegram-Bot-Api-Secret-Token` header if set
+WEBHOOK_SECRET = config("WEBHOOK_SECRET", default="")
+WEBAPP_HOST = config("WEBAPP_HOST", default="127.0.0.1")
+WEBAPP_PORT = config("WEBAPP_PORT", default=8080, cast=int)
+
+# birthday file reader: `openpyxl` streams sheet rows without pandas,
+# `pandas` reads the whole sheet into a dataframe
+PARSE_ENGINE = config("PARSE_ENGINE", default="openpyxl")
+
+# executor for blocking file parsing: `thread`, `process` or `inline`
+PARSE_EXECUTOR = config("PARSE_EXECUTOR", default="thread")
+PARSE_EXECUTOR_WORKERS = config("PARSE_EXECUTOR_WORKERS", default=1, cast=int)
+
+# scheduled mailing: chats served concurrently and Telegram limits
+MAILING_CONCURRENCY = config("MAILING_CONCURRENCY", default=10, cast=int)
+MAILING_MAX_RETRIES = config("MAILING_MAX_RETRIES", default=3, cast=int)
+# default local (TIME_ZONE) time of daily mailing for new subscriptions
+MAILING_TIME = config(
+    "MAILING_TIME", default="09:00", cast=dt.time.fromisoformat
+)
+# messages per second for all chats (Telegram allows about 30)
+TELEGRAM_GLOBAL_RATE = config("TELEGRAM_GLOBAL_RATE", default=25, cast=float)
+# seconds between messages to one private chat and one group
+TELEGRAM_CHAT_INTERVAL = config(
+    "TELEGRAM_CHAT_INTERVAL", default=1.0, cast=float
+)
+TELEGRAM_GROUP_INTERVAL = config(
+    "TELEGRAM_GROUP_INTERVAL", default=3.0, cast=float
+)
+
+# replicas sharing app database elect one scheduler leader via a lease:
+# crashed leader is replaced within LEADER_LEASE_TTL + LEADER_RENEW_INTERVAL
+LEADER_LEASE_TTL = config("LEADER_LEASE_TTL", default=15.0, cast=float)
+LEADER_RENEW_INTERVAL = config(
+    "LEADER_RENEW_INTERVAL", default=5.0, cast=float
+)
+# seconds until the leader schedules jobs for chats subscribed via
+# other replicas (their subscriptions are only saved to the database)
+MAILING_SLOTS_SYNC_INTERVAL = config(
+    "MAILING_SLOTS_SYNC_INTERVAL", default=30, cast=int
+)
+
+# Prometheus metrics served at http://METRICS_HOST:METRICS_PORT/metrics;
+# disabled metrics cost next to nothing
+METRICS_ENABLED = config("METRICS_ENABLED", default=False, cast=bool)
+METRICS_HOST = config("METRICS_HOST", default="127.0.0.1")
+METRICS_PORT = config("METRICS_PORT", default=9102, cast=int)
+
+# cProfile scheduled jobs and bot handlers; may also be switched
+# at runtime by bot manager with `/profile on|off`
+PROFILING_ENABLED = config("PROFILING_ENABLED", default=False, cast=bool)
+PROFILE_DIR = config("PROFILE_DIR", default="profiles")
+# slowest invocations kept for `/profile top` and profile files kept
+PROFILE_TOP_N = config("PROFILE_TOP_N", default=20, cast=int)
+PROFILE_MAX_FILES = config("PROFILE_MAX_FILES", default=200, cast=int)
+
+# log every SQL statement; independent of DEBUG as it is too noisy
+DB_ECHO = config("DB_ECHO", default=False, cast=bool)
+# connections kept open per SQLite engine (shared by executor threads)
+DB_POOL_SIZE = config("DB_POOL_SIZE", default=5, cast=int)
+DB_POOL_TIMEOUT = config("DB_POOL_TIMEOUT", default=30, cast=float)
+# applied to every new SQLite connection
+SQLITE_PRAGMAS = {
+    "journal_mode": config("SQLITE_JOURNAL_MODE", default="WAL"),
+    "synchronous": config("SQLITE_SYNCHRONOUS", default="NORMAL"),
+    "mmap_size": config("SQLITE_MMAP_SIZE", default=64 * 2**20, cast=int),
+    # negative value is a size in KiB, positive - in pages
+    "cache_size": config("SQLITE_CACHE_SIZE", default=-16 * 2**10, cast=int),
+    "busy_timeout": config("SQLITE_BUSY_TIMEOUT", default=5000, cast=int),
+}
+
 DB = {
     "app": {"engine": "sqlite", "driver": "", "name": config("APP_DB_NAME")},
     "jobstore": {
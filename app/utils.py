@@ -1,16 +1,16 @@
+import asyncio
 import datetime as dt
 import logging
+import time
 from functools import partial
-from logging.config import fileConfig
 
 import aiogram
 import pytz
 from aiogram import Bot, types
-from aiohttp import ClientSession
+from aiohttp import ClientSession, ClientTimeout
 
 from app import settings
 
-fileConfig(fname="log_config.conf", disable_existing_loggers=False)
 logger = logging.getLogger(__name__)
 TIME_API_URL = "http://worldtimeapi.org/api/timezone/Europe/Moscow"
 
@@ -66,12 +66,128 @@ async def get_current_date(session: ClientSession, url: str) -> dt.date:
     return today
 
 
+class Clock:
+    """
+    Current date provider for `settings.TIME_ZONE`.
+    System time is checked against external time API at most once
+    per `sync_interval` seconds (`retry_interval` after a failure).
+    The offset between them is cached, so current date is computed
+    without any I/O. Checks run in the background: callers never wait
+    for the API and get system time until the first check succeeds.
+    """
+
+    def __init__(
+        self,
+        url: str = settings.TIME_API_URL,
+        sync_interval: float = settings.CLOCK_SYNC_INTERVAL,
+        retry_interval: float = settings.CLOCK_RETRY_INTERVAL,
+        timeout: float = settings.CLOCK_SYNC_TIMEOUT,
+        tz: dt.tzinfo = settings.TIME_ZONE,
+    ) -> None:
+        self.url = url
+        self.sync_interval = sync_interval
+        self.retry_interval = retry_interval
+        self.timeout = timeout
+        self.tz = tz
+        self.offset = dt.timedelta(0)
+        self.syncs = 0
+        self.failures = 0
+        self._next_sync = 0.0
+        self._sync_task = None
+
+    def now(self) -> dt.datetime:
+        """Return current datetime corrected by the cached offset."""
+        return dt.datetime.now(tz=self.tz) + self.offset
+
+    def today(self) -> dt.date:
+        """Return current date; schedule offset check if it is due."""
+        self.schedule_sync()
+        return self.now().date()
+
+    @property
+    def sync_due(self) -> bool:
+        return time.monotonic() >= self._next_sync
+
+    def schedule_sync(self) -> asyncio.Task | None:
+        """Start background offset check if it is due and loop is running."""
+        if not self.sync_due or (
+            self._sync_task is not None and not self._sync_task.done()
+        ):
+            return None
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return None
+        self._sync_task = loop.create_task(self.sync())
+        return self._sync_task
+
+    async def sync(self) -> bool:
+        """Fetch time from external API and update the cached offset."""
+        started_at = dt.datetime.now(tz=self.tz)
+        try:
+            async with ClientSession(
+                timeout=ClientTimeout(total=self.timeout)
+            ) as session:
+                async with session.get(self.url) as response:
+                    response.raise_for_status()
+                    resp_data = await response.json()
+            # `datetime` is <str> with format `2022-12-15T00:03:42.431581+03:00`
+            remote_now = dt.datetime.fromisoformat(resp_data["datetime"])
+        except Exception as e:
+            self.failures += 1
+            self._next_sync = time.monotonic() + self.retry_interval
+            logger.warning(
+                "Не удалось получить время от стороннего API "
+                f"({e!r}). Используется системное время "
+                f"со смещением {self.offset}."
+            )
+            return False
+
+        finished_at = dt.datetime.now(tz=self.tz)
+        # remote time corresponds to the middle of the request
+        self.offset = remote_now - (
+            started_at + (finished_at - started_at) / 2
+        )
+        self.syncs += 1
+        self._next_sync = time.monotonic() + self.sync_interval
+        logger.info(f"Время синхронизировано с {self.url}: {self}")
+        return True
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(offset={self.offset}, "
+            f"syncs={self.syncs}, failures={self.failures})"
+        )
+
+
+clock = Clock()
+
+
 def timestamp_to_datetime_string(ts: float) -> str:
     """Convert timestamp to a datetime string."""
     date = dt.datetime.fromtimestamp(ts, tz=settings.TIME_ZONE)
     return f"{date: %d-%m-%Y %H:%M}"
 
 
+def parse_mailing_schedule(args: str) -> tuple[dt.time, str]:
+    """
+    Parse `/addchat` command arguments: optional mailing time `HH:MM`
+    and optional timezone name, e.g. `08:30 Asia/Yekaterinburg`.
+    Missing values default to `settings.MAILING_TIME` and
+    `settings.TIME_ZONE`. Raise `ValueError` for invalid values.
+    """
+    mailing_time, timezone = settings.MAILING_TIME, settings.TIME_ZONE.zone
+    for arg in args.split():
+        if ":" in arg and arg[0].isdigit():
+            mailing_time = dt.datetime.strptime(arg, "%H:%M").time()
+        else:
+            try:
+                timezone = pytz.timezone(arg).zone
+            except pytz.UnknownTimeZoneError:
+                raise ValueError(f"Unknown timezone: {arg}")
+    return mailing_time, timezone
+
+
 class MsgProvider:
     """Class for abstracting telegram message delivery process."""
 
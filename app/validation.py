@@ -0,0 +1,170 @@
+import operator
+from typing import Any, Callable
+
+import numpy as np
+import pandas as pd
+
+# operators numpy can apply elementwise with the same result
+# as applying them to every single value
+COMPARISON_OPERATORS = ("lt", "le", "eq", "ne", "ge", "gt")
+
+get_types = np.frompyfunc(type, 1, 1)
+
+
+class ValidationReport:
+    """Summary of a dataframe validation: rows rejected by each rule."""
+
+    def __init__(self, total: int, rejected: dict[str, int]) -> None:
+        self.total = total
+        self.rejected = rejected
+
+    @property
+    def invalid(self) -> int:
+        return sum(self.rejected.values())
+
+    @property
+    def valid(self) -> int:
+        return self.total - self.invalid
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(total={self.total}, "
+            f"valid={self.valid}, rejected={self.rejected})"
+        )
+
+
+class Rule:
+    """Single schema condition compiled into a column mask builder."""
+
+    def __init__(self, field: str, attr: str, expected: Any) -> None:
+        self.field = field
+        self.attr = attr
+        self.expected = expected
+        self._check = self._compile()
+
+    @property
+    def name(self) -> str:
+        return f"{self.field}.{self.attr}"
+
+    def _compile(self) -> Callable[[np.ndarray], np.ndarray] | None:
+        if self.attr == "type":
+            return self._check_type
+        if self.attr == "call":
+            return self._check_call
+        operation = getattr(operator, self.attr, None)
+        if operation is None:
+            return None
+        if self.attr in COMPARISON_OPERATORS:
+            return lambda values: np.asarray(
+                operation(values, self.expected), dtype=bool
+            )
+        return lambda values: np.fromiter(
+            (bool(operation(v, self.expected)) for v in values),
+            dtype=bool,
+            count=len(values),
+        )
+
+    def _check_type(self, values: np.ndarray) -> np.ndarray:
+        if values.dtype != object:
+            # every value of a typed array is the same numpy scalar type
+            return np.full(len(values), values.dtype.type == self.expected)
+        return np.asarray(get_types(values) == self.expected, dtype=bool)
+
+    def _check_call(self, values: np.ndarray) -> np.ndarray:
+        f, target_res = self.expected
+        return np.fromiter(
+            (bool(f(v) == target_res) for v in values),
+            dtype=bool,
+            count=len(values),
+        )
+
+    @property
+    def is_applicable(self) -> bool:
+        return self._check is not None
+
+    def __call__(self, values: np.ndarray) -> np.ndarray:
+        return self._check(values)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.name}={self.expected!r})"
+
+
+class CompiledSchema:
+    """
+    Validation schema compiled into boolean column masks.
+    Gives exactly the same result as checking dataframe rows one by one
+    with `validate_df_row`, but validates the whole dataframe in one pass.
+    """
+
+    def __init__(self, schema: dict) -> None:
+        self.schema = schema
+        self.fields = [
+            (
+                field,
+                [
+                    Rule(field, attr, expected)
+                    for attr, expected in conditions["cond"].items()
+                ],
+            )
+            for field, conditions in schema.items()
+        ]
+
+    @property
+    def rules(self) -> list[Rule]:
+        return [rule for _, rules in self.fields for rule in rules]
+
+    def validate(
+        self, df: pd.DataFrame
+    ) -> tuple[np.ndarray, ValidationReport]:
+        """
+        Return boolean mask of valid dataframe rows
+        and a report with number of rows rejected by each rule.
+        Row is rejected by the first rule it fails.
+        """
+        rules = [rule for rule in self.rules if rule.is_applicable]
+        rejected = {rule.name: 0 for rule in rules}
+        valid = np.ones(len(df), dtype=bool)
+        if df.empty:
+            return valid, ValidationReport(len(df), rejected)
+
+        row_dtype = df.iloc[0].dtype
+        for field, field_rules in self.fields:
+            if field not in df.columns:
+                continue
+            values = row_values(df[field], row_dtype)
+            # falsy values are not validated at all
+            checked = valid & values.astype(bool)
+            for rule in field_rules:
+                if not rule.is_applicable:
+                    continue
+                indices = np.flatnonzero(checked)
+                if not indices.size:
+                    break
+                failed = indices[~rule(values[indices])]
+                valid[failed] = False
+                checked[failed] = False
+                rejected[rule.name] += failed.size
+        return valid, ValidationReport(len(df), rejected)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.rules})"
+
+
+def row_values(column: pd.Series, row_dtype: np.dtype) -> np.ndarray:
+    """
+    Return column values the way they are seen when dataframe
+    is accessed row by row with `df.loc[i]`: rows of a mixed dataframe
+    keep numpy scalars, rows of a numeric one are cast to a common type.
+    """
+    if row_dtype != object:
+        return column.to_numpy(dtype=row_dtype)
+    if column.dtype.kind in "biuf":
+        return column.to_numpy()
+    return column.to_numpy(dtype=object)
+
+
+def compile_schema(schema: dict | CompiledSchema) -> CompiledSchema:
+    """Compile validation schema unless it is compiled already."""
+    if isinstance(schema, CompiledSchema):
+        return schema
+    return CompiledSchema(schema)
@@ -0,0 +1,98 @@
+import logging
+from typing import Callable
+
+from aiogram import Dispatcher
+from aiogram.dispatcher.webhook import WebhookRequestHandler
+from aiogram.utils.executor import Executor
+from aiohttp import web
+
+from app import settings
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+class SecretWebhookRequestHandler(WebhookRequestHandler):
+    """
+    Webhook request handler which accepts only requests carrying
+    `settings.WEBHOOK_SECRET` token, so updates can not be forged
+    by anyone who guessed webhook path.
+    """
+
+    async def post(self) -> web.Response:
+        secret = settings.WEBHOOK_SECRET
+        if secret and self.request.headers.get(SECRET_HEADER) != secret:
+            logger.warning(
+                f"Webhook request without valid secret token "
+                f"from {self.request.remote}"
+            )
+            raise web.HTTPUnauthorized()
+        return await super().post()
+
+
+def webhook_url() -> str:
+    return f"{settings.WEBHOOK_HOST.rstrip('/')}{settings.WEBHOOK_PATH}"
+
+
+async def register_webhook(dp: Dispatcher) -> None:
+    """
+    Point Telegram to this server's webhook.
+    Updates received while bot was down are dropped, like
+    `skip_updates` does in polling mode.
+    """
+    if not settings.WEBHOOK_HOST:
+        logger.warning("WEBHOOK_HOST is not set: webhook is not registered")
+        return
+    await dp.bot.set_webhook(
+        webhook_url(),
+        drop_pending_updates=True,
+        secret_token=settings.WEBHOOK_SECRET or None,
+    )
+    logger.info(f"Webhook registered: {webhook_url()}")
+
+
+async def unregister_webhook(dp: Dispatcher) -> None:
+    if settings.WEBHOOK_HOST:
+        await dp.bot.delete_webhook()
+        logger.info("Webhook removed")
+
+
+def create_webhook_app(
+    dp: Dispatcher,
+    on_startup: Callable | list[Callable] = None,
+    on_shutdown: Callable | list[Callable] = None,
+    path: str = None,
+) -> web.Application:
+    """
+    Create aiohttp application serving Telegram updates sent
+    to `path` (`settings.WEBHOOK_PATH` by default) with `dp`.
+    `on_startup` and `on_shutdown` hooks are the same as for polling:
+    they are called with `dp` when application starts and stops.
+    """
+    executor = Executor(dp)
+    if on_startup is not None:
+        executor.on_startup(on_startup, polling=False)
+    if on_shutdown is not None:
+        executor.on_shutdown(on_shutdown, polling=False)
+    executor.set_webhook(
+        path or settings.WEBHOOK_PATH,
+        request_handler=SecretWebhookRequestHandler,
+        web_app=web.Application(),
+    )
+    return executor.web_app
+
+
+def start_webhook(
+    dp: Dispatcher, on_startup: Callable = None, on_shutdown: Callable = None
+) -> None:
+    """
+    Run bot in webhook mode: serve updates on `settings.WEBAPP_HOST`
+    and `settings.WEBAPP_PORT` and register webhook on startup.
+    """
+    app = create_webhook_app(
+        dp,
+        on_startup=[register_webhook, *filter(None, [on_startup])],
+        on_shutdown=[unregister_webhook, *filter(None, [on_shutdown])],
+    )
+    web.run_app(app, host=settings.WEBAPP_HOST, port=settings.WEBAPP_PORT)
@@ -0,0 +1,110 @@
+import logging
+import math
+import operator
+from collections import Counter
+from typing import Any, BinaryIO, Iterator, Sequence
+
+logger = logging.getLogger(__name__)
+
+# cell texts pandas reads as missing values
+NA_STRINGS = frozenset(
+    (
+        "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan",
+        "1.#IND", "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None",
+        "n/a", "nan", "null",
+    )
+)  # fmt: skip
+
+
+def cell_value(value: Any) -> Any:
+    """
+    Return cell value typed as in a dataframe read by `pd.read_excel`:
+    integral numbers are ints, empty cells are NaN.
+    """
+    if value is None or (isinstance(value, str) and value in NA_STRINGS):
+        return math.nan
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def read_sheet_rows(
+    file: str | BinaryIO, columns: Sequence[str]
+) -> Iterator[tuple]:
+    """
+    Stream rows of the active sheet of xlsx `file` as tuples
+    of `columns` values; columns are found by the header row.
+    Blank rows are skipped, missing columns are read as NaN.
+    Workbook is read in openpyxl read-only mode one row at a time,
+    so memory use does not grow with the file size.
+    """
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, ())
+        positions = {}
+        for position, name in enumerate(header):
+            positions.setdefault(name, position)
+        indices = [positions.get(column) for column in columns]
+        for row in rows:
+            if all(value is None for value in row):
+                continue
+            yield tuple(
+                (
+                    cell_value(row[i])
+                    if i is not None and i < len(row)
+                    else math.nan
+                )
+                for i in indices
+            )
+    finally:
+        workbook.close()
+
+
+def first_failed_rule(row: dict[str, Any], schema: dict) -> str | None:
+    """
+    Return name (`field.attr`) of the first `schema` rule `row` fails
+    or None if it is valid. Rules are the same as in `validate_df_row`:
+    falsy values are not validated, unknown rules are ignored.
+    """
+    for field, conditions in schema.items():
+        value = row.get(field)
+        if not value:
+            continue
+        for attr, expected in conditions["cond"].items():
+            if attr == "type":
+                valid = type(value) == expected
+            elif attr == "call":
+                f, target_res = expected
+                valid = f(value) == target_res
+            else:
+                operation = getattr(operator, attr, None)
+                if operation is None:
+                    continue
+                valid = operation(value, expected)
+            if not valid:
+                return f"{field}.{attr}"
+    return None
+
+
+def read_valid_rows(
+    file: str | BinaryIO, schema: dict, columns: Sequence[str]
+) -> Iterator[tuple]:
+    """
+    Stream `columns` values of sheet rows which pass `schema`.
+    Number of rows rejected by each rule is logged when done.
+    """
+    total, rejected = 0, Counter()
+    for values in read_sheet_rows(file, columns):
+        total += 1
+        rule = first_failed_rule(dict(zip(columns, values)), schema)
+        if rule is None:
+            yield values
+        else:
+            rejected[rule] += 1
+    logger.info(
+        f"Sheet validation: total={total}, "
+        f"valid={total - sum(rejected.values())}, rejected={dict(rejected)}"
+    )
@@ -1,33 +1,270 @@
+import asyncio
+import hashlib
+import io
 import logging
-from logging.config import fileConfig
+import os
+import tempfile
+import threading
+from pathlib import Path
 
+import aiohttp
 from yadisk_async import YaDisk
+from yadisk_async.session import SessionWithHeaders
 
-from app import settings
+from app import metrics, settings
 
-fileConfig(fname="log_config.conf", disable_existing_loggers=False)
 logger = logging.getLogger(__name__)
 
-disk = YaDisk(token=settings.YADISK_TOKEN_TEST)
 
+class PoolStats:
+    """HTTP connection pool usage statistics collected via aiohttp tracing."""
 
-async def download_file_from_yadisk(
-    source_path: str, output_file: str, disk: YaDisk = disk
-) -> bool:
+    def __init__(self) -> None:
+        self.requests = 0
+        self.connections_created = 0
+        self.connections_reused = 0
+        self.trace_config = aiohttp.TraceConfig()
+        self.trace_config.on_request_start.append(self._on_request_start)
+        self.trace_config.on_connection_create_end.append(
+            self._on_connection_create_end
+        )
+        self.trace_config.on_connection_reuseconn.append(
+            self._on_connection_reuseconn
+        )
+
+    async def _on_request_start(self, *args) -> None:
+        self.requests += 1
+
+    async def _on_connection_create_end(self, *args) -> None:
+        self.connections_created += 1
+
+    async def _on_connection_reuseconn(self, *args) -> None:
+        self.connections_reused += 1
+
+    def as_dict(self) -> dict[str, int]:
+        return {
+            "requests": self.requests,
+            "connections_created": self.connections_created,
+            "connections_reused": self.connections_reused,
+        }
+
+    def __repr__(self) -> str:
+        stats = ", ".join(f"{k}={v}" for k, v in self.as_dict().items())
+        return f"{self.__class__.__name__}({stats})"
+
+
+class PooledYaDisk(YaDisk):
+    """
+    `YaDisk` client which keeps its HTTP sessions and keep-alive
+    connections open between requests until `close` is called.
+    All sessions share one connection pool of `pool_size` connections.
+    """
+
+    def __init__(
+        self,
+        *args,
+        pool_size: int = settings.YADISK_POOL_SIZE,
+        keepalive_timeout: float = settings.YADISK_KEEPALIVE_TIMEOUT,
+        **kwargs,
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        self.pool_size = pool_size
+        self.keepalive_timeout = keepalive_timeout
+        self.pool_stats = PoolStats()
+        self._connector = None
+
+    @property
+    def is_open(self) -> bool:
+        return self._connector is not None and not self._connector.closed
+
+    def _get_connector(self) -> aiohttp.TCPConnector:
+        if not self.is_open:
+            self._connector = aiohttp.TCPConnector(
+                limit=self.pool_size, keepalive_timeout=self.keepalive_timeout
+            )
+        return self._connector
+
+    async def start(self) -> None:
+        """Open connection pool. Must be called from the running loop."""
+        self.get_session()
+        logger.info(f"YaDisk client started: {self.pool_stats}")
+
+    def make_session(self, token: str = None) -> SessionWithHeaders:
+        """Same as `YaDisk.make_session`, but uses shared connection pool."""
+        if token is None:
+            token = self.token
+
+        session = SessionWithHeaders(
+            connector=self._get_connector(),
+            connector_owner=False,
+            trace_configs=[self.pool_stats.trace_config],
+        )
+        if token:
+            session.headers["Authorization"] = "OAuth " + token
+        return session
+
+    def get_session(self, token: str = None) -> SessionWithHeaders:
+        """
+        Same as `YaDisk.get_session`, but sessions made for another token
+        are closed and dropped from the cache once `token` is updated
+        (e.g. renewed with `/code`), instead of staying open until `close`.
+        """
+        if token is None:
+            token = self.token
+        for key in [key for key in self._sessions if key[0] != token]:
+            # sessions do not own the shared pool, so detaching closes them
+            self._sessions.pop(key).detach()
+        return self._get_session(token, threading.get_ident())
+
+    async def close(self) -> None:
+        """Close all sessions and the connection pool."""
+        await super().close()
+        if self._connector is not None:
+            await self._connector.close()
+            self._connector = None
+        logger.info(f"YaDisk client closed: {self.pool_stats}")
+
+
+disk = PooledYaDisk(token=settings.YADISK_TOKEN_TEST)
+
+
+def file_md5(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Return MD5 hex digest of file contents (as Yandex.Disk does)."""
+    digest = hashlib.md5()
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class FileContent:
+    """Immutable in-memory copy of a downloaded file."""
+
+    __slots__ = ("data", "md5")
+
+    def __init__(self, data: bytes, md5: str = None) -> None:
+        self.data = data
+        self.md5 = md5 or hashlib.md5(data).hexdigest()
+
+    def open(self) -> io.BytesIO:
+        """Return new independent file-like object with file contents."""
+        return io.BytesIO(self.data)
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(md5={self.md5}, size={len(self)})"
+
+
+def write_file_atomically(path: str, data: bytes) -> None:
+    """
+    Write data to a temporary file and move it to `path`,
+    so readers never see a partially written file.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class YaDiskFileSync:
+    """
+    Keeps in-memory copy of a Yandex.Disk file up to date.
+    Remote file metadata is requested first and file is downloaded
+    only if its `md5` differs from the copy.
+    Counts `hits` (download skipped) and `misses` (file downloaded).
+    """
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.remote_modified = None
+        # local file md5 memo: (path, mtime, size) -> md5
+        self._local = (None, None)
+        self._content = None
+
+    def local_md5(self, path: str) -> str | None:
+        """Return MD5 of the local file or None if there is no such file."""
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        key = (path, stat.st_mtime_ns, stat.st_size)
+        if self._local[0] != key:
+            self._local = (key, file_md5(path))
+        return self._local[1]
+
+    async def fetch(
+        self,
+        source_path: str,
+        disk: YaDisk = disk,
+        fallback_file: str = None,
+    ) -> FileContent:
+        """
+        Return in-memory contents of Yandex.Disk file.
+        File is streamed straight into memory and downloaded only if it
+        differs from the previously fetched one. If `fallback_file` is set,
+        changed contents are also saved there for use when Yandex.Disk
+        is unavailable. Local file I/O and hashing run in a thread,
+        so they do not block the event loop.
+        """
+        meta = await disk.get_meta(
+            source_path, fields=["md5", "modified", "size"]
+        )
+        self.remote_modified = meta.modified
+        if self._content is None and fallback_file is not None and meta.md5:
+            local_md5 = await asyncio.to_thread(self.local_md5, fallback_file)
+            if meta.md5 == local_md5:
+                # fallback copy saved before restart is still up to date
+                data = await asyncio.to_thread(Path(fallback_file).read_bytes)
+                self._content = FileContent(data, meta.md5)
+        if self._content is not None and meta.md5 == self._content.md5:
+            self.hits += 1
+            metrics.count_cache_lookup("yadisk_file", hit=True)
+            logger.info(f"YaDisk file not modified, download skipped: {self}")
+            return self._content
+
+        buffer = io.BytesIO()
+        await disk.download(source_path, buffer)
+        content = await asyncio.to_thread(FileContent, buffer.getvalue())
+        self.misses += 1
+        metrics.count_cache_lookup("yadisk_file", hit=False)
+        logger.info(f"YaDisk file download SUCCESS!: {self}")
+        if meta.md5 and meta.md5 != content.md5:
+            logger.warning("Downloaded YaDisk file md5 does not match meta")
+        self._content = content
+        if fallback_file is not None:
+            await asyncio.to_thread(
+                write_file_atomically, fallback_file, content.data
+            )
+        return content
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(hits={self.hits}, "
+            f"misses={self.misses}, remote_modified={self.remote_modified})"
+        )
+
+
+file_sync = YaDiskFileSync()
+
+
+async def fetch_file_from_yadisk(
+    source_path: str, fallback_file: str = None, disk: YaDisk = disk
+) -> FileContent:
     """
-    Asynchronously download file from Yandex.Disk.
-    In case of failure send a message to request starter.
+    Download file from Yandex.Disk into memory
+    unless it has not changed since previous fetch.
     """
-    downloaded = False
     try:
-        await disk.download(source_path, output_file)
+        with metrics.stage_seconds.labels(stage="download").time():
+            return await file_sync.fetch(source_path, disk, fallback_file)
     except Exception as e:
-        error_message = f"YaDisk file download FAILURE!: {e}"
-        logger.error(error_message)
+        logger.error(f"YaDisk file fetch FAILURE!: {e}")
         raise
-    else:
-        downloaded = True
-        logger.info("YaDisk file download SUCCESS!")
-    finally:
-        await disk.close()
-        return downloaded
@@ -0,0 +1,124 @@
+"""
+Compare today/upcoming birthday queries on a SQLite file with the legacy
+`birthday` table (full date range scan) and after `upgrade_schema`
+(month/day index range scan). Upcoming window crosses New Year,
+which legacy queries miss.
+
+Usage: python -m benchmarks.bench_birthday_queries [--rows 200000]
+"""
+
+import argparse
+import datetime as dt
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.orm import Session
+
+from app.db import models
+from app.db.migrations import upgrade_schema
+
+TODAY = dt.date(2023, 12, 30)
+REPEAT = 50
+
+LEGACY_BIRTHDAY_TABLE = """
+CREATE TABLE birthday (
+    id INTEGER NOT NULL PRIMARY KEY,
+    name VARCHAR(128) UNIQUE,
+    date DATE
+)
+"""
+
+
+def make_rows(rows: int, seed: int = 0) -> list[dict]:
+    rng = random.Random(seed)
+    # legacy `update_db_from_yadisk` stored birthdays with the current year
+    first = dt.date(TODAY.year, 1, 1)
+    span = 365
+    return [
+        {
+            "name": f"name{i}",
+            "date": (
+                first + dt.timedelta(days=rng.randrange(span))
+            ).isoformat(),
+        }
+        for i in range(rows)
+    ]
+
+
+WINDOWS = (
+    (TODAY, TODAY),
+    (TODAY + dt.timedelta(days=1), TODAY + dt.timedelta(days=3)),
+)
+
+
+def legacy_queries(session: Session) -> int:
+    """Old `today` and `future` queries: `date` range scans."""
+    Birthday = models.Birthday
+    return sum(
+        len(
+            session.execute(
+                select(Birthday.id).where(Birthday.date.between(start, end))
+            ).all()
+        )
+        for start, end in WINDOWS
+    )
+
+
+def indexed_queries(session: Session) -> int:
+    """New `today` and `future` queries: `month` and `day` range scans."""
+    Birthday = models.Birthday
+    return sum(
+        len(
+            session.execute(
+                select(Birthday.id).where(
+                    Birthday.queries._recurring_between(start, end)
+                )
+            ).all()
+        )
+        for start, end in WINDOWS
+    )
+
+
+def measure(name: str, session: Session, queries) -> None:
+    found = queries(session)
+    started_at = time.perf_counter()
+    for _ in range(REPEAT):
+        queries(session)
+    elapsed = (time.perf_counter() - started_at) / REPEAT
+    print(
+        f"{name:<22} {elapsed * 1000:9.3f} ms per today+future  ({found} rows)"
+    )
+
+
+def main(rows: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        engine = create_engine(f"sqlite:///{Path(tmp_dir) / 'bench.sqlite3'}")
+        with engine.begin() as conn:
+            conn.execute(text(LEGACY_BIRTHDAY_TABLE))
+            conn.execute(
+                text(
+                    "INSERT INTO birthday (name, date) VALUES (:name, :date)"
+                ),
+                make_rows(rows),
+            )
+        with Session(engine) as session:
+            measure("legacy date scan", session, legacy_queries)
+
+        started_at = time.perf_counter()
+        upgrade_schema(engine)
+        print(
+            f"upgrade_schema         {time.perf_counter() - started_at:9.3f} s"
+        )
+
+        with Session(engine) as session:
+            measure("month/day index", session, indexed_queries)
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=200_000)
+    main(parser.parse_args().rows)
@@ -0,0 +1,145 @@
+"""
+Simulate daily mailing load for realistic subscription distributions.
+Chats are grouped into buckets by UTC minute of their local mailing
+time (as the scheduler does); every bucket is dispatched at the start
+of its minute and messages are sent at `TELEGRAM_GLOBAL_RATE`.
+Reports number of buckets, peak demand (messages due in one second),
+peak sends per second, seconds spent at the rate limit and
+delivery delays.
+
+Distributions:
+  legacy     all chats at 09:00 Europe/Moscow (one job for everybody)
+  moscow     Europe/Moscow, times preferred by users around 09:00
+  russia     same times spread over Russian timezones
+  worldwide  same times spread over timezones around the world
+
+Usage: python -m benchmarks.bench_mailing_buckets [--chats 50000]
+"""
+
+import argparse
+import datetime as dt
+import random
+from collections import Counter, deque
+
+from app import settings
+from app.db.models import utc_minute
+
+MESSAGES_PER_CHAT = 3
+DATE = dt.date(2023, 3, 1)
+RUSSIA = {
+    "Europe/Kaliningrad": 2,
+    "Europe/Moscow": 55,
+    "Europe/Samara": 6,
+    "Asia/Yekaterinburg": 12,
+    "Asia/Omsk": 4,
+    "Asia/Novosibirsk": 9,
+    "Asia/Krasnoyarsk": 5,
+    "Asia/Irkutsk": 3,
+    "Asia/Vladivostok": 4,
+}
+WORLDWIDE = {
+    "America/Los_Angeles": 10,
+    "America/New_York": 15,
+    "America/Sao_Paulo": 8,
+    "Europe/London": 10,
+    "Europe/Berlin": 15,
+    "Europe/Moscow": 15,
+    "Asia/Kolkata": 10,
+    "Asia/Shanghai": 10,
+    "Asia/Tokyo": 7,
+}
+
+
+def preferred_time(rng: random.Random) -> dt.time:
+    """Most users keep 09:00, others pick a round time around it."""
+    if rng.random() < 0.5:
+        return dt.time(9)
+    minutes = round(rng.gauss(9 * 60, 60) / 15) * 15
+    return dt.time(*divmod(min(max(minutes, 6 * 60), 12 * 60), 60))
+
+
+def subscriptions(distribution: str, chats: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    if distribution == "legacy":
+        return [(dt.time(9), "Europe/Moscow")] * chats
+    if distribution == "moscow":
+        timezones = {"Europe/Moscow": 1}
+    else:
+        timezones = RUSSIA if distribution == "russia" else WORLDWIDE
+    names, weights = list(timezones), list(timezones.values())
+    return [
+        (preferred_time(rng), rng.choices(names, weights)[0])
+        for _ in range(chats)
+    ]
+
+
+def simulate(buckets: Counter, rate: float) -> dict:
+    """Send bucket messages in FIFO order at `rate` messages per second."""
+    arrivals = {
+        minute * 60: chats * MESSAGES_PER_CHAT
+        for minute, chats in buckets.items()
+    }
+    queue = deque()
+    delays = Counter()
+    peak_sends = saturated = 0
+    second = min(arrivals)
+    budget = 0.0
+    while queue or second <= max(arrivals):
+        if second in arrivals:
+            queue.append([second, arrivals[second]])
+        # unused sends do not accumulate beyond one second
+        budget = min(budget + rate, rate)
+        sends = 0
+        while queue and budget >= 1:
+            arrived_at, count = queue[0]
+            batch = min(count, int(budget))
+            delays[second - arrived_at] += batch
+            sends += batch
+            budget -= batch
+            if batch == count:
+                queue.popleft()
+            else:
+                queue[0][1] -= batch
+        peak_sends = max(peak_sends, sends)
+        saturated += sends >= int(rate)
+        second += 1
+    total = sum(delays.values())
+    p95, seen = 0, 0
+    for delay in sorted(delays):
+        seen += delays[delay]
+        if seen >= total * 0.95:
+            p95 = delay
+            break
+    return {
+        "buckets": len(buckets),
+        "peak_demand": max(arrivals.values()),
+        "peak_sends": peak_sends,
+        "saturated": saturated,
+        "p95_delay": p95,
+        "max_delay": max(delays),
+    }
+
+
+def main(chats: int) -> None:
+    rate = settings.TELEGRAM_GLOBAL_RATE
+    print(f"{chats} chats, {MESSAGES_PER_CHAT} messages each, {rate}/s")
+    for distribution in ("legacy", "moscow", "russia", "worldwide"):
+        buckets = Counter(
+            utc_minute(mailing_time, timezone, DATE)
+            for mailing_time, timezone in subscriptions(distribution, chats)
+        )
+        result = simulate(buckets, rate)
+        print(
+            f"{distribution:>9}  buckets {result['buckets']:>4}  "
+            f"peak demand {result['peak_demand']:>6}/s  "
+            f"peak sends {result['peak_sends']:>3}/s  "
+            f"saturated {result['saturated']:>5} s  "
+            f"delay p95 {result['p95_delay']:>5} s  "
+            f"max {result['max_delay']:>5} s"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chats", type=int, default=50_000)
+    main(parser.parse_args().chats)
@@ -0,0 +1,52 @@
+"""
+Measure event loop lag while a birthday workbook is being parsed
+inline (old behaviour), in a thread pool and in a process pool.
+
+Usage: python -m benchmarks.bench_offload [--rows 20000]
+"""
+
+import argparse
+import asyncio
+import io
+import time
+
+from app.concurrency import LoopLagMonitor, Offloader
+from app.file_parser import read_birthday_records
+from benchmarks.bench_validation import make_dataframe
+
+
+def make_workbook(rows: int) -> bytes:
+    buffer = io.BytesIO()
+    make_dataframe(rows).to_excel(buffer, index=False)
+    return buffer.getvalue()
+
+
+async def measure(kind: str, workbook: bytes) -> None:
+    offloader = Offloader(kind, max_workers=1)
+    monitor = LoopLagMonitor(interval=0.01)
+    monitor.start()
+    await asyncio.sleep(monitor.interval * 2)
+    started_at = time.perf_counter()
+    records = await offloader.run(read_birthday_records, io.BytesIO(workbook))
+    elapsed = time.perf_counter() - started_at
+    await asyncio.sleep(monitor.interval * 2)
+    await monitor.stop()
+    offloader.shutdown()
+    print(
+        f"{kind:<8} parse {elapsed:7.3f} s  rows {len(records):>8}  "
+        f"lag p50 {monitor.percentile(50) * 1000:8.1f} ms  "
+        f"p99 {monitor.percentile(99) * 1000:8.1f} ms  "
+        f"max {monitor.max_lag * 1000:8.1f} ms"
+    )
+
+
+async def main(rows: int) -> None:
+    workbook = make_workbook(rows)
+    for kind in Offloader.KINDS[::-1]:
+        await measure(kind, workbook)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=20_000)
+    asyncio.run(main(parser.parse_args().rows))
@@ -0,0 +1,175 @@
+"""
+Time every stage of the birthday pipeline on synthetic workbooks
+of increasing size in `settings.COLUMNS` layout (about 10% of rows
+are invalid) and save results as JSON, so runs made on different
+commits can be compared with `benchmarks.compare`.
+
+Stages: excel_to_pd_dataframe, preprocess_pd_dataframe, collect_bdays
+(whole file to notifications, parse cache disabled), refresh_table,
+sync_table (with 1% of rows changed) and Birthday.queries calls.
+Every stage is run `--repeat` times; min and median are reported.
+
+Usage: python -m benchmarks.bench_pipeline [--sizes 1000 10000 100000]
+           [--repeat 3] [--output pipeline.json]
+"""
+
+import argparse
+import datetime as dt
+import json
+import logging
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable
+
+from sqlalchemy.orm import Session
+
+from app import file_parser, settings
+from app.birthday_index import recurring_date
+from app.cache import ParseCache
+from app.db import create_sqlite_engine
+from app.db.migrations import upgrade_schema
+from app.db.models import Birthday
+from benchmarks.bench_table_sync import churn_mappings
+from benchmarks.bench_validation import make_dataframe
+
+TODAY = dt.date(2023, 3, 8)
+
+
+def timings(func: Callable, repeat: int, setup: Callable = None) -> dict:
+    """Run `func(setup())` `repeat` times; only `func` is timed."""
+    samples = []
+    for _ in range(repeat):
+        arg = setup() if setup else None
+        started_at = time.perf_counter()
+        func(arg) if setup else func()
+        samples.append(time.perf_counter() - started_at)
+    return {"min": min(samples), "median": statistics.median(samples)}
+
+
+def to_mappings(records: list) -> list[dict]:
+    """Birthday table rows, built as `update_db_from_yadisk` does."""
+    return file_parser.birthday_rows(records)
+
+
+def fresh_collect_bdays(path: Path) -> list[str]:
+    file_parser.parse_cache = ParseCache()
+    return file_parser.collect_bdays(path, TODAY)
+
+
+def bench_size(tmp_dir: Path, rows: int, repeat: int) -> dict:
+    workbook = tmp_dir / f"birthdays{rows}.xlsx"
+    make_dataframe(rows).to_excel(workbook, index=False)
+    columns, schema = settings.COLUMNS, file_parser.birthday_schema
+    df = file_parser.excel_to_pd_dataframe(workbook, columns)
+    records = file_parser.read_birthday_records(workbook)
+    mappings = to_mappings(records)
+    changed = churn_mappings(mappings, 0.01)
+
+    db_path = tmp_dir / f"birthdays{rows}.sqlite3"
+    engine = create_sqlite_engine(f"sqlite:///{db_path}")
+    upgrade_schema(engine)
+
+    def refresh_table(target: list[dict]) -> None:
+        with Session(engine) as session:
+            Birthday.operations.refresh_table(session, target)
+            session.commit()
+
+    def sync_table(_) -> None:
+        with Session(engine) as session:
+            Birthday.operations.sync_table(session, changed)
+            session.commit()
+
+    def query(name: str, *args) -> Callable:
+        def run() -> None:
+            with Session(engine) as session:
+                getattr(Birthday.queries, name)(session, *args)
+
+        return run
+
+    result = {
+        "excel_to_pd_dataframe": timings(
+            lambda: file_parser.excel_to_pd_dataframe(workbook, columns),
+            repeat,
+        ),
+        "preprocess_pd_dataframe": timings(
+            lambda df: list(
+                file_parser.preprocess_pd_dataframe(df, schema, columns)
+            ),
+            repeat,
+            setup=df.copy,
+        ),
+        "collect_bdays": timings(
+            lambda: fresh_collect_bdays(workbook), repeat
+        ),
+        "refresh_table": timings(
+            refresh_table, repeat, setup=lambda: mappings
+        ),
+        "sync_table": timings(
+            sync_table, repeat, setup=lambda: refresh_table(mappings)
+        ),
+    }
+    refresh_table(mappings)
+    for name, args in (
+        ("count", ()),
+        ("today", (TODAY,)),
+        ("future", (TODAY, settings.FUTURE_SCOPE)),
+        # birthdays are stored in a leap year, see `birthday_rows`
+        ("between", (recurring_date(3, 8), recurring_date(4, 7))),
+        ("all", ()),
+    ):
+        result[f"queries.{name}"] = timings(query(name, *args), repeat)
+    engine.dispose()
+    return result
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(sizes: list[int], repeat: int, output: str) -> None:
+    # every invalid row is logged, which would be timed as well
+    logging.disable(logging.ERROR)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for rows in sizes:
+            results[str(rows)] = bench_size(Path(tmp_dir), rows, repeat)
+            for stage, timing in results[str(rows)].items():
+                print(
+                    f"{rows:>8}  {stage:<25} min {timing['min']:9.4f} s  "
+                    f"median {timing['median']:9.4f} s"
+                )
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "created_at": dt.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+    Path(output).write_text(json.dumps(report, indent=2))
+    print(f"Results saved to {output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000]
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default="pipeline.json")
+    args = parser.parse_args()
+    main(args.sizes, args.repeat, args.output)
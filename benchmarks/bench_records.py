@@ -0,0 +1,83 @@
+"""
+Compare memory held by parsed birthday records: plain
+`(day, month, name)` tuples (old format) and `BirthdayRecord`
+objects with slots, interned strings and precomputed day of year.
+Rows are synthesized as the sheet reader yields them, so only
+record building is measured; memory is traced by `tracemalloc`.
+
+Usage: python -m benchmarks.bench_records [--rows 1000000]
+"""
+
+import argparse
+import logging
+import random
+import time
+import tracemalloc
+
+from app.birthday_index import BirthdayIndex
+from app.file_parser import BirthdayRecord, record_month_day, record_ordinal
+from benchmarks.bench_validation import MONTHS
+
+# sheet cells are typed by hand, so the same month is spelled differently
+SPELLINGS = [
+    spelling
+    for month in MONTHS
+    for spelling in (month, month.capitalize(), f"{month} ")
+]
+
+
+def make_rows(rows: int, seed: int = 0) -> list[tuple]:
+    rng = random.Random(seed)
+    return [
+        (
+            rng.randint(1, 28),
+            rng.choice(SPELLINGS),
+            f"Партнер {i % (rows // 2)} " if i % 3 else f"Партнер {i}",
+        )
+        for i in range(rows)
+    ]
+
+
+def as_tuple(day: int, month: str, name: str) -> tuple:
+    return day, month.lower().strip(), name.strip()
+
+
+def measure(kind: str, rows: list[tuple], make, key: dict) -> None:
+    tracemalloc.start()
+    started_at = time.perf_counter()
+    records = [make(*row) for row in rows]
+    elapsed = time.perf_counter() - started_at
+    snapshot = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    stats = snapshot.statistics("filename")
+    size = sum(stat.size for stat in stats)
+    blocks = sum(stat.count for stat in stats)
+
+    started_at = time.perf_counter()
+    BirthdayIndex(records, **key)
+    indexed = time.perf_counter() - started_at
+    print(
+        f"{kind:<15} build {elapsed:6.2f} s  index {indexed:6.2f} s  "
+        f"held {size / 2**20:7.1f} MiB  peak {peak / 2**20:7.1f} MiB  "
+        f"{size / len(rows):6.1f} B and {blocks / len(rows):4.2f} "
+        "allocations per record"
+    )
+
+
+def main(rows: int) -> None:
+    logging.disable(logging.ERROR)
+    sheet_rows = make_rows(rows)
+    measure("tuple", sheet_rows, as_tuple, {"key": record_month_day})
+    measure(
+        "BirthdayRecord",
+        sheet_rows,
+        BirthdayRecord.from_row,
+        {"ordinal": record_ordinal},
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    main(parser.parse_args().rows)
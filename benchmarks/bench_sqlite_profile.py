@@ -0,0 +1,122 @@
+"""
+Compare SQLite write and read throughput of the legacy engine
+(default journal, `echo=DEBUG`), the legacy engine without echo
+and the engine with the tuned connection profile.
+
+Writes: small committed transactions, like scheduler job store updates.
+Reads: today/upcoming birthday queries from several threads (as from
+the db executor) while another thread keeps committing writes.
+
+Usage: python -m benchmarks.bench_sqlite_profile [--rows 20000]
+"""
+
+import argparse
+import contextlib
+import datetime as dt
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.db import create_sqlite_engine, models
+from app.db.migrations import upgrade_schema
+from benchmarks.bench_table_sync import make_mappings
+
+TODAY = dt.date(2023, 3, 8)
+WRITES = 500
+READERS = 4
+READ_SECONDS = 2.0
+
+
+def profiles(path: Path) -> dict:
+    url = f"sqlite:///{path}"
+    return {
+        "legacy, echo": lambda: create_engine(url, echo=True),
+        "legacy": lambda: create_engine(url),
+        "tuned profile": lambda: create_sqlite_engine(url),
+    }
+
+
+def measure_writes(engine) -> float:
+    started_at = time.perf_counter()
+    for i in range(WRITES):
+        with Session(engine) as session:
+            models.Birthday.operations.sqlite_upsert(
+                session, f"writer{i % 50}", TODAY + dt.timedelta(days=i)
+            )
+            session.commit()
+    return WRITES / (time.perf_counter() - started_at)
+
+
+def measure_reads(engine) -> tuple[float, int]:
+    stop = threading.Event()
+    reads = [0] * READERS
+    errors = []
+
+    def read(index: int) -> None:
+        while not stop.is_set():
+            try:
+                with Session(engine) as session:
+                    models.Birthday.queries.today(session, TODAY)
+                    models.Birthday.queries.future(session, TODAY)
+            except Exception as e:
+                errors.append(e)
+            reads[index] += 1
+
+    def write() -> None:
+        i = 0
+        while not stop.is_set():
+            with Session(engine) as session:
+                models.Birthday.operations.sqlite_upsert(
+                    session, f"reader{i % 50}", TODAY
+                )
+                session.commit()
+            i += 1
+
+    threads = [
+        threading.Thread(target=read, args=(i,)) for i in range(READERS)
+    ]
+    threads.append(threading.Thread(target=write))
+    for thread in threads:
+        thread.start()
+    time.sleep(READ_SECONDS)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return sum(reads) / READ_SECONDS, len(errors)
+
+
+def main(rows: int) -> None:
+    mappings = make_mappings(rows)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = Path(tmp_dir) / "bench.sqlite3"
+        for name, make_engine in profiles(path).items():
+            for suffix in ("", "-wal", "-shm", "-journal"):
+                Path(f"{path}{suffix}").unlink(missing_ok=True)
+            with open(os.devnull, "w") as devnull:
+                # echo handler writes to stdout
+                with contextlib.redirect_stdout(devnull):
+                    engine = make_engine()
+                    upgrade_schema(engine)
+                    with Session(engine) as session:
+                        models.Birthday.operations.refresh_table(
+                            session, mappings
+                        )
+                        session.commit()
+                    writes = measure_writes(engine)
+                    reads, errors = measure_reads(engine)
+                    engine.dispose()
+            print(
+                f"{name:<14} writes {writes:8.0f} tx/s  "
+                f"reads {reads:8.0f} queries/s  read errors {errors}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=20_000)
+    main(parser.parse_args().rows)
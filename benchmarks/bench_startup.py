@@ -0,0 +1,141 @@
+"""
+Measure bot cold start with `python -X importtime -c "import main"`:
+wall time of the whole process, total import time and cumulative
+import time of app modules and the heaviest dependencies.
+Results are saved as JSON comparable with `benchmarks.compare`.
+
+Exits with status 1 if median import time exceeds `--budget` seconds
+or any of `--forbid` modules (imported lazily on purpose) gets
+imported on start.
+
+Usage: python -m benchmarks.bench_startup [--repeat 5] [--top 10]
+           [--budget 1.0] [--forbid pandas numpy openpyxl]
+           [--output startup.json]
+"""
+
+import argparse
+import datetime as dt
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from benchmarks.bench_pipeline import git_commit
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def import_times(module: str) -> tuple[float, dict[str, float]]:
+    """
+    Import `module` in a new interpreter. Return wall time of
+    the process and cumulative import time of every imported module.
+    """
+    started_at = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+        env=dict(os.environ, PYTHONDONTWRITEBYTECODE="1"),
+    )
+    wall_time = time.perf_counter() - started_at
+    modules = {}
+    total = 0.0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue  # header
+        seconds = int(cumulative) / 1e6
+        if not name.startswith("  "):
+            total += seconds
+        modules[name.strip()] = seconds
+    modules["total"] = total
+    return wall_time, modules
+
+
+def summary(samples: list[float]) -> dict:
+    return {"min": min(samples), "median": statistics.median(samples)}
+
+
+def main(
+    module: str,
+    repeat: int,
+    top: int,
+    budget: float | None,
+    forbid: list[str],
+    output: str | None,
+) -> int:
+    # the first run warms up bytecode and disk caches
+    import_times(module)
+    runs = [import_times(module) for _ in range(repeat)]
+    imported = set().union(*(modules for _, modules in runs))
+    watched = {"total", module} | {
+        name for name in imported if name.startswith("app.")
+    }
+    heaviest = sorted(
+        (name for name in imported if name not in watched),
+        key=lambda name: runs[0][1].get(name, 0),
+        reverse=True,
+    )
+    watched.update(heaviest[:top])
+
+    results = {"process": summary([wall_time for wall_time, _ in runs])}
+    for name in sorted(watched, key=lambda n: -runs[0][1].get(n, 0)):
+        results[name] = summary([modules.get(name, 0) for _, modules in runs])
+    for name, timing in results.items():
+        print(
+            f"{name:<40} min {timing['min']:8.4f} s  "
+            f"median {timing['median']:8.4f} s"
+        )
+
+    status = 0
+    if forbidden := sorted(set(forbid) & imported):
+        print(f"FAILED: imported on start: {', '.join(forbidden)}")
+        status = 1
+    if budget is not None and results["total"]["median"] > budget:
+        print(f"FAILED: import takes longer than {budget} s")
+        status = 1
+    if output:
+        report = {
+            "meta": {
+                "commit": git_commit(),
+                "created_at": dt.datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "repeat": repeat,
+            },
+            "results": {f"import {module}": results},
+        }
+        Path(output).write_text(json.dumps(report, indent=2))
+        print(f"Results saved to {output}")
+    return status
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--budget", type=float)
+    parser.add_argument(
+        "--forbid", nargs="*", default=["pandas", "numpy", "openpyxl"]
+    )
+    parser.add_argument("--output")
+    args = parser.parse_args()
+    sys.exit(
+        main(
+            args.module,
+            args.repeat,
+            args.top,
+            args.budget,
+            args.forbid,
+            args.output,
+        )
+    )
@@ -0,0 +1,97 @@
+"""
+Compare scheduler startup and jobstore size when every subscribed chat
+has its own mailing job (legacy) and when chats are kept in the
+subscriptions table and served by one job per mailing time slot.
+Chats are spread over `--slots` mailing times.
+
+Usage: python -m benchmarks.bench_subscriptions [--slots 4]
+"""
+
+import argparse
+import asyncio
+import datetime as dt
+import tempfile
+import time
+from pathlib import Path
+
+from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
+from sqlalchemy.orm import Session
+
+from app.db import create_sqlite_engine
+from app.db.migrations import upgrade_schema
+from app.db.models import TelegramChat
+from app.file_parser import dispatch_mailing
+from app.scheduler import BotScheduler
+
+CHATS = (10, 1_000, 50_000)
+
+
+def mailing_time(slot: int) -> dt.time:
+    return dt.time(9 + slot)
+
+
+def schedule_per_chat(scheduler: BotScheduler, chats: int, slots: int):
+    for chat_id in range(chats):
+        scheduler.add_job(
+            dispatch_mailing,
+            "cron",
+            hour=mailing_time(chat_id % slots).hour,
+            id=str(chat_id),
+            replace_existing=True,
+            kwargs={"bot_path": "app.bot:bot", "chat_ids": [chat_id]},
+        )
+
+
+def schedule_per_slot(scheduler: BotScheduler, engine, chats: int, slots: int):
+    with Session(engine) as session:
+        for slot in range(slots):
+            TelegramChat.operations.subscribe(
+                session, range(slot, chats, slots), mailing_time(slot)
+            )
+        session.commit()
+        started_at = time.perf_counter()
+        # same as `BotScheduler.load_mailing_slots` on a sync session
+        scheduler.sync_mailing_slots(
+            TelegramChat.queries.utc_minutes(session)
+        )
+    return started_at
+
+
+async def measure(tmp_dir: Path, chats: int, slots: int, per_chat: bool):
+    name = f"{'chat' if per_chat else 'slot'}{chats}"
+    engine = create_sqlite_engine(f"sqlite:///{tmp_dir / name}.sqlite3")
+    upgrade_schema(engine)
+    scheduler = BotScheduler(
+        jobstores={"default": SQLAlchemyJobStore(engine=engine)}
+    )
+    scheduler.start(paused=True)
+    started_at = time.perf_counter()
+    if per_chat:
+        schedule_per_chat(scheduler, chats, slots)
+    else:
+        started_at = schedule_per_slot(scheduler, engine, chats, slots)
+    elapsed = time.perf_counter() - started_at
+    jobs = len(scheduler.get_jobs())
+    scheduler.shutdown(wait=False)
+    engine.dispose()
+    return elapsed, jobs
+
+
+def main(slots: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for chats in CHATS:
+            for per_chat in (True, False):
+                elapsed, jobs = asyncio.run(
+                    measure(Path(tmp_dir), chats, slots, per_chat)
+                )
+                print(
+                    f"chats {chats:>6}  "
+                    f"{'job per chat' if per_chat else 'job per slot'}  "
+                    f"startup {elapsed:8.3f} s  jobstore rows {jobs:>6}"
+                )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--slots", type=int, default=4)
+    main(parser.parse_args().slots)
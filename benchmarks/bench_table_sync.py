@@ -0,0 +1,89 @@
+"""
+Compare delete-all `refresh_table` with diff-based `sync_table`
+when 1%, 10% and 100% of birthday rows change between syncs.
+Half of changed rows get a new date, the other half is removed
+and half as many rows with new names are added.
+
+Usage: python -m benchmarks.bench_table_sync [--rows 50000]
+"""
+
+import argparse
+import datetime as dt
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.db import models
+from app.db.migrations import upgrade_schema
+
+CHURNS = (0.01, 0.1, 1.0)
+
+
+def make_mappings(rows: int, seed: int = 0) -> list[dict]:
+    rng = random.Random(seed)
+    first = dt.date(2023, 1, 1)
+    return [
+        {"name": f"name{i}", "date": first + dt.timedelta(rng.randrange(365))}
+        for i in range(rows)
+    ]
+
+
+def churn_mappings(
+    mappings: list[dict], churn: float, seed: int = 0
+) -> list[dict]:
+    rng = random.Random(seed)
+    changed = rng.sample(range(len(mappings)), int(len(mappings) * churn))
+    updated = set(changed[: len(changed) // 2])
+    deleted = set(changed[len(changed) // 2 :])
+    result = []
+    for i, mapping in enumerate(mappings):
+        if i in updated:
+            date = mapping["date"] + dt.timedelta(days=1)
+            result.append({"name": mapping["name"], "date": date})
+        elif i not in deleted:
+            result.append(mapping)
+    result += [
+        {"name": f"new{i}", "date": mapping["date"]}
+        for i, mapping in enumerate(mappings[: len(deleted) // 2])
+    ]
+    return result
+
+
+def measure(engine, initial: list[dict], mappings: list[dict], method: str):
+    with Session(engine) as session:
+        models.Birthday.operations.refresh_table(session, initial)
+        session.commit()
+        started_at = time.perf_counter()
+        result = getattr(models.Birthday.operations, method)(session, mappings)
+        session.commit()
+        return time.perf_counter() - started_at, result
+
+
+def main(rows: int) -> None:
+    initial = make_mappings(rows)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        engine = create_engine(f"sqlite:///{Path(tmp_dir) / 'bench.sqlite3'}")
+        upgrade_schema(engine)
+        for churn in CHURNS:
+            mappings = churn_mappings(initial, churn)
+            refresh_time, _ = measure(
+                engine, initial, mappings, "refresh_table"
+            )
+            sync_time, report = measure(
+                engine, initial, mappings, "sync_table"
+            )
+            print(
+                f"churn {churn:>5.0%}  refresh_table {refresh_time:7.3f} s  "
+                f"sync_table {sync_time:7.3f} s  {report}"
+            )
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=50_000)
+    main(parser.parse_args().rows)
@@ -0,0 +1,95 @@
+"""
+Compare row-by-row `validate_df_row` filtering with the compiled schema.
+
+Usage: python -m benchmarks.bench_validation [--sizes 10000 100000 1000000]
+
+Row-by-row filtering is quadratic, so by default it is skipped
+for dataframes larger than `--legacy-limit` rows.
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from app import settings
+from app.file_parser import (
+    birthday_schema,
+    preprocess_pd_dataframe,
+    validate_df_row,
+)
+
+MONTHS = (
+    "январь",
+    "февраль",
+    "март",
+    "апрель",
+    "май",
+    "июнь",
+    "июль",
+    "август",
+    "сентябрь",
+    "октябрь",
+    "ноябрь",
+    "декабрь",
+)
+
+
+def make_dataframe(size: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Build a dataframe shaped like the birthday sheet
+    with roughly 10% of invalid rows.
+    """
+    rng = np.random.default_rng(seed)
+    days = rng.integers(1, 32, size).astype(object)
+    days[rng.random(size) < 0.05] = "?"
+    months = rng.choice(MONTHS, size).astype(object)
+    months[rng.random(size) < 0.05] = "?"
+    names = np.array([f"Партнер {i}" for i in range(size)], dtype=object)
+    return pd.DataFrame(dict(zip(settings.COLUMNS, (days, months, names))))
+
+
+def legacy_preprocess(df: pd.DataFrame) -> "zip":
+    for i in df.index:
+        if not validate_df_row(df.loc[i], birthday_schema):
+            df.drop(i, inplace=True)
+    return zip(*(getattr(df, col) for col in settings.COLUMNS))
+
+
+def timeit(func, df: pd.DataFrame) -> tuple[float, list]:
+    start = time.perf_counter()
+    rows = list(func(df))
+    return time.perf_counter() - start, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000]
+    )
+    parser.add_argument("--legacy-limit", type=int, default=100_000)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'row-by-row, s':>15} {'compiled, s':>12} {'x':>8}")
+    for size in args.sizes:
+        df = make_dataframe(size)
+        compiled, rows = timeit(
+            lambda df: preprocess_pd_dataframe(
+                df, birthday_schema, settings.COLUMNS
+            ),
+            df.copy(),
+        )
+        if size > args.legacy_limit:
+            print(f"{size:>10} {'skipped':>15} {compiled:>12.3f} {'-':>8}")
+            continue
+        legacy, legacy_rows = timeit(legacy_preprocess, df.copy())
+        assert rows == legacy_rows, "validation results differ"
+        print(
+            f"{size:>10} {legacy:>15.3f} {compiled:>12.3f} "
+            f"{legacy / compiled:>8.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
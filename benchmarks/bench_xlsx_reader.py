@@ -0,0 +1,60 @@
+"""
+Compare reading the birthday workbook with pandas (dataframe
+of the whole sheet) and with the streaming openpyxl reader:
+parse time, peak memory traced by `tracemalloc` and memory
+held by the parsed records (so `peak - records` is the reader overhead).
+
+Usage: python -m benchmarks.bench_xlsx_reader [--sizes 1000 10000 100000]
+           [--repeat 3]
+"""
+
+import argparse
+import io
+import logging
+import time
+import tracemalloc
+
+from app.file_parser import PARSE_ENGINES, read_birthday_records
+from benchmarks.bench_offload import make_workbook
+
+
+def measure(engine: str, workbook: bytes, repeat: int) -> tuple:
+    elapsed = []
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        records = read_birthday_records(io.BytesIO(workbook), engine=engine)
+        elapsed.append(time.perf_counter() - started_at)
+    del records
+    tracemalloc.start()
+    records = read_birthday_records(io.BytesIO(workbook), engine=engine)
+    held, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(elapsed), peak, held, records
+
+
+def main(sizes: list[int], repeat: int) -> None:
+    logging.disable(logging.INFO)
+    # import heavy modules beforehand so they are not measured
+    read_birthday_records(io.BytesIO(make_workbook(10)), engine="pandas")
+    for size in sizes:
+        workbook = make_workbook(size)
+        results = {}
+        for engine in PARSE_ENGINES:
+            elapsed, peak, held, records = measure(engine, workbook, repeat)
+            results[engine] = records
+            print(
+                f"{size:>8} rows  {engine:<9} {elapsed:8.3f} s  "
+                f"peak {peak / 2**20:7.1f} MiB  "
+                f"records {len(records):>7} ({held / 2**20:5.1f} MiB)"
+            )
+        assert len({tuple(records) for records in results.values()}) == 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000]
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    main(args.sizes, args.repeat)
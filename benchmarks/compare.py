@@ -0,0 +1,76 @@
+"""
+Compare two JSON results of `benchmarks.bench_pipeline`
+(or `benchmarks.bench_startup`).
+Prints median time of every stage in both runs and their ratio;
+stages slower than `--threshold` (10% by default) and at least
+`--min-delta` seconds (1 ms by default, shorter stages are mostly
+noise) are marked as regressions and make the command exit with
+status 1.
+
+Usage: python -m benchmarks.compare old.json new.json [--threshold 0.1]
+           [--min-delta 0.001]
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+
+def compare(
+    old: dict, new: dict, threshold: float, min_delta: float
+) -> list[tuple]:
+    """
+    Return `(rows, stage, old, new, ratio, verdict)` for stages
+    present in both runs; times are medians in seconds.
+    """
+    rows = []
+    for size, stages in new["results"].items():
+        for stage, timing in stages.items():
+            try:
+                before = old["results"][size][stage]["median"]
+            except KeyError:
+                continue
+            after = timing["median"]
+            ratio = after / before if before else float("inf")
+            if abs(after - before) < min_delta:
+                verdict = ""
+            elif ratio > 1 + threshold:
+                verdict = "REGRESSION"
+            elif ratio < 1 - threshold:
+                verdict = "improved"
+            else:
+                verdict = ""
+            rows.append((size, stage, before, after, ratio, verdict))
+    return rows
+
+
+def main(
+    old_path: str, new_path: str, threshold: float, min_delta: float
+) -> int:
+    old, new = (json.loads(Path(p).read_text()) for p in (old_path, new_path))
+    print(
+        f"old: {old['meta'].get('commit')} ({old['meta'].get('created_at')})"
+        f"\nnew: {new['meta'].get('commit')} ({new['meta'].get('created_at')})"
+    )
+    print(
+        f"{'rows':>8}  {'stage':<25} {'old, s':>9} {'new, s':>9} "
+        f"{'new/old':>8}"
+    )
+    rows = compare(old, new, threshold, min_delta)
+    for size, stage, before, after, ratio, verdict in rows:
+        print(
+            f"{size:>8}  {stage:<25} {before:9.4f} {after:9.4f} "
+            f"{ratio:8.2f}  {verdict}"
+        )
+    return int(any(verdict == "REGRESSION" for *_, verdict in rows))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=0.1)
+    parser.add_argument("--min-delta", type=float, default=0.001)
+    args = parser.parse_args()
+    sys.exit(main(args.old, args.new, args.threshold, args.min_delta))
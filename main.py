@@ -2,25 +2,40 @@ import logging
 from logging.config import fileConfig
 
 from aiogram import Bot, Dispatcher, executor, types
-from sqlalchemy import create_engine
 
 from app import settings
-from app.db import Session, db_engine, events, models
-from app.handlers import register_bdays_handlers, register_common_handlers
-from app.scheduler import Scheduler, add_preload_job
+from app.bot import get_dispatcher
+from app.concurrency import lag_monitor, parse_offloader
+from app.db import (
+    Session,
+    events,
+    get_async_db_engine,
+    get_db_engine,
+    models,
+)
+from app.db.migrations import upgrade_schema
+from app.handlers import (
+    register_admin_handlers,
+    register_bdays_handlers,
+    register_common_handlers,
+)
+from app.metrics import metrics_server
+from app.scheduler import Scheduler, leader
+from app.utils import clock
+from app.webhook import start_webhook
+from app.yandex_disk import disk
 
+# the only logging setup: app modules just get their loggers
 fileConfig(fname="log_config.conf", disable_existing_loggers=False)
 logger = logging.getLogger(__name__)
 
 
-from app.bot import dispatcher as dp
-
-
 async def set_bot_commands(bot: Bot):
     commands = [
         # types.BotCommand("help", "помощь"),
         types.BotCommand("bdays", "получить список ближайших ДР"),
         types.BotCommand("addchat", "добавить чат рассылку"),
+        types.BotCommand("removechat", "удалить чат из рассылки"),
         # types.BotCommand("code", "код подтверждения яндекс диска"),
         # types.BotCommand("joke", "пошутить"),
         # types.BotCommand("test", "для тестирования"),
@@ -30,24 +45,47 @@ async def set_bot_commands(bot: Bot):
 
 async def on_startup(dp: Dispatcher):
     """ """
-    Session.configure(bind=db_engine)
-    models.Base.metadata.create_all(db_engine)
-    Scheduler.setup_daily_message_preload()
-    Scheduler.start()
+    Session.configure(bind=get_db_engine())
+    upgrade_schema(get_db_engine())
+    lag_monitor.start()
+    if settings.METRICS_ENABLED:
+        await metrics_server.start()
+    await disk.start()
+    await clock.sync()
+    Scheduler.setup_jobstore()
+    # jobs are scheduled and run only while this process is
+    # the scheduler leader, see `BotScheduler.lead`
+    Scheduler.start(paused=True)
+    await leader.start()
     await set_bot_commands(dp.bot)
 
 
 async def on_shutdown(_: Dispatcher):
     """Execute function before Bot shut down polling."""
-    # remove all jobs and shut down the Scheduler
-    Scheduler.remove_all_jobs()
+    # jobs are kept: jobstore may be shared with other replicas
+    await leader.stop()
     Scheduler.shutdown()
+    await disk.close()
+    await get_async_db_engine().dispose()
+    await lag_monitor.stop()
+    logger.info(f"Event loop lag: {lag_monitor}")
+    await metrics_server.stop()
+    parse_offloader.shutdown()
 
 
 if __name__ == "__main__":
+    # bot and its dispatcher are not created on import
+    dp = get_dispatcher()
     register_common_handlers(dp)
     register_bdays_handlers(dp)
+    register_admin_handlers(dp)
     # events.load_events()
-    executor.start_polling(
-        dp, skip_updates=True, on_startup=on_startup, on_shutdown=on_shutdown
-    )
+    if settings.BOT_MODE == "webhook":
+        start_webhook(dp, on_startup=on_startup, on_shutdown=on_shutdown)
+    else:
+        executor.start_polling(
+            dp,
+            skip_updates=True,
+            on_startup=on_startup,
+            on_shutdown=on_shutdown,
+        )
@@ -1,4 +1,13 @@
+import asyncio
 import datetime as dt
+import hashlib
+import time
+from collections import defaultdict
+from types import SimpleNamespace
+
+from aiohttp import web
+
+from app.utils import clock
 
 constants = {
     "TODAY_BDAY_NUM": 3,
@@ -7,4 +16,135 @@ constants = {
 
 
 def today() -> dt.date:
-    return dt.date.today()
+    return clock.today()
+
+
+class FakeDisk:
+    """Stand-in for `YaDisk` serving one file."""
+
+    def __init__(self, contents: bytes, delay: float = 0) -> None:
+        self.contents = contents
+        self.delay = delay
+        self.downloads = 0
+
+    async def start(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    async def check_token(self, *args, **kwargs) -> bool:
+        return True
+
+    async def get_meta(self, path, **kwargs):
+        await asyncio.sleep(self.delay)
+        return SimpleNamespace(
+            md5=hashlib.md5(self.contents).hexdigest(),
+            modified="2023-01-01T00:00:00+00:00",
+            size=len(self.contents),
+        )
+
+    async def download(self, path, path_or_file, **kwargs):
+        self.downloads += 1
+        if hasattr(path_or_file, "write"):
+            path_or_file.write(self.contents)
+            return
+        with open(path_or_file, "wb") as f:
+            f.write(self.contents)
+
+
+class FakeMsgProvider:
+    """Stand-in for `MsgProvider` remembering dispatched texts."""
+
+    def __init__(self) -> None:
+        self.texts = []
+
+    async def dispatch_text(self, text: str = None, *args, **kwargs):
+        self.texts.append(text)
+
+
+class FakeBotApi:
+    """
+    Local stand-in for Telegram Bot API remembering sent messages
+    as `(time, text)` pairs per chat. Responds with flood control
+    error (429) to the first `flood[chat_id]` messages to a chat
+    and with "bot was blocked" error to messages to `blocked` chats.
+    Parameters of all other method calls are kept in `calls[method]`.
+    """
+
+    def __init__(
+        self,
+        flood: dict[int, int] = None,
+        retry_after: int = 1,
+        blocked: tuple = (),
+    ) -> None:
+        self.flood = dict(flood or {})
+        self.retry_after = retry_after
+        self.blocked = set(blocked)
+        self.sent = defaultdict(list)
+        self.flooded_at = []
+        self.requests = 0
+        self.calls = defaultdict(list)
+        self.app = web.Application()
+        self.app.router.add_post("/bot{token}/{method}", self.handle)
+
+    me = {
+        "id": 123456,
+        "is_bot": True,
+        "first_name": "Test",
+        "username": "test_bot",
+    }
+
+    def send_times(self) -> list[float]:
+        return sorted(
+            t for messages in self.sent.values() for t, _ in messages
+        )
+
+    async def handle(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        method = request.match_info["method"]
+        data = await request.post()
+        if method == "getMe":
+            return web.json_response({"ok": True, "result": self.me})
+        if method != "sendMessage":
+            self.calls[method].append(dict(data))
+            return web.json_response({"ok": True, "result": True})
+
+        chat_id = int(data["chat_id"])
+        if self.flood.get(chat_id):
+            self.flood[chat_id] -= 1
+            self.flooded_at.append(time.monotonic())
+            return web.json_response(
+                {
+                    "ok": False,
+                    "error_code": 429,
+                    "description": "Too Many Requests: "
+                    f"retry after {self.retry_after}",
+                    "parameters": {"retry_after": self.retry_after},
+                },
+                status=429,
+            )
+        if chat_id in self.blocked:
+            return web.json_response(
+                {
+                    "ok": False,
+                    "error_code": 403,
+                    "description": "Forbidden: bot was blocked by the user",
+                },
+                status=403,
+            )
+        self.sent[chat_id].append((time.monotonic(), data["text"]))
+        return web.json_response(
+            {
+                "ok": True,
+                "result": {
+                    "message_id": len(self.sent[chat_id]),
+                    "date": int(time.time()),
+                    "chat": {
+                        "id": chat_id,
+                        "type": "private" if chat_id > 0 else "group",
+                    },
+                    "text": data["text"],
+                },
+            }
+        )
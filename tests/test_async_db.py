@@ -0,0 +1,141 @@
+import asyncio
+import datetime as dt
+from contextlib import asynccontextmanager
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app import file_parser
+from app.cache import ParseCache
+from app.db import create_async_sqlite_engine, create_sqlite_engine, models
+from app.db.migrations import upgrade_schema
+from app.yandex_disk import FileContent
+
+from .test_xlsx import make_workbook
+
+TODAY = dt.date(2023, 12, 30)
+BIRTHDAYS = [
+    {"name": "today", "date": dt.date(2023, 12, 30)},
+    {"name": "tomorrow", "date": dt.date(2023, 12, 31)},
+    {"name": "new year", "date": dt.date(2023, 1, 1)},
+    {"name": "later", "date": dt.date(2023, 6, 1)},
+]
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = tmp_path / "test.sqlite3"
+    engine = create_sqlite_engine(f"sqlite:///{path}")
+    upgrade_schema(engine)
+    engine.dispose()
+    return path
+
+
+@pytest.fixture
+def async_session(db_path, monkeypatch):
+    """Patch `get_async_session` of `file_parser` to use test database."""
+
+    @asynccontextmanager
+    async def get_async_session():
+        # engine is bound to the loop it is first used in
+        engine = create_async_sqlite_engine(f"sqlite+aiosqlite:///{db_path}")
+        try:
+            async with async_sessionmaker(
+                engine, expire_on_commit=False
+            )() as session:
+                yield session
+        finally:
+            await engine.dispose()
+
+    monkeypatch.setattr(file_parser, "get_async_session", get_async_session)
+    return get_async_session
+
+
+async def upcoming_birthdays(async_session, today: dt.date) -> tuple:
+    async with async_session() as session:
+        return (
+            await models.Birthday.async_queries.today(session, today),
+            await models.Birthday.async_queries.future(session, today),
+        )
+
+
+def test_async_managers_have_sync_managers_methods(async_session):
+    async def run():
+        async with async_session() as session:
+            report = await models.Birthday.async_operations.sync_table(
+                session, BIRTHDAYS
+            )
+            await session.commit()
+            count = await models.Birthday.async_queries.count(session)
+            today = await models.Birthday.async_queries.today(session, TODAY)
+            future = await models.Birthday.async_queries.future(session, TODAY)
+        return report, count, today, future
+
+    report, count, today, future = asyncio.run(run())
+    assert report.inserted == len(BIRTHDAYS)
+    assert count == len(BIRTHDAYS)
+    assert [b.name for b in today] == ["today"]
+    assert sorted(b.name for b in future) == ["new year", "tomorrow"]
+
+
+def test_async_manager_method_keeps_sync_method_docs():
+    method = models.Birthday.async_queries.future
+    assert method.__name__ == "future"
+    assert method.__doc__ == models.Birthday.queries.future.__doc__
+
+
+def test_async_engine_applies_sqlite_pragmas(db_path):
+    async def run():
+        engine = create_async_sqlite_engine(f"sqlite+aiosqlite:///{db_path}")
+        async with engine.connect() as conn:
+            journal_mode = await conn.exec_driver_sql("PRAGMA journal_mode")
+            busy_timeout = await conn.exec_driver_sql("PRAGMA busy_timeout")
+            result = journal_mode.scalar(), busy_timeout.scalar()
+        await engine.dispose()
+        return result
+
+    assert asyncio.run(run()) == (
+        "wal",
+        file_parser.settings.SQLITE_PRAGMAS["busy_timeout"],
+    )
+
+
+def test_birthdays_are_saved_and_fetched_without_sync_session(
+    async_session, monkeypatch
+):
+    def fail(*args, **kwargs):
+        raise AssertionError("sync session must not be used")
+
+    monkeypatch.setattr(file_parser, "get_session", fail)
+
+    async def run():
+        await file_parser.asave_birthdays(BIRTHDAYS)
+        await file_parser.asave_birthdays(BIRTHDAYS[:2])
+        return await upcoming_birthdays(async_session, TODAY)
+
+    today, future = asyncio.run(run())
+    assert [b.name for b in today] == ["today"]
+    assert [b.name for b in future] == ["tomorrow"]
+
+
+def test_february_29_birthday_is_synced_and_found_in_non_leap_year(
+    async_session, monkeypatch
+):
+    workbook = make_workbook(
+        [(1, "Попова", "февраль", 29), (2, "Кузнецова", "февраль", 28)]
+    )
+
+    async def fetch_file_from_yadisk(*args, **kwargs):
+        return FileContent(workbook.getvalue())
+
+    monkeypatch.setattr(
+        file_parser, "fetch_file_from_yadisk", fetch_file_from_yadisk
+    )
+    monkeypatch.setattr(file_parser, "parse_cache", ParseCache())
+
+    async def run():
+        await file_parser.update_db_from_yadisk()
+        return await upcoming_birthdays(async_session, dt.date(2023, 2, 28))
+
+    today, _ = asyncio.run(run())
+    assert sorted(b.name for b in today) == ["Кузнецова", "Попова"]
@@ -0,0 +1,71 @@
+import asyncio
+import datetime as dt
+import io
+
+import pandas as pd
+import pytest
+
+from app import file_parser, files, settings, yandex_disk
+from app.cache import ParseCache
+from app.concurrency import SingleFlight
+from app.handlers import bdays
+
+from .common import FakeDisk, FakeMsgProvider
+
+TODAY = dt.date(2023, 3, 8)
+CONCURRENT_REQUESTS = 300
+
+
+def make_workbook() -> bytes:
+    buffer = io.BytesIO()
+    pd.DataFrame(
+        {
+            "Дата": [8, 10, 20, "?"],
+            "месяц": ["март", "март", "май", "?"],
+            "ФИО": ["Иванова", "Петрова", "Сидорова", "?"],
+        }
+    ).to_excel(buffer, index=False)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def disk(monkeypatch, tmp_path):
+    disk = FakeDisk(make_workbook(), delay=0.05)
+
+    monkeypatch.setattr(settings, "BASE_DIR", tmp_path)
+    monkeypatch.setattr(bdays, "disk", disk)
+    monkeypatch.setattr(files.clock, "today", lambda: TODAY)
+    monkeypatch.setattr(yandex_disk, "file_sync", yandex_disk.YaDiskFileSync())
+    monkeypatch.setattr(file_parser, "parse_cache", ParseCache())
+    monkeypatch.setattr(file_parser, "records_flight", SingleFlight())
+    return disk
+
+
+async def send_bdays_commands(num: int) -> list[FakeMsgProvider]:
+    providers = [FakeMsgProvider() for _ in range(num)]
+    await asyncio.gather(*(bdays.get_bdays(p) for p in providers))
+    return providers
+
+
+def test_concurrent_bdays_requests_share_one_file_download_and_parse(disk):
+    providers = asyncio.run(send_bdays_commands(CONCURRENT_REQUESTS))
+
+    assert disk.downloads == 1
+    assert file_parser.parse_cache.misses == 1
+    assert file_parser.records_flight.calls == 1
+    assert file_parser.records_flight.coalesced == CONCURRENT_REQUESTS - 1
+    expected_texts = [
+        "#деньрождения сегодня \nИванова, 8 марта",
+        f"#деньрождения ближайшие {settings.FUTURE_SCOPE} дня: "
+        "\nПетрова, 10 марта",
+    ]
+    assert all(p.texts == expected_texts for p in providers)
+
+
+def test_bdays_requests_after_refresh_start_new_refresh(disk):
+    asyncio.run(send_bdays_commands(2))
+    asyncio.run(send_bdays_commands(2))
+
+    assert disk.downloads == 1
+    assert file_parser.records_flight.calls == 2
+    assert file_parser.records_flight.coalesced == 2
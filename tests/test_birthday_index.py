@@ -0,0 +1,113 @@
+import datetime as dt
+import pickle
+
+import pytest
+
+from app import file_parser
+from app.birthday_index import DAYS_IN_INDEX, BirthdayIndex, day_of_year
+
+ROWS = [
+    (30, "декабрь", "Иванова"),
+    (31, "декабрь", "Петрова"),
+    (1, "январь", "Сидорова"),
+    (2, "январь", "Смирнова"),
+    (28, "февраль", "Кузнецова"),
+    (29, "февраль", "Попова"),
+    (1, "март", "Васильева"),
+    (31, "апрель", "Несуществующая"),
+    (5, "мартобрь", "Неизвестная"),
+]
+RECORDS = [file_parser.BirthdayRecord.from_row(*row) for row in ROWS]
+
+
+@pytest.fixture
+def index():
+    return BirthdayIndex(RECORDS, key=file_parser.record_month_day)
+
+
+def names(items):
+    return [name for _, _, name in items]
+
+
+def test_day_of_year_maps_every_date_to_one_of_366_buckets():
+    assert day_of_year(1, 1) == 0
+    assert day_of_year(2, 29) == 59
+    assert day_of_year(3, 1) == 60
+    assert day_of_year(12, 31) == DAYS_IN_INDEX - 1
+    with pytest.raises(ValueError):
+        day_of_year(2, 30)
+
+
+def test_records_unpack_like_tuples_and_share_month_names():
+    first, second = (
+        file_parser.BirthdayRecord.from_row(1, " Март", " Иванова "),
+        file_parser.BirthdayRecord.from_row(2, "март ", "Петрова"),
+    )
+    assert tuple(first) == (1, "март", "Иванова") and first.ordinal == 60
+    assert first.month is second.month
+    assert not hasattr(first, "__dict__")
+    assert pickle.loads(pickle.dumps(first)).ordinal == first.ordinal
+    assert RECORDS[-1].ordinal is RECORDS[-2].ordinal is None
+
+
+def test_index_skips_records_with_non_existing_dates(index):
+    assert len(index.buckets) == DAYS_IN_INDEX
+    assert len(index) == len(RECORDS) - 2
+    assert index.skipped == 2
+
+
+def test_index_of_precomputed_ordinals_matches_index_of_dates(index):
+    by_ordinal = BirthdayIndex(RECORDS, ordinal=file_parser.record_ordinal)
+    assert by_ordinal.buckets == index.buckets
+    assert by_ordinal.skipped == index.skipped
+
+
+def test_on_returns_items_of_the_same_day_in_any_year(index):
+    for year in (2023, 2024):
+        assert names(index.on(dt.date(year, 12, 31))) == ["Петрова"]
+        assert names(index.on(dt.date(year, 3, 1))) == ["Васильева"]
+
+
+def test_february_29_falls_on_february_28_in_non_leap_years(index):
+    assert names(index.on(dt.date(2024, 2, 28))) == ["Кузнецова"]
+    assert names(index.on(dt.date(2024, 2, 29))) == ["Попова"]
+    assert names(index.on(dt.date(2023, 2, 28))) == ["Кузнецова", "Попова"]
+
+
+def test_upcoming_window_wraps_over_new_year(index):
+    today = dt.date(2023, 12, 30)
+    upcoming = list(index.upcoming(today, 3))
+    assert [date for date, _ in upcoming] == [
+        dt.date(2023, 12, 31),
+        dt.date(2024, 1, 1),
+        dt.date(2024, 1, 2),
+    ]
+    assert names(item for _, item in upcoming) == [
+        "Петрова",
+        "Сидорова",
+        "Смирнова",
+    ]
+
+
+def test_upcoming_excludes_today(index):
+    upcoming = index.upcoming(dt.date(2023, 2, 28), 1)
+    assert names(item for _, item in upcoming) == ["Васильева"]
+
+
+def test_birthday_index_is_built_once_per_records_list():
+    records = list(RECORDS)
+    index = file_parser.get_birthday_index(records)
+    assert file_parser.get_birthday_index(records) is index
+    assert file_parser.get_birthday_index(list(RECORDS)) is not index
+
+
+def test_notifications_include_birthdays_after_new_year(monkeypatch):
+    monkeypatch.setattr(file_parser.settings, "FUTURE_SCOPE", 3)
+    notifications = file_parser.format_bday_notifications(
+        RECORDS, dt.date(2023, 12, 30)
+    )
+    assert notifications == [
+        "#деньрождения сегодня \nИванова, 30 декабря",
+        "#деньрождения ближайшие 3 дня: \nПетрова, 31 декабря"
+        "\nСидорова, 1 января\nСмирнова, 2 января",
+    ]
@@ -0,0 +1,144 @@
+import asyncio
+import io
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pytest
+
+from app import file_parser, settings
+from app.cache import ParseCache, file_hash
+
+RECORDS = [
+    file_parser.BirthdayRecord(1, "январь", "Иванов", 0),
+    file_parser.BirthdayRecord(2, "май", "Петров", 122),
+]
+
+
+@pytest.fixture
+def excel_file(tmp_path):
+    path = tmp_path / "bdays.xlsx"
+    pd.DataFrame(
+        {"Дата": [1, 2, "?"], "месяц": ["Январь ", "май", "май"]}
+        | {"ФИО": [" Иванов", "Петров", "Сидоров"]}
+    ).to_excel(path, index=False)
+    return path
+
+
+@pytest.fixture
+def parse_cache(monkeypatch):
+    cache = ParseCache()
+    monkeypatch.setattr(file_parser, "parse_cache", cache)
+    return cache
+
+
+def test_file_hash_depends_only_on_file_contents(tmp_path):
+    first, second, third = (tmp_path / name for name in ("a", "b", "c"))
+    first.write_bytes(b"contents")
+    second.write_bytes(b"contents")
+    third.write_bytes(b"other contents")
+    assert file_hash(first) == file_hash(second)
+    assert file_hash(first) != file_hash(third)
+
+
+def test_parse_cache_counts_hits_and_misses():
+    cache = ParseCache()
+    assert cache.get("key") is None
+    cache.set("key", RECORDS)
+    assert cache.get("key") == RECORDS
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_parse_cache_evicts_least_recently_used_entries():
+    cache = ParseCache(maxsize=2)
+    for key in ("first", "second"):
+        cache.set(key, RECORDS)
+    cache.get("first")
+    cache.set("third", RECORDS)
+    assert "first" in cache
+    assert "second" not in cache
+
+
+def test_parse_cache_counts_lookups_from_many_threads():
+    cache = ParseCache(maxsize=2)
+
+    def lookup(i):
+        key = f"key{i % 4}"
+        if cache.get(key) is None:
+            cache.set(key, RECORDS)
+
+    with ThreadPoolExecutor(8) as executor:
+        list(executor.map(lookup, range(4000)))
+
+    assert cache.hits + cache.misses == 4000
+    assert len(cache) == 2
+
+
+def test_parse_cache_with_cache_dir_survives_restart(tmp_path):
+    ParseCache(tmp_path).set("key", RECORDS)
+    cache = ParseCache(tmp_path)
+    assert cache.get("key") == RECORDS
+    assert cache.hits == 1
+
+
+def test_parse_cache_ignores_files_of_other_version(tmp_path):
+    ParseCache(tmp_path).set("key", RECORDS)
+    assert ParseCache(tmp_path, version=2).get("key") is None
+
+
+def test_load_birthday_records_parses_unchanged_file_only_once(
+    excel_file, parse_cache, monkeypatch
+):
+    calls = []
+    read = file_parser.read_birthday_records
+    monkeypatch.setattr(
+        file_parser,
+        "read_birthday_records",
+        lambda *args: calls.append(args) or read(*args),
+    )
+    first = file_parser.load_birthday_records(excel_file)
+    second = file_parser.load_birthday_records(excel_file)
+    assert first == second == RECORDS
+    assert len(calls) == 1
+    assert (parse_cache.hits, parse_cache.misses) == (1, 1)
+
+
+def test_load_birthday_records_caches_each_engine_apart(
+    excel_file, parse_cache
+):
+    columns = list(settings.COLUMNS)
+    for engine in ("pandas", "openpyxl"):
+        file_parser.load_birthday_records(excel_file, engine=engine)
+        file_parser.load_birthday_records(excel_file, columns, engine=engine)
+
+    # same columns passed as a list share entries with the defaults
+    assert (parse_cache.hits, parse_cache.misses) == (2, 2)
+    assert len(parse_cache) == 2
+
+
+def test_aload_birthday_records_caches_each_schema_apart(
+    excel_file, parse_cache
+):
+    schema = file_parser.birthday_schema | {
+        "ФИО": {"cond": {"type": str, "ne": "Петров"}}
+    }
+
+    async def run():
+        return (
+            await file_parser.aload_birthday_records(excel_file),
+            await file_parser.aload_birthday_records(
+                excel_file, validation_schema=schema
+            ),
+        )
+
+    records, filtered = asyncio.run(run())
+
+    assert (records, filtered) == (RECORDS, RECORDS[:1])
+    assert (parse_cache.hits, parse_cache.misses) == (0, 2)
+
+
+def test_load_birthday_records_reads_file_like_objects(
+    excel_file, parse_cache
+):
+    buffer = io.BytesIO(excel_file.read_bytes())
+    assert file_parser.load_birthday_records(buffer) == RECORDS
+    assert file_hash(buffer) == file_hash(excel_file)
@@ -0,0 +1,107 @@
+import asyncio
+import datetime as dt
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from app import settings
+from app.utils import Clock
+
+REMOTE_OFFSET = dt.timedelta(days=2, hours=3)
+
+
+class FakeTimeServer:
+    """Local stand-in for worldtimeapi.org."""
+
+    def __init__(self, status: int = 200, delay: float = 0) -> None:
+        self.status = status
+        self.delay = delay
+        self.requests = 0
+
+    async def handle(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        await asyncio.sleep(self.delay)
+        if self.status != 200:
+            return web.Response(status=self.status)
+        now = dt.datetime.now(tz=settings.TIME_ZONE) + REMOTE_OFFSET
+        return web.json_response({"datetime": now.isoformat()})
+
+    async def run(self, check):
+        app = web.Application()
+        app.router.add_get("/api/timezone/Europe/Moscow", self.handle)
+        async with TestServer(app) as server:
+            url = str(server.make_url("/api/timezone/Europe/Moscow"))
+            return await check(url)
+
+
+def system_date(offset: dt.timedelta = dt.timedelta(0)) -> dt.date:
+    return (dt.datetime.now(tz=settings.TIME_ZONE) + offset).date()
+
+
+def test_clock_applies_offset_from_time_server():
+    async def check(url):
+        clock = Clock(url)
+        assert await clock.sync()
+        return clock
+
+    clock = asyncio.run(FakeTimeServer().run(check))
+    assert abs(clock.offset - REMOTE_OFFSET) < dt.timedelta(seconds=1)
+    assert clock.today() == system_date(REMOTE_OFFSET)
+
+
+def test_clock_checks_time_server_at_most_once_per_interval():
+    server = FakeTimeServer()
+
+    async def check(url):
+        clock = Clock(url, sync_interval=3600)
+        for _ in range(100):
+            clock.today()
+            await asyncio.sleep(0)
+        await clock._sync_task
+        clock.today()
+        return clock
+
+    clock = asyncio.run(server.run(check))
+    assert server.requests == 1
+    assert clock.syncs == 1
+
+
+def test_clock_does_not_wait_for_slow_time_server():
+    async def check(url):
+        clock = Clock(url, timeout=5)
+        loop = asyncio.get_running_loop()
+        started_at = loop.time()
+        today = clock.today()
+        elapsed = loop.time() - started_at
+        await clock._sync_task
+        return today, elapsed, clock
+
+    today, elapsed, clock = asyncio.run(FakeTimeServer(delay=0.5).run(check))
+    assert elapsed < 0.1
+    assert today == system_date()
+    assert clock.today() == system_date(REMOTE_OFFSET)
+
+
+@pytest.mark.parametrize("status", [404, 500])
+def test_clock_falls_back_to_system_time_on_server_errors(status):
+    async def check(url):
+        clock = Clock(url, retry_interval=3600)
+        assert not await clock.sync()
+        return clock
+
+    clock = asyncio.run(FakeTimeServer(status=status).run(check))
+    assert clock.failures == 1
+    assert not clock.sync_due
+    assert clock.today() == system_date()
+
+
+def test_clock_falls_back_to_system_time_on_timeout():
+    async def check(url):
+        clock = Clock(url, timeout=0.1)
+        assert not await clock.sync()
+        return clock
+
+    clock = asyncio.run(FakeTimeServer(delay=1).run(check))
+    assert clock.offset == dt.timedelta(0)
+    assert clock.today() == system_date()
@@ -0,0 +1,54 @@
+import asyncio
+import time
+
+import pytest
+
+from app.concurrency import LoopLagMonitor, Offloader, SingleFlight
+
+BLOCKING_TIME = 0.3
+
+
+async def measure_lag(offloader: Offloader) -> LoopLagMonitor:
+    monitor = LoopLagMonitor(interval=0.01)
+    monitor.start()
+    await asyncio.sleep(0.05)
+    await offloader.run(time.sleep, BLOCKING_TIME)
+    await asyncio.sleep(0.05)
+    await monitor.stop()
+    offloader.shutdown()
+    return monitor
+
+
+def test_loop_lag_monitor_detects_blocking_calls():
+    monitor = asyncio.run(measure_lag(Offloader("inline")))
+    assert monitor.max_lag >= BLOCKING_TIME * 0.8
+
+
+@pytest.mark.parametrize("kind", ["thread", "process"])
+def test_offloaded_blocking_calls_do_not_block_event_loop(kind):
+    monitor = asyncio.run(measure_lag(Offloader(kind, max_workers=1)))
+    assert monitor.max_lag < BLOCKING_TIME / 2
+
+
+def test_offloader_rejects_unknown_executor_kind():
+    with pytest.raises(ValueError):
+        Offloader("fiber")
+
+
+def test_single_flight_shares_exception_between_concurrent_callers():
+    flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("download failed")
+
+    async def call_concurrently():
+        return await asyncio.gather(
+            *(flight.do("key", fail) for _ in range(3)),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(call_concurrently())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert (flight.calls, flight.coalesced) == (1, 2)
+    assert not flight.in_flight("key")
@@ -0,0 +1,86 @@
+import threading
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.pool import QueuePool
+
+from app import db, settings
+from app.db import create_sqlite_engine
+
+
+@pytest.fixture
+def file_engine(tmp_path):
+    engine = create_sqlite_engine(f"sqlite:///{tmp_path / 'test.sqlite3'}")
+    yield engine
+    engine.dispose()
+
+
+def pragma(engine, name: str):
+    with engine.connect() as conn:
+        return conn.exec_driver_sql(f"PRAGMA {name}").scalar()
+
+
+def select_sum(engine) -> int:
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT SUM(x) FROM t")).scalar()
+
+
+def test_sqlite_engine_applies_connection_profile_pragmas(file_engine):
+    pragmas = settings.SQLITE_PRAGMAS
+    assert (
+        pragma(file_engine, "journal_mode") == pragmas["journal_mode"].lower()
+    )
+    # NORMAL
+    assert pragma(file_engine, "synchronous") == 1
+    assert pragma(file_engine, "mmap_size") == pragmas["mmap_size"]
+    assert pragma(file_engine, "cache_size") == pragmas["cache_size"]
+    assert pragma(file_engine, "busy_timeout") == pragmas["busy_timeout"]
+
+
+def test_sqlite_engine_uses_bounded_queue_pool_and_no_echo(file_engine):
+    assert isinstance(file_engine.pool, QueuePool)
+    assert file_engine.pool.size() == settings.DB_POOL_SIZE
+    assert file_engine.echo is settings.DB_ECHO is False
+
+
+def test_sqlite_engine_for_in_memory_database_keeps_default_pool():
+    engine = create_sqlite_engine("sqlite://", pragmas={"cache_size": -1024})
+    assert not isinstance(engine.pool, QueuePool)
+    assert pragma(engine, "cache_size") == -1024
+
+
+def test_wal_readers_are_not_blocked_by_open_write_transaction(file_engine):
+    with file_engine.begin() as conn:
+        conn.execute(text("CREATE TABLE t (x INTEGER)"))
+        conn.execute(text("INSERT INTO t VALUES (1)"))
+
+    writer = file_engine.connect()
+    writer.begin()
+    writer.execute(text("INSERT INTO t VALUES (2)"))
+    writer.execute(text("UPDATE t SET x = x + 10"))
+    try:
+        # reading from another thread sees last committed state at once
+        counts = []
+        reader = threading.Thread(
+            target=lambda: counts.append(select_sum(file_engine))
+        )
+        reader.start()
+        reader.join(timeout=5)
+        assert counts == [1]
+    finally:
+        writer.commit()
+        writer.close()
+    assert select_sum(file_engine) == 23
+
+
+def test_session_error_is_rolled_back_and_reraised(file_engine, monkeypatch):
+    monkeypatch.setattr(db, "get_db_engine", lambda: file_engine)
+    with file_engine.begin() as conn:
+        conn.execute(text("CREATE TABLE t (x INTEGER)"))
+
+    with pytest.raises(RuntimeError):
+        with db.get_session() as session:
+            session.execute(text("INSERT INTO t VALUES (1)"))
+            raise RuntimeError("sync failed")
+
+    assert select_sum(file_engine) is None
@@ -0,0 +1,187 @@
+import asyncio
+import datetime as dt
+from functools import partial
+
+import pandas as pd
+import pytest
+from aiogram import Bot
+from aiogram.bot.api import TelegramAPIServer
+from aiohttp.test_utils import TestServer
+
+from app import file_parser
+from app.cache import ParseCache
+from app.digest import DailyDigest, DigestHolder
+from app.mailing import Mailer
+
+from .common import FakeBotApi
+from .test_mailing import FAST_LIMITS, TOKEN
+
+TODAY = dt.date(2023, 5, 2)
+
+
+class FixedClock:
+    def __init__(self, today: dt.date) -> None:
+        self.date = today
+
+    def today(self) -> dt.date:
+        return self.date
+
+
+def digest_builder(today: dt.date, source_hash: str = "hash"):
+    async def build():
+        await asyncio.sleep(0.01)
+        return DailyDigest(today, source_hash, ("message",))
+
+    return build
+
+
+def test_daily_digest_is_immutable():
+    digest = DailyDigest(TODAY, "hash", ("message",))
+    with pytest.raises(AttributeError):
+        digest.messages = ()
+    assert digest.version == "2023-05-02:hash"
+
+
+def test_concurrent_reads_share_one_build_per_day():
+    holder = DigestHolder()
+
+    async def run(today):
+        build = digest_builder(today)
+        return await asyncio.gather(
+            *(holder.get(today, build) for _ in range(300))
+        )
+
+    digests = asyncio.run(run(TODAY))
+    assert len({id(digest) for digest in digests}) == 1
+    assert (holder.builds, holder.swaps, holder.reads) == (1, 1, 300)
+
+    asyncio.run(run(TODAY))
+    assert holder.builds == 1
+
+    tomorrow = TODAY + dt.timedelta(days=1)
+    digest, *_ = asyncio.run(run(tomorrow))
+    assert digest.date == tomorrow
+    assert (holder.builds, holder.swaps) == (2, 2)
+
+
+def test_refresh_swaps_only_new_versions():
+    holder = DigestHolder()
+    first = asyncio.run(holder.refresh(digest_builder(TODAY, "first")))
+    same = asyncio.run(holder.refresh(digest_builder(TODAY, "first")))
+    second = asyncio.run(holder.refresh(digest_builder(TODAY, "second")))
+
+    assert same is first
+    assert second.source_hash == "second"
+    assert (holder.builds, holder.swaps) == (3, 2)
+
+
+def test_failed_build_keeps_current_digest_and_returns_none_for_today():
+    holder = DigestHolder()
+    yesterday = TODAY - dt.timedelta(days=1)
+    asyncio.run(holder.refresh(digest_builder(yesterday)))
+
+    async def fail():
+        return None
+
+    assert asyncio.run(holder.get(TODAY, fail)) is None
+    assert holder.current.date == yesterday
+
+
+@pytest.fixture
+def local_birthday_file(tmp_path, monkeypatch):
+    pd.DataFrame(
+        {"Дата": [2, 3, "?"], "месяц": ["май", "май", "май"]}
+        | {"ФИО": ["Иванов", "Петров", "Сидоров"]}
+    ).to_excel(tmp_path / file_parser.settings.OUTPUT_FILE_NAME, index=False)
+
+    async def token_expired(bot):
+        token_checks.append(bot)
+        return False
+
+    token_checks = []
+
+    monkeypatch.setattr(file_parser.settings, "BASE_DIR", tmp_path)
+    monkeypatch.setattr(file_parser, "check_yadisk_token", token_expired)
+    monkeypatch.setattr(file_parser, "clock", FixedClock(TODAY))
+    monkeypatch.setattr(file_parser, "parse_cache", ParseCache())
+    monkeypatch.setattr(file_parser, "daily_digest", DigestHolder())
+    return token_checks
+
+
+def test_mailing_to_many_chats_renders_digest_once(
+    local_birthday_file, monkeypatch
+):
+    api = FakeBotApi()
+    chat_ids = list(range(1, 301))
+    builds = 0
+    build_daily_digest = file_parser.build_daily_digest
+
+    async def counting_build(*args, **kwargs):
+        nonlocal builds
+        builds += 1
+        return await build_daily_digest(*args, **kwargs)
+
+    monkeypatch.setattr(file_parser, "build_daily_digest", counting_build)
+    monkeypatch.setattr(
+        file_parser,
+        "Mailer",
+        partial(Mailer, concurrency=50, **FAST_LIMITS),
+    )
+
+    async def run():
+        async with TestServer(api.app) as server:
+            bot = Bot(
+                TOKEN,
+                server=TelegramAPIServer.from_base(str(server.make_url(""))),
+            )
+            monkeypatch.setattr(file_parser, "find_bot", lambda path: bot)
+            try:
+                await file_parser.dispatch_mailing("bot", chat_ids[:150])
+                await asyncio.gather(
+                    *(
+                        file_parser.dispatch_message_to_chat("bot", chat_id)
+                        for chat_id in chat_ids[150:]
+                    )
+                )
+            finally:
+                await (await bot.get_session()).close()
+
+    asyncio.run(run())
+
+    digest = file_parser.daily_digest.current
+    assert builds == 1
+    assert file_parser.daily_digest.builds == 1
+    assert digest.date == TODAY
+    warning, today, future = digest.messages
+    assert "Данные актуальны на" in warning
+    assert "Иванов" in today
+    assert "Петров" in future
+    for chat_id in chat_ids:
+        assert [text for _, text in api.sent[chat_id]] == list(digest.messages)
+
+
+def test_preload_reuses_digest_built_by_earlier_mailing_today(
+    local_birthday_file, monkeypatch
+):
+    bot, db_updates = Bot(TOKEN), []
+
+    async def update_db_from_yadisk():
+        db_updates.append(True)
+
+    monkeypatch.setattr(file_parser, "get_bot", lambda: bot)
+    monkeypatch.setattr(
+        file_parser, "update_db_from_yadisk", update_db_from_yadisk
+    )
+
+    async def run():
+        # mailing slot before the preload time
+        digest = await file_parser.get_daily_digest(bot)
+        await file_parser.preload_birthday_messages()
+        return digest
+
+    digest = asyncio.run(run())
+
+    assert file_parser.daily_digest.current is digest
+    assert file_parser.daily_digest.builds == 1
+    assert len(local_birthday_file) == 1
+    assert db_updates == [True]
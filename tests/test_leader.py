@@ -0,0 +1,267 @@
+import asyncio
+import multiprocessing
+import os
+import signal
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import Session
+
+from app import file_parser
+from app.db import create_async_sqlite_engine, create_sqlite_engine
+from app.db.models import Lease
+from app.leader import LeaderElector
+
+from .test_async_db import db_path  # noqa: F401
+
+TTL = 1.0
+RENEW_INTERVAL = 0.2
+# time for a process to notice the change and commit
+SLACK = 1.0
+
+
+def session_factory(db_path: Path):
+    @asynccontextmanager
+    async def get_async_session():
+        engine = create_async_sqlite_engine(f"sqlite+aiosqlite:///{db_path}")
+        try:
+            async with async_sessionmaker(
+                engine, expire_on_commit=False
+            )() as session:
+                yield session
+        finally:
+            await engine.dispose()
+
+    return get_async_session
+
+
+@pytest.fixture
+def engine(db_path):
+    engine = create_sqlite_engine(f"sqlite:///{db_path}")
+    yield engine
+    engine.dispose()
+
+
+def lease_holder(engine, name: str = "scheduler"):
+    with Session(engine) as session:
+        return Lease.operations.holder(session, name)
+
+
+def test_lease_is_taken_by_others_only_after_expiry(engine):
+    with Session(engine) as session:
+        acquire = Lease.operations.acquire
+        assert acquire(session, "job", "a", ttl=10, now=100)
+        assert not acquire(session, "job", "b", ttl=10, now=105)
+        assert acquire(session, "job", "a", ttl=10, now=108)  # renewed
+        assert not acquire(session, "job", "b", ttl=10, now=115)
+        assert acquire(session, "job", "b", ttl=10, now=118)
+        assert Lease.operations.holder(session, "job", now=120) == "b"
+        assert not Lease.operations.release(session, "job", "a")
+        assert Lease.operations.release(session, "job", "b")
+        assert Lease.operations.holder(session, "job", now=120) is None
+
+        claim = Lease.operations.claim
+        assert claim(session, "run", "a", ttl=10, now=100)
+        assert not claim(session, "run", "a", ttl=10, now=105)
+        assert claim(session, "run", "a", ttl=10, now=110)
+
+
+def test_elector_calls_back_on_election_and_release(db_path):
+    events = []
+    elector = LeaderElector(
+        holder="a",
+        ttl=TTL,
+        renew_interval=RENEW_INTERVAL,
+        on_elected=lambda: events.append("elected"),
+        on_demoted=lambda: events.append("demoted"),
+        session_factory=session_factory(db_path),
+    )
+    follower = LeaderElector(
+        holder="b", ttl=TTL, session_factory=session_factory(db_path)
+    )
+
+    async def run():
+        await elector.start()
+        await follower.start()
+        leaders = elector.is_leader, follower.is_leader
+        await elector.stop()
+        await follower.try_acquire()
+        await follower.stop()
+        return leaders
+
+    assert asyncio.run(run()) == (True, False)
+    assert events == ["elected", "demoted"]
+    assert follower.elections == 1
+
+
+def test_leader_steps_down_when_lease_can_not_be_renewed(db_path):
+    sessions = session_factory(db_path)
+    broken = False
+
+    @asynccontextmanager
+    async def flaky_sessions():
+        if broken:
+            raise ConnectionError("database is unavailable")
+        async with sessions() as session:
+            yield session
+
+    elector = LeaderElector(
+        holder="a", ttl=0.3, session_factory=flaky_sessions
+    )
+
+    async def run():
+        nonlocal broken
+        await elector.try_acquire()
+        broken = True
+        # own lease has not expired yet
+        still_leader = await elector.try_acquire()
+        await asyncio.sleep(0.3)
+        return still_leader, await elector.try_acquire()
+
+    assert asyncio.run(run()) == (True, False)
+    assert elector.failures == 2
+
+
+def test_slot_mailing_is_sent_once_per_day_by_all_replicas(
+    db_path, monkeypatch
+):
+    mailings = []
+
+    async def dispatch_mailing(bot_path, chat_ids):
+        mailings.append(chat_ids)
+
+    monkeypatch.setattr(file_parser, "dispatch_mailing", dispatch_mailing)
+    monkeypatch.setattr(
+        file_parser, "get_async_session", session_factory(db_path)
+    )
+
+    async def run():
+        await asyncio.gather(
+            *(file_parser.dispatch_slot_mailing("bot", 360) for _ in range(3))
+        )
+        await file_parser.dispatch_slot_mailing("bot", 420)
+
+    asyncio.run(run())
+    assert len(mailings) == 2
+
+
+def test_failed_slot_mailing_releases_its_run_lock(
+    db_path, engine, monkeypatch
+):
+    mailings = []
+
+    async def dispatch_mailing(bot_path, chat_ids):
+        mailings.append(chat_ids)
+        if len(mailings) == 1:
+            raise ConnectionError("Telegram is unreachable")
+
+    monkeypatch.setattr(file_parser, "dispatch_mailing", dispatch_mailing)
+    monkeypatch.setattr(
+        file_parser, "get_async_session", session_factory(db_path)
+    )
+
+    async def run():
+        with pytest.raises(ConnectionError):
+            await file_parser.dispatch_slot_mailing("bot", 360)
+        # the next run (e.g. by a new leader) sends it, once
+        await file_parser.dispatch_slot_mailing("bot", 360)
+        await file_parser.dispatch_slot_mailing("bot", 360)
+
+    asyncio.run(run())
+    assert len(mailings) == 2
+    # sent mailing is locked for the rest of the day
+    with Session(engine) as session:
+        (lease,) = session.scalars(select(Lease)).all()
+    assert lease.expires_at > time.time() + file_parser.SENDING_LOCK_TTL
+
+
+def elect(db_path: Path, ticks_path: Path) -> None:
+    """
+    Replica process: take part in election and, while leader, record
+    a tick every 0.05 s as `pid tick` lines, where tick is
+    the number of the current 0.1 s interval.
+    """
+
+    async def main():
+        stopped = asyncio.Event()
+        asyncio.get_running_loop().add_signal_handler(
+            signal.SIGTERM, stopped.set
+        )
+        elector = LeaderElector(
+            holder=str(os.getpid()),
+            ttl=TTL,
+            renew_interval=RENEW_INTERVAL,
+            session_factory=session_factory(db_path),
+        )
+        await elector.start()
+        with open(ticks_path, "a") as ticks:
+            while not stopped.is_set():
+                if elector.is_leader:
+                    ticks.write(f"{os.getpid()} {int(time.time() * 10)}\n")
+                    ticks.flush()
+                await asyncio.sleep(0.05)
+        await elector.stop()
+
+    asyncio.run(main())
+
+
+def wait_for_leader(engine, processes, other_than=None, timeout=10):
+    """Return leader process and seconds it took to elect it."""
+    started_at = time.monotonic()
+    while time.monotonic() - started_at < timeout:
+        holder = lease_holder(engine)
+        if holder is not None and holder != other_than:
+            return processes[int(holder)], time.monotonic() - started_at
+        time.sleep(0.02)
+    raise AssertionError("no leader elected")
+
+
+def test_one_leader_among_processes_and_bounded_failover(
+    db_path, engine, tmp_path
+):
+    ticks_path = tmp_path / "ticks"
+    context = multiprocessing.get_context("spawn")
+    processes = {}
+    for _ in range(3):
+        process = context.Process(target=elect, args=(db_path, ticks_path))
+        process.start()
+        processes[process.pid] = process
+    try:
+        leader, _ = wait_for_leader(engine, processes, timeout=30)
+        time.sleep(1)
+        assert lease_holder(engine) == str(leader.pid)
+
+        # crashed leader is replaced after its lease expires
+        os.kill(leader.pid, signal.SIGKILL)
+        leader.join()
+        leader, failover = wait_for_leader(
+            engine, processes, other_than=str(leader.pid)
+        )
+        assert failover <= TTL + RENEW_INTERVAL + SLACK
+        time.sleep(0.5)
+
+        # leader which stopped gracefully is replaced at once
+        leader.terminate()
+        leader.join()
+        _, failover = wait_for_leader(
+            engine, processes, other_than=str(leader.pid)
+        )
+        assert failover <= RENEW_INTERVAL + SLACK
+        time.sleep(0.5)
+    finally:
+        for process in processes.values():
+            process.kill()
+            process.join()
+
+    ticks = {}
+    for line in ticks_path.read_text().splitlines():
+        pid, tick = line.split()
+        ticks.setdefault(tick, set()).add(pid)
+    leaders = {pid for pids in ticks.values() for pid in pids}
+    assert len(leaders) == 3
+    # never two leaders at once
+    assert all(len(pids) == 1 for pids in ticks.values())
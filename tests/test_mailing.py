@@ -0,0 +1,104 @@
+import asyncio
+
+from aiogram import Bot
+from aiogram.bot.api import TelegramAPIServer
+from aiohttp.test_utils import TestServer
+
+from app.mailing import Mailer, RateLimiter
+
+from .common import FakeBotApi
+
+TOKEN = "123456:ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghi"
+MESSAGES = ["first", "second"]
+FAST_LIMITS = dict(global_rate=1000, chat_interval=0.01, group_interval=0.01)
+
+
+def deliver(api: FakeBotApi, chat_ids: list[int], **options):
+    async def run():
+        async with TestServer(api.app) as server:
+            bot = Bot(
+                TOKEN,
+                server=TelegramAPIServer.from_base(str(server.make_url(""))),
+            )
+            try:
+                return await Mailer(bot, **options).deliver(chat_ids, MESSAGES)
+            finally:
+                await (await bot.get_session()).close()
+
+    return asyncio.run(run())
+
+
+def test_mailing_delivers_all_messages_in_order_to_every_chat():
+    api = FakeBotApi()
+    chat_ids = list(range(1, 51)) + [-100, -200]
+
+    report = deliver(api, chat_ids, concurrency=10, **FAST_LIMITS)
+
+    assert (report.sent, report.failed, report.retries) == (104, 0, 0)
+    assert len(report.latencies) == 104
+    assert 0 < report.percentile(50) <= report.percentile(99)
+    for chat_id in chat_ids:
+        assert [text for _, text in api.sent[chat_id]] == MESSAGES
+
+
+def test_mailing_respects_chat_intervals():
+    api = FakeBotApi()
+    options = dict(FAST_LIMITS, chat_interval=0.2, group_interval=0.4)
+
+    deliver(api, [1, 2, -1], concurrency=3, **options)
+
+    for chat_id, interval in ((1, 0.2), (2, 0.2), (-1, 0.4)):
+        (first, _), (second, _) = api.sent[chat_id]
+        assert second - first >= interval * 0.9
+
+
+def test_mailing_respects_global_rate():
+    api = FakeBotApi()
+    options = dict(FAST_LIMITS, global_rate=50)
+
+    deliver(api, list(range(1, 21)), concurrency=20, **options)
+
+    times = api.send_times()
+    assert len(times) == 40
+    assert times[-1] - times[0] >= 39 / 50 * 0.9
+
+
+def test_mailing_pauses_all_sending_on_flood_control_and_retries():
+    api = FakeBotApi(flood={3: 1}, retry_after=1)
+
+    report = deliver(api, list(range(1, 11)), concurrency=5, **FAST_LIMITS)
+
+    assert (report.sent, report.failed, report.retries) == (20, 0, 1)
+    assert [text for _, text in api.sent[3]] == MESSAGES
+    assert report.percentile(99) >= 1
+    # only requests already in flight may complete during the pause
+    (flooded_at,) = api.flooded_at
+    paused = [
+        t for t in api.send_times() if flooded_at + 0.1 < t < flooded_at + 1
+    ]
+    assert paused == []
+
+
+def test_mailing_skips_unavailable_chat_and_delivers_to_others():
+    api = FakeBotApi(blocked=(2,))
+
+    report = deliver(api, [1, 2, 3], concurrency=2, **FAST_LIMITS)
+
+    assert (report.sent, report.failed) == (4, 2)
+    assert 2 not in api.sent
+
+
+def test_mailing_gives_up_after_max_retries():
+    api = FakeBotApi(flood={1: 10}, retry_after=1)
+
+    report = deliver(api, [1], max_retries=1, **FAST_LIMITS)
+
+    assert (report.sent, report.failed, report.retries) == (0, 2, 2)
+
+
+def test_rate_limiter_lets_burst_through_then_spaces_calls():
+    limiter = RateLimiter(interval=1, burst=3)
+    delays = [limiter.reserve() for _ in range(5)]
+    assert delays[:3] == [0, 0, 0]
+    assert 0.9 < delays[3] <= 1
+    assert 1.9 < delays[4] <= 2
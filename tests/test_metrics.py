@@ -0,0 +1,142 @@
+import asyncio
+
+from aiohttp.test_utils import TestClient, TestServer
+from apscheduler.jobstores.memory import MemoryJobStore
+
+from app import metrics
+from app.metrics import (
+    NULL_CHILD,
+    Counter,
+    Gauge,
+    Histogram,
+    MetricsRegistry,
+    MetricsServer,
+)
+from app.scheduler import BotScheduler
+
+from .common import FakeBotApi
+from .test_mailing import FAST_LIMITS, deliver
+
+
+def test_metrics_are_rendered_in_prometheus_text_format():
+    registry = MetricsRegistry()
+    hits = Counter("hits_total", "Hits.", ["cache"], registry=registry)
+    jobs = Gauge("jobs", "Jobs.", registry=registry)
+    seconds = Histogram(
+        "stage_seconds", "Stages.", ["stage"], [0.1, 1], registry=registry
+    )
+    hits.labels(cache='say "hi"').inc()
+    hits.labels(cache='say "hi"').inc(2)
+    jobs.labels().set_function(lambda: 7)
+    for value in (0.05, 0.5, 0.7, 3):
+        seconds.labels(stage="parse").observe(value)
+
+    assert registry.render().splitlines() == [
+        "# HELP hits_total Hits.",
+        "# TYPE hits_total counter",
+        'hits_total{cache="say \\"hi\\""} 3.0',
+        "# HELP jobs Jobs.",
+        "# TYPE jobs gauge",
+        "jobs 7.0",
+        "# HELP stage_seconds Stages.",
+        "# TYPE stage_seconds histogram",
+        'stage_seconds_bucket{stage="parse",le="0.1"} 1',
+        'stage_seconds_bucket{stage="parse",le="1.0"} 3',
+        'stage_seconds_bucket{stage="parse",le="+Inf"} 4',
+        'stage_seconds_sum{stage="parse"} 4.25',
+        'stage_seconds_count{stage="parse"} 4',
+    ]
+
+
+def test_disabled_metrics_record_nothing():
+    registry = MetricsRegistry(enabled=False)
+    seconds = Histogram("stage_seconds", "Stages.", registry=registry)
+
+    with seconds.labels().time():
+        pass
+
+    assert seconds.labels() is NULL_CHILD
+    registry.enabled = True
+    assert "stage_seconds_count" not in registry.render()
+
+
+def test_metrics_server_serves_registry():
+    registry = MetricsRegistry()
+    seconds = Histogram("stage_seconds", "Stages.", registry=registry)
+    with seconds.labels().time():
+        pass
+
+    async def scrape():
+        app = MetricsServer(registry).make_app()
+        async with TestClient(TestServer(app)) as client:
+            response = await client.get("/metrics")
+            return (
+                response.status,
+                response.content_type,
+                await response.text(),
+            )
+
+    status, content_type, text = asyncio.run(scrape())
+    assert (status, content_type) == (200, "text/plain")
+    assert "stage_seconds_count 1" in text
+
+
+def test_mailing_records_send_time_and_failures_by_reason(monkeypatch):
+    monkeypatch.setattr(metrics.REGISTRY, "enabled", True)
+    send = metrics.stage_seconds.labels(stage="send")
+    sent_before = send.count
+    failures = metrics.delivery_failures.labels(reason="forbidden")
+    failed_before = failures.get()
+    api = FakeBotApi(blocked=[-7001])
+
+    deliver(api, [7001, -7001], **FAST_LIMITS)
+
+    # blocked chat is tried once, remaining message is not sent
+    assert send.count - sent_before == 3
+    assert failures.get() - failed_before == 2
+    assert (
+        f'bdaybot_delivery_failures_total{{reason="forbidden"}} '
+        f"{failures.get()}" in metrics.REGISTRY.render()
+    )
+
+
+def test_scheduler_jobs_gauge_follows_added_and_removed_jobs(monkeypatch):
+    monkeypatch.setattr(metrics.REGISTRY, "enabled", True)
+    jobs = metrics.scheduler_jobs.labels()
+
+    async def run():
+        scheduler = BotScheduler(jobstores={"default": MemoryJobStore()})
+        scheduler.start(paused=True)
+        scheduler.sync_mailing_slots([540, 600])
+        assert jobs.get() == 2
+        scheduler.sync_mailing_slots([600])
+        assert jobs.get() == 1
+        scheduler.remove_all_jobs()
+        assert jobs.get() == 0
+        scheduler.shutdown(wait=False)
+
+    asyncio.run(run())
+
+
+def test_scheduler_jobs_are_not_listed_while_metrics_are_disabled(
+    monkeypatch,
+):
+    monkeypatch.setattr(metrics.REGISTRY, "enabled", False)
+    listed = []
+
+    async def run():
+        scheduler = BotScheduler(jobstores={"default": MemoryJobStore()})
+        get_jobs = scheduler.get_jobs
+        monkeypatch.setattr(
+            scheduler,
+            "get_jobs",
+            lambda *args: listed.append(args) or get_jobs(*args),
+        )
+        scheduler.start(paused=True)
+        for utc_minute in range(100):
+            scheduler.add_mailing_slot(utc_minute)
+        scheduler.shutdown(wait=False)
+
+    asyncio.run(run())
+
+    assert listed == []
@@ -0,0 +1,76 @@
+import datetime as dt
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import Session
+
+from app.db import models
+from app.db.migrations import upgrade_schema
+
+LEGACY_BIRTHDAY_TABLE = """
+CREATE TABLE birthday (
+    id INTEGER NOT NULL PRIMARY KEY,
+    name VARCHAR(128) UNIQUE,
+    date DATE
+)
+"""
+
+
+@pytest.fixture
+def legacy_engine(tmp_path):
+    """Engine of SQLite file created before `month` and `day` columns."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.sqlite3'}")
+    with engine.begin() as conn:
+        conn.execute(text(LEGACY_BIRTHDAY_TABLE))
+        conn.execute(
+            text("INSERT INTO birthday (name, date) VALUES (:name, :date)"),
+            [
+                {"name": "name0", "date": "1990-12-31"},
+                {"name": "name1", "date": "2023-03-08"},
+            ],
+        )
+    yield engine
+    engine.dispose()
+
+
+def test_upgrade_schema_adds_month_day_columns_and_indexes(legacy_engine):
+    applied = upgrade_schema(legacy_engine)
+
+    assert "add column birthday.month" in applied
+    assert "add column birthday.day" in applied
+    assert "create index ix_birthday_month_day" in applied
+    assert "create index ix_birthday_date" in applied
+    inspector = inspect(legacy_engine)
+    index_names = {i["name"] for i in inspector.get_indexes("birthday")}
+    assert {"ix_birthday_month_day", "ix_birthday_date"} <= index_names
+
+
+def test_upgrade_schema_keeps_data_and_computes_month_day(legacy_engine):
+    upgrade_schema(legacy_engine)
+
+    with Session(legacy_engine) as session:
+        birthdays = models.Birthday.queries.all(session)
+        assert [(b.name, b.month, b.day) for b in birthdays] == [
+            ("name0", 12, 31),
+            ("name1", 3, 8),
+        ]
+        future = models.Birthday.queries.future(session, dt.date(2023, 12, 30))
+        assert [b.name for b in future] == ["name0"]
+
+
+def test_upgrade_schema_is_idempotent(legacy_engine):
+    upgrade_schema(legacy_engine)
+    assert upgrade_schema(legacy_engine) == []
+
+
+def test_upgrade_schema_creates_missing_tables(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'new.sqlite3'}")
+    applied = upgrade_schema(engine)
+    assert applied == [
+        "create table birthday",
+        "create table lease",
+        "create table tg_chat",
+    ]
+    assert inspect(engine).has_table("birthday")
+    assert inspect(engine).has_table("tg_chat")
+    engine.dispose()
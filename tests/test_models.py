@@ -1,9 +1,10 @@
 import datetime as dt
 
 import pytest
-from sqlalchemy import select
+from sqlalchemy import event, select
 from sqlalchemy.exc import SQLAlchemyError
 
+from app import file_parser
 from app.db import models
 
 from .common import constants, today
@@ -101,7 +102,7 @@ def test_birthday_between_method_with_valid_string_dates_returns_list_of_model_i
     assert len(birthdays) == constants["TODAY_BDAY_NUM"]
 
 
-def test_birthday_between_method_with_invalid_string_dates_returns_list_of_current_year_model_instances(
+def test_birthday_between_method_with_invalid_string_dates_returns_list_of_whole_year_model_instances(
     db_session, create_test_data
 ):
     # prepartion stage: add random last year birthday
@@ -116,8 +117,7 @@ def test_birthday_between_method_with_invalid_string_dates_returns_list_of_curre
         db_session, invalid_start, invalid_end
     )
     birthday_num = models.Birthday.queries.count(db_session)
-    assert len(birthdays) == birthday_num - 1
-    assert all(birthday.date > last_year_date for birthday in birthdays)
+    assert len(birthdays) == birthday_num
 
 
 def test_birthday_today_method_returns_list_of_instances_with_current_date(
@@ -142,18 +142,40 @@ def test_birthday_future_method_returns_list_of_instaces_with_date_between_tomor
     assert len(future_birthdays) == constants["FUTURE_BDAY_NUM"]
 
 
-def test_birthday_future_all_method_returns_list_of_instaces_with_date_greater_than_today(
-    db_session, create_test_data
+def test_birthday_date_queries_find_birthdays_synced_in_leap_year(
+    db_session,
 ):
-    # prepartion stage: add random next year birthday
-    next_year_date = dt.date(year=today().year + 1, month=7, day=1)
-    next_year_birthday = models.Birthday(name="valid", date=next_year_date)
-    db_session.add(next_year_birthday)
+    rows = file_parser.birthday_rows(
+        [
+            (30, "декабрь", "today"),
+            (31, "декабрь", "tomorrow"),
+            (1, "январь", "new year"),
+            (29, "февраль", "leap day"),
+            (1, "июль", "summer"),
+        ]
+    )
+    models.Birthday.operations.sync_table(db_session, rows)
     db_session.commit()
-
-    future_birthdays = models.Birthday.queries.future_all(db_session)
-    assert isinstance(future_birthdays, list)
-    assert len(future_birthdays) == constants["FUTURE_BDAY_NUM"] + 1
+    today_ = dt.date(2023, 12, 30)
+
+    def names(birthdays):
+        return sorted(birthday.name for birthday in birthdays)
+
+    queries = models.Birthday.queries
+    assert names(queries.between(db_session, today_, today_)) == ["today"]
+    assert names(queries.between(db_session, "2023-12-31", "2024-01-01")) == [
+        "new year",
+        "tomorrow",
+    ]
+    assert names(
+        queries.between(db_session, dt.date(2023, 2, 1), dt.date(2023, 2, 28))
+    ) == ["leap day"]
+    assert names(queries.future_all(db_session, today_)) == ["tomorrow"]
+    assert names(queries.future_all(db_session, dt.date(2023, 6, 30))) == [
+        "summer",
+        "today",
+        "tomorrow",
+    ]
 
 
 def test_birthday_refresh_table_method_deletes_all_rows_and_populates_db_again(
@@ -208,3 +230,134 @@ def test_birthday_sqlite_upsert_method_updates_instance_instead_of_creating(
     current_birthday_num = models.Birthday.queries.count(db_session)
 
     assert current_birthday_num == initial_birthday_num
+
+
+def explain_query_plan(db_session, query, *args) -> str:
+    """Run `query` and return SQLite query plan of its last statement."""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, *args):
+        statements.append((statement, parameters))
+
+    connection = db_session.connection()
+    event.listen(connection, "before_cursor_execute", capture)
+    try:
+        query(db_session, *args)
+    finally:
+        event.remove(connection, "before_cursor_execute", capture)
+    statement, parameters = statements[-1]
+    plan = connection.exec_driver_sql(
+        f"EXPLAIN QUERY PLAN {statement}", parameters
+    )
+    return "\n".join(row[-1] for row in plan)
+
+
+@pytest.mark.parametrize(
+    "query, args",
+    [
+        (models.Birthday.queries.today, (dt.date(2023, 3, 8),)),
+        (models.Birthday.queries.future, (dt.date(2023, 3, 8), 3)),
+        (models.Birthday.queries.future, (dt.date(2023, 12, 30), 3)),
+        (
+            models.Birthday.queries.between,
+            (dt.date(2023, 3, 8), dt.date(2023, 3, 8)),
+        ),
+        (models.Birthday.queries.future_all, (dt.date(2023, 3, 8),)),
+    ],
+)
+def test_birthday_recurring_queries_use_month_day_index(
+    db_session, create_test_data, query, args
+):
+    plan = explain_query_plan(db_session, query, *args)
+    assert "SEARCH birthday USING INDEX ix_birthday_month_day" in plan
+    assert "SCAN" not in plan
+
+
+def test_birthday_month_and_day_are_computed_from_date(db_session):
+    models.Birthday.operations.refresh_table(
+        db_session, [{"name": "valid", "date": dt.date(2001, 2, 9)}]
+    )
+    birthday = models.Birthday.queries.get(db_session, "valid")
+    assert (birthday.month, birthday.day) == (2, 9)
+
+
+@pytest.mark.parametrize(
+    "today_, delta, expected_names",
+    [
+        (dt.date(2023, 12, 30), 3, ["dec31", "jan1", "jan2"]),
+        (dt.date(2023, 2, 27), 1, ["feb28", "feb29"]),
+        (dt.date(2024, 2, 27), 1, ["feb28"]),
+        (dt.date(2023, 2, 28), 1, ["mar1"]),
+    ],
+)
+def test_birthday_future_method_handles_year_wrap_and_february_29(
+    db_session, today_, delta, expected_names
+):
+    dates = {
+        "dec30": dt.date(1990, 12, 30),
+        "dec31": dt.date(1985, 12, 31),
+        "jan1": dt.date(1970, 1, 1),
+        "jan2": dt.date(2000, 1, 2),
+        "jan3": dt.date(2000, 1, 3),
+        "feb28": dt.date(1999, 2, 28),
+        "feb29": dt.date(1996, 2, 29),
+        "mar1": dt.date(1999, 3, 1),
+    }
+    models.Birthday.operations.refresh_table(
+        db_session, [{"name": name, "date": d} for name, d in dates.items()]
+    )
+    birthdays = models.Birthday.queries.future(db_session, today_, delta)
+    assert sorted(b.name for b in birthdays) == sorted(expected_names)
+
+
+def test_birthday_sync_table_applies_only_changed_rows(
+    db_session, create_birthday_range
+):
+    # 400 birthdays named name1..name400 with today's date
+    new_date = today() + dt.timedelta(days=1)
+    mappings = [{"name": f"name{i}", "date": today()} for i in range(1, 301)]
+    mappings += [
+        {"name": f"name{i}", "date": new_date} for i in range(301, 351)
+    ]
+    mappings += [{"name": f"new{i}", "date": new_date} for i in range(20)]
+
+    report = models.Birthday.operations.sync_table(
+        db_session, mappings, batch_size=7
+    )
+    db_session.commit()
+
+    assert (report.inserted, report.updated, report.deleted) == (20, 50, 50)
+    assert report.unchanged == 300
+    assert report.changed == 120
+    assert models.Birthday.queries.count(db_session) == 370
+    assert models.Birthday.queries.get(db_session, "name400") is None
+    assert models.Birthday.queries.get(db_session, "name350").date == new_date
+    assert models.Birthday.queries.get(db_session, "new0").date == new_date
+
+
+def test_birthday_sync_table_keeps_ids_of_unchanged_and_updated_rows(
+    db_session, create_birthday_range
+):
+    ids = {b.name: b.id for b in models.Birthday.queries.all(db_session)}
+    mappings = [
+        {"name": "name1", "date": today()},
+        {"name": "name2", "date": today() + dt.timedelta(days=1)},
+    ]
+    models.Birthday.operations.sync_table(db_session, mappings)
+    db_session.commit()
+    db_session.expire_all()
+
+    birthdays = models.Birthday.queries.all(db_session)
+    assert {b.name: b.id for b in birthdays} == {
+        "name1": ids["name1"],
+        "name2": ids["name2"],
+    }
+
+
+def test_birthday_sync_table_without_changes_reports_nothing_changed(
+    db_session, create_birthday_range
+):
+    mappings = [{"name": f"name{i}", "date": today()} for i in range(1, 401)]
+    report = models.Birthday.operations.sync_table(db_session, mappings)
+    assert report.changed == 0
+    assert report.unchanged == 400
@@ -0,0 +1,140 @@
+import asyncio
+import datetime as dt
+import time
+
+from aiogram import Bot, Dispatcher, types
+from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
+
+from app import profiling, scheduler
+from app.profiling import Profiler
+from app.scheduler import MAILING_SYNC_JOB_ID, BotScheduler
+
+from .test_mailing import TOKEN
+from .test_webhook import message_update
+
+
+def busy(seconds: float) -> None:
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+async def job(seconds: float) -> str:
+    busy(seconds)
+    await asyncio.sleep(0)
+    return "done"
+
+
+def test_profiler_keeps_slowest_calls_and_latest_profiles(tmp_path):
+    profiler = Profiler(True, tmp_path, top_n=2, max_files=2)
+
+    async def run():
+        for name, seconds in (("a", 0.02), ("b", 0.06), ("c", 0.04)):
+            assert await profiler.run(name, job(seconds)) == "done"
+
+    asyncio.run(run())
+
+    assert [call.name for call in profiler.slowest()] == ["b", "c"]
+    assert sorted(tmp_path.iterdir()) == sorted(
+        call.path for call in profiler.slowest()
+    )
+    slowest = profiler.slowest()[0]
+    assert "busy" in profiler.hot_spots(slowest)
+    assert "b" in profiler.report().splitlines()[2]
+
+
+def test_profiler_keeps_no_paths_of_rotated_out_profiles(tmp_path):
+    profiler = Profiler(True, tmp_path, top_n=3, max_files=1)
+
+    async def run():
+        for name, seconds in (("a", 0.05), ("b", 0.01), ("c", 0.02)):
+            await profiler.run(name, job(seconds))
+
+    asyncio.run(run())
+
+    a, c, b = profiler.slowest()
+    assert (a.name, a.path, b.path) == ("a", None, None)
+    assert c.path.is_file()
+    assert "busy" in profiler.hot_spots(c)
+
+
+def test_disabled_profiler_only_awaits(tmp_path):
+    profiler = Profiler(False, tmp_path)
+
+    assert asyncio.run(profiler.run("a", job(0))) == "done"
+    assert (profiler.calls, list(tmp_path.iterdir())) == (0, [])
+
+
+def test_concurrent_calls_are_timed_but_one_is_profiled(tmp_path):
+    profiler = Profiler(True, tmp_path)
+
+    async def slow():
+        await asyncio.sleep(0.05)
+
+    async def run():
+        await asyncio.gather(*(profiler.run(f"{i}", slow()) for i in range(3)))
+
+    asyncio.run(run())
+
+    calls = profiler.slowest()
+    assert len(calls) == 3
+    assert len([call for call in calls if call.path]) == 1
+    assert all(call.duration >= 0.05 for call in calls)
+
+
+def test_scheduled_jobs_are_profiled_and_kept_in_jobstore(
+    tmp_path, monkeypatch
+):
+    monkeypatch.setattr(profiling.profiler, "enabled", True)
+    monkeypatch.setattr(profiling.profiler, "output_dir", tmp_path)
+    monkeypatch.setattr(profiling.profiler, "_slowest", [])
+    synced = []
+
+    class Leader:
+        async def load_subscribed_slots(self):
+            synced.append(True)
+
+    monkeypatch.setattr(scheduler, "Scheduler", Leader())
+    jobstore = SQLAlchemyJobStore(f"sqlite:///{tmp_path / 'jobs.sqlite'}")
+
+    async def run():
+        bot_scheduler = BotScheduler(jobstores={"default": jobstore})
+        bot_scheduler.start(paused=True)
+        bot_scheduler.setup_daily_message_preload()
+        bot_scheduler.setup_mailing_slots_refresh()
+        bot_scheduler.setup_mailing_slots_sync()
+        bot_scheduler.add_mailing_slot(540)
+        # jobs are read back from the database with profiled functions
+        jobs = jobstore.get_all_jobs()
+        bot_scheduler.shutdown(wait=False)
+        assert len(jobs) == 4
+        assert all(hasattr(job.func, "__wrapped__") for job in jobs)
+        (sync,) = [job for job in jobs if job.id == MAILING_SYNC_JOB_ID]
+        await sync.func()
+
+    asyncio.run(run())
+
+    (call,) = profiling.profiler.slowest()
+    assert synced and call.name == "sync_mailing_slots"
+    assert call.path.is_file()
+
+
+def test_wrapped_handler_is_dispatched_and_profiled(tmp_path):
+    profiler = Profiler(True, tmp_path)
+    texts = []
+
+    async def cmd_bdays(message: types.Message):
+        texts.append(message.text)
+
+    async def run():
+        dp = Dispatcher(Bot(TOKEN))
+        dp.register_message_handler(
+            profiler.wrap(cmd_bdays), commands=["bdays"]
+        )
+        Bot.set_current(dp.bot)
+        await dp.process_update(types.Update(**message_update(1, 1, "/bdays")))
+
+    asyncio.run(run())
+
+    assert texts == ["/bdays"]
+    assert [call.name for call in profiler.slowest()] == ["cmd_bdays"]
@@ -0,0 +1,105 @@
+import asyncio
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from aiogram import Bot, Dispatcher
+from aiogram.bot.api import TelegramAPIServer
+from aiohttp.test_utils import TestServer
+
+import main
+from app import db, scheduler, settings
+from app.leader import LeaderElector
+from app.scheduler import (
+    MAILING_REFRESH_JOB_ID,
+    MAILING_SYNC_JOB_ID,
+    PRELOAD_JOB_ID,
+    BotScheduler,
+)
+
+from .common import FakeBotApi, FakeDisk
+from .test_mailing import TOKEN
+
+ROOT = Path(__file__).resolve().parent.parent
+
+CHECK_COLD_START = """
+import sys
+import main
+from app import bot, db
+
+assert not {"pandas", "numpy", "openpyxl"} & set(sys.modules), "heavy"
+assert db.get_db_engine.cache_info().currsize == 0, "engine"
+assert db.get_jobstore_engine.cache_info().currsize == 0, "jobstore"
+assert bot.get_dispatcher.cache_info().currsize == 0, "bot"
+"""
+
+
+def test_main_import_defers_heavy_modules_engines_and_bot():
+    result = subprocess.run(
+        [sys.executable, "-c", CHECK_COLD_START],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 0, result.stderr
+
+
+@pytest.fixture
+def app_dbs(tmp_path, monkeypatch):
+    """App and jobstore databases in a temporary directory."""
+    monkeypatch.setattr(settings, "BASE_DIR", tmp_path)
+    db.Session.remove()
+    getters = (db.get_db_engine, db.get_jobstore_engine)
+    for getter in (*getters, db.get_async_db_engine):
+        getter.cache_clear()
+    yield tmp_path
+    db.Session.remove()
+    for getter in getters:
+        if getter.cache_info().currsize:
+            getter().dispose()
+        getter.cache_clear()
+    db.get_async_db_engine.cache_clear()
+
+
+def test_bot_starts_up_and_shuts_down(app_dbs, monkeypatch):
+    api = FakeBotApi()
+    bot_scheduler = BotScheduler(timezone=settings.TIME_ZONE)
+    bot_scheduler.leading = False
+    elector = LeaderElector(
+        on_elected=bot_scheduler.lead, on_demoted=bot_scheduler.follow
+    )
+    monkeypatch.setattr(main, "disk", FakeDisk(b""))
+    monkeypatch.setattr(main, "Scheduler", bot_scheduler)
+    monkeypatch.setattr(scheduler, "Scheduler", bot_scheduler)
+    monkeypatch.setattr(main, "leader", elector)
+
+    async def sync():
+        return False
+
+    monkeypatch.setattr(main.clock, "sync", sync)
+
+    async def run():
+        async with TestServer(api.app) as server:
+            bot = Bot(
+                TOKEN,
+                server=TelegramAPIServer.from_base(str(server.make_url(""))),
+            )
+            try:
+                await main.on_startup(Dispatcher(bot))
+                started = (
+                    sorted(job.id for job in bot_scheduler.get_jobs()),
+                    elector.is_leader,
+                )
+                await main.on_shutdown(Dispatcher(bot))
+            finally:
+                await (await bot.get_session()).close()
+        return started
+
+    jobs, is_leader = asyncio.run(run())
+    assert jobs == sorted(
+        [PRELOAD_JOB_ID, MAILING_REFRESH_JOB_ID, MAILING_SYNC_JOB_ID]
+    )
+    assert is_leader and not elector.is_leader
+    assert not bot_scheduler.running
+    assert api.calls["setMyCommands"]
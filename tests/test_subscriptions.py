@@ -0,0 +1,246 @@
+import asyncio
+import datetime as dt
+from contextlib import asynccontextmanager
+
+import pytest
+from apscheduler.jobstores.memory import MemoryJobStore
+from apscheduler.schedulers.base import STATE_PAUSED
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import Session
+
+from app import file_parser, scheduler, settings
+from app.db import create_async_sqlite_engine, create_sqlite_engine
+from app.db.models import TelegramChat, utc_minute
+from app.scheduler import BotScheduler, mailing_job_id
+from app.utils import parse_mailing_schedule
+
+from .test_async_db import db_path  # noqa: F401
+from .test_models import explain_query_plan
+
+MORNING = dt.time(9, 0)
+EVENING = dt.time(18, 30)
+# Moscow time is UTC+3 all year round
+MORNING_UTC = 6 * 60
+EVENING_UTC = 15 * 60 + 30
+WINTER = dt.date(2023, 1, 10)
+SUMMER = dt.date(2023, 7, 10)
+
+
+@pytest.fixture
+def engine(db_path):
+    engine = create_sqlite_engine(f"sqlite:///{db_path}")
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def bot_scheduler(db_path, monkeypatch):
+    """Scheduler with in-memory jobstore and test subscriptions table."""
+
+    @asynccontextmanager
+    async def get_async_session():
+        engine = create_async_sqlite_engine(f"sqlite+aiosqlite:///{db_path}")
+        try:
+            async with async_sessionmaker(
+                engine, expire_on_commit=False
+            )() as session:
+                yield session
+        finally:
+            await engine.dispose()
+
+    monkeypatch.setattr(scheduler, "get_async_session", get_async_session)
+    monkeypatch.setattr(file_parser, "get_async_session", get_async_session)
+    return BotScheduler(jobstores={"default": MemoryJobStore()})
+
+
+def slot_ids(bot_scheduler: BotScheduler) -> list[str]:
+    return sorted(job.id for job in bot_scheduler.mailing_slots())
+
+
+def test_bulk_subscribe_and_unsubscribe(engine):
+    with Session(engine) as session:
+        assert TelegramChat.operations.subscribe(session, [1, 2, 2, 3]) == 3
+        TelegramChat.operations.subscribe(session, [3, 4], EVENING)
+        session.commit()
+
+        assert TelegramChat.queries.count(session) == 4
+        assert TelegramChat.queries.chat_ids(session, MORNING_UTC) == [1, 2]
+        assert TelegramChat.queries.chat_ids(session, EVENING_UTC) == [3, 4]
+        assert TelegramChat.queries.utc_minutes(session) == [
+            MORNING_UTC,
+            EVENING_UTC,
+        ]
+
+        assert TelegramChat.operations.unsubscribe(session, [1, 4, 5]) == 2
+        session.commit()
+        assert TelegramChat.queries.chat_ids(session) == [2, 3]
+
+
+@pytest.mark.parametrize(
+    "query, args",
+    [
+        (TelegramChat.queries.chat_ids, (MORNING_UTC,)),
+        (TelegramChat.queries.utc_minutes, ()),
+        (TelegramChat.operations.unsubscribe, ([1],)),
+    ],
+)
+def test_subscription_queries_use_indexes(engine, query, args):
+    with Session(engine) as session:
+        TelegramChat.operations.subscribe(session, range(100))
+        plan = explain_query_plan(session, query, *args)
+    assert "USING" in plan and "INDEX" in plan, plan
+
+
+@pytest.mark.parametrize(
+    "mailing_time, timezone, date, expected",
+    [
+        (MORNING, "Europe/Moscow", WINTER, MORNING_UTC),
+        (dt.time(1, 0), "Europe/Moscow", WINTER, 22 * 60),
+        (MORNING, "Europe/Berlin", WINTER, 8 * 60),
+        (MORNING, "Europe/Berlin", SUMMER, 7 * 60),
+        (dt.time(8, 30), "Asia/Kolkata", WINTER, 3 * 60),
+    ],
+)
+def test_utc_minute(mailing_time, timezone, date, expected):
+    assert utc_minute(mailing_time, timezone, date) == expected
+
+
+def test_utc_minutes_follow_daylight_saving_time(engine):
+    with Session(engine) as session:
+        TelegramChat.operations.subscribe(
+            session, [1], MORNING, "Europe/Berlin", WINTER
+        )
+        TelegramChat.operations.subscribe(session, [2], today=WINTER)
+        assert TelegramChat.operations.update_utc_minutes(session, WINTER) == 0
+        assert TelegramChat.operations.update_utc_minutes(session, SUMMER) == 1
+        assert TelegramChat.queries.chat_ids(session, 7 * 60) == [1]
+        assert TelegramChat.queries.chat_ids(session, MORNING_UTC) == [2]
+
+
+def test_subscribe_rejects_unknown_timezone(engine):
+    with Session(engine) as session, pytest.raises(KeyError):
+        TelegramChat.operations.subscribe(session, [1], MORNING, "Mars/Base")
+
+
+@pytest.mark.parametrize(
+    "args, expected",
+    [
+        ("", (settings.MAILING_TIME, settings.TIME_ZONE.zone)),
+        ("18:30", (EVENING, settings.TIME_ZONE.zone)),
+        ("Asia/Omsk 8:05", (dt.time(8, 5), "Asia/Omsk")),
+    ],
+)
+def test_parse_mailing_schedule(args, expected):
+    assert parse_mailing_schedule(args) == expected
+
+
+@pytest.mark.parametrize("args", ["25:00", "09:00 Mars/Base"])
+def test_parse_mailing_schedule_rejects_invalid_values(args):
+    with pytest.raises(ValueError):
+        parse_mailing_schedule(args)
+
+
+def test_chats_sharing_utc_minute_share_one_job(bot_scheduler):
+    async def run():
+        await bot_scheduler.subscribe_chats([1], dt.time(9), "Europe/Moscow")
+        # Samara is UTC+4 all year round
+        await bot_scheduler.subscribe_chats([2], dt.time(10), "Europe/Samara")
+
+    asyncio.run(run())
+    assert slot_ids(bot_scheduler) == [mailing_job_id(MORNING_UTC)]
+
+
+def test_scheduler_holds_one_job_per_mailing_time(bot_scheduler):
+    async def run():
+        await bot_scheduler.subscribe_chats(range(1000))
+        await bot_scheduler.subscribe_chats(range(1000, 1500), EVENING)
+        await bot_scheduler.subscribe_chats([1000], MORNING)
+
+    asyncio.run(run())
+
+    assert slot_ids(bot_scheduler) == [
+        mailing_job_id(MORNING_UTC),
+        mailing_job_id(EVENING_UTC),
+    ]
+    job = bot_scheduler.get_job(mailing_job_id(EVENING_UTC))
+    assert job.kwargs == {"bot_path": "app.bot:bot", "utc_minute": EVENING_UTC}
+    assert "hour='15', minute='30'" in str(job.trigger)
+    assert job.trigger.timezone.zone == "UTC"
+
+
+def test_unsubscribing_last_chat_removes_its_mailing_job(bot_scheduler):
+    async def run():
+        await bot_scheduler.subscribe_chats([1, 2])
+        await bot_scheduler.subscribe_chats([3], EVENING)
+        await bot_scheduler.unsubscribe_chats([3])
+
+    asyncio.run(run())
+    assert slot_ids(bot_scheduler) == [mailing_job_id(MORNING_UTC)]
+
+
+def test_slot_mailing_is_sent_to_slot_chats_only(bot_scheduler, monkeypatch):
+    mailings = []
+
+    async def dispatch_mailing(bot_path, chat_ids):
+        mailings.append(chat_ids)
+
+    monkeypatch.setattr(file_parser, "dispatch_mailing", dispatch_mailing)
+
+    async def run():
+        await bot_scheduler.subscribe_chats([1, 2])
+        await bot_scheduler.subscribe_chats([3], EVENING)
+        await file_parser.dispatch_slot_mailing("app.bot:bot", EVENING_UTC)
+
+    asyncio.run(run())
+    assert mailings == [[3]]
+
+
+def test_follower_saves_subscription_and_leader_schedules_its_job(
+    bot_scheduler, monkeypatch
+):
+    follower = BotScheduler(jobstores={"default": MemoryJobStore()})
+    follower.leading = False
+    monkeypatch.setattr(scheduler, "Scheduler", bot_scheduler)
+
+    async def run():
+        await follower.subscribe_chats([1], EVENING)
+        await scheduler.sync_mailing_slots()
+
+    asyncio.run(run())
+    assert follower.get_jobs() == []
+    assert slot_ids(bot_scheduler) == [mailing_job_id(EVENING_UTC)]
+
+
+def test_elected_scheduler_takes_over_jobs_and_steps_down(
+    bot_scheduler, monkeypatch
+):
+    bot_scheduler.leading = False
+    monkeypatch.setattr(scheduler, "Scheduler", bot_scheduler)
+
+    async def run():
+        bot_scheduler.start(paused=True)
+        await bot_scheduler.subscribe_chats([1], EVENING)
+        jobs_before = bot_scheduler.get_jobs()
+        bot_scheduler.lead()
+        # mailing slots are recomputed by the leader at once
+        for _ in range(100):
+            if slot_ids(bot_scheduler):
+                break
+            await asyncio.sleep(0.05)
+        jobs = sorted(job.id for job in bot_scheduler.get_jobs())
+        bot_scheduler.follow()
+        state = bot_scheduler.state
+        bot_scheduler.shutdown()
+        return jobs_before, jobs, state
+
+    jobs_before, jobs, state = asyncio.run(run())
+    assert jobs_before == []
+    assert jobs == sorted(
+        [
+            scheduler.PRELOAD_JOB_ID,
+            scheduler.MAILING_REFRESH_JOB_ID,
+            scheduler.MAILING_SYNC_JOB_ID,
+            mailing_job_id(EVENING_UTC),
+        ]
+    )
+    assert state == STATE_PAUSED and not bot_scheduler.leading
@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.file_parser import (
+    birthday_schema,
+    preprocess_pd_dataframe,
+    validate_df_row,
+)
+from app.validation import ValidationReport, compile_schema
+
+COLUMNS = ("Дата", "месяц", "ФИО")
+
+
+def legacy_preprocess(df: pd.DataFrame, schema: dict) -> list[tuple]:
+    for i in df.index:
+        if not validate_df_row(df.loc[i], schema):
+            df.drop(i, inplace=True)
+    return list(zip(*(getattr(df, col) for col in COLUMNS)))
+
+
+@pytest.fixture
+def messy_df():
+    return pd.DataFrame(
+        {
+            "Дата": [1, 0, 32, "?", 15, None, 31, 7, 3.0, True, np.nan],
+            "месяц": [
+                "январь",
+                "май",
+                "март",
+                "июль",
+                "?",
+                "июнь",
+                None,
+                5,
+                "май",
+                "май",
+                "май",
+            ],
+            "ФИО": [
+                "Иванов",
+                "Петров",
+                "Сидоров",
+                "Кузнецов",
+                "Попов",
+                "?",
+                "Васильев",
+                "Смирнов",
+                "",
+                "Новиков",
+                "Морозов",
+            ],
+        }
+    )
+
+
+def test_compiled_schema_keeps_same_rows_as_row_by_row_validation(messy_df):
+    expected = legacy_preprocess(messy_df.copy(), birthday_schema)
+    result = list(
+        preprocess_pd_dataframe(messy_df.copy(), birthday_schema, COLUMNS)
+    )
+    assert result == expected
+    assert [type(day) for day, *_ in result] == [
+        type(day) for day, *_ in expected
+    ]
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        {"Дата": [1, 12, 40], "месяц": ["май", "?", "май"]},
+        {"Дата": [1.0, 2.0], "месяц": [3, 4]},
+        {"Дата": [1, 2], "месяц": [3, 4]},
+        {"Дата": [], "месяц": []},
+    ],
+)
+def test_compiled_schema_matches_row_by_row_validation_for_any_dtypes(data):
+    df = pd.DataFrame(data)
+    expected = [
+        bool(validate_df_row(df.loc[i], birthday_schema)) for i in df.index
+    ]
+    valid, _ = compile_schema(birthday_schema).validate(df)
+    assert valid.tolist() == expected
+
+
+def test_compiled_schema_supports_call_condition():
+    schema = {"ФИО": {"cond": {"type": str, "call": (str.istitle, True)}}}
+    df = pd.DataFrame({"ФИО": ["Иванов", "петров", "Сидоров"]})
+    valid, report = compile_schema(schema).validate(df)
+    assert valid.tolist() == [True, False, True]
+    assert report.rejected == {"ФИО.type": 0, "ФИО.call": 1}
+
+
+def test_validation_report_counts_rows_rejected_by_first_failed_rule(
+    messy_df,
+):
+    valid, report = compile_schema(birthday_schema).validate(messy_df)
+    assert isinstance(report, ValidationReport)
+    assert report.total == len(messy_df)
+    assert report.valid == valid.sum()
+    assert report.rejected == {
+        "Дата.type": 4,
+        "Дата.gt": 0,
+        "Дата.lt": 1,
+        "месяц.type": 1,
+        "месяц.ne": 1,
+        "ФИО.type": 0,
+        "ФИО.ne": 1,
+    }
@@ -0,0 +1,132 @@
+import asyncio
+import time
+
+from aiogram import Bot, Dispatcher, types
+from aiogram.bot.api import TelegramAPIServer
+from aiohttp.test_utils import TestClient, TestServer
+
+from app import settings, webhook
+
+from .common import FakeBotApi
+from .test_mailing import TOKEN
+
+PATH = "/webhook/test"
+
+
+def message_update(update_id: int, chat_id: int, text: str) -> dict:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": {"id": chat_id, "is_bot": False, "first_name": "User"},
+            "text": text,
+        },
+    }
+
+
+def run_webhook(api: FakeBotApi, check, **hooks):
+    """
+    Serve echo bot with `create_webhook_app` and call `check`
+    with test client posting to the webhook. Like `main.py`,
+    application is created before its event loop runs.
+    """
+
+    async def echo(message: types.Message):
+        await message.answer(f"echo: {message.text}")
+
+    async def serve(app):
+        async with TestClient(TestServer(app)) as client:
+            return await check(client)
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    api_server = TestServer(api.app)
+    try:
+        loop.run_until_complete(api_server.start_server())
+        bot = Bot(
+            TOKEN,
+            server=TelegramAPIServer.from_base(str(api_server.make_url(""))),
+        )
+        dp = Dispatcher(bot)
+        dp.register_message_handler(echo)
+        app = webhook.create_webhook_app(dp, path=PATH, **hooks)
+        return loop.run_until_complete(serve(app))
+    finally:
+        loop.run_until_complete(api_server.close())
+        asyncio.set_event_loop(None)
+        loop.close()
+
+
+def test_webhook_serves_updates_between_startup_and_shutdown_hooks():
+    api = FakeBotApi()
+    events = []
+
+    async def on_startup(dp):
+        events.append("startup")
+
+    async def on_shutdown(dp):
+        events.append("shutdown")
+
+    async def check(client):
+        assert events == ["startup"]
+        responses = await asyncio.gather(
+            *(
+                client.post(PATH, json=message_update(i, i, f"hi {i}"))
+                for i in range(1, 21)
+            )
+        )
+        return [response.status for response in responses]
+
+    statuses = run_webhook(
+        api, check, on_startup=on_startup, on_shutdown=on_shutdown
+    )
+
+    assert statuses == [200] * 20
+    assert events == ["startup", "shutdown"]
+    for chat_id in range(1, 21):
+        assert [text for _, text in api.sent[chat_id]] == [
+            f"echo: hi {chat_id}"
+        ]
+
+
+def test_webhook_rejects_requests_without_secret_token(monkeypatch):
+    api = FakeBotApi()
+    monkeypatch.setattr(settings, "WEBHOOK_SECRET", "s3cret")
+
+    async def check(client):
+        update = message_update(1, 1, "hi")
+        forged = await client.post(PATH, json=update)
+        valid = await client.post(
+            PATH, json=update, headers={webhook.SECRET_HEADER: "s3cret"}
+        )
+        return forged.status, valid.status
+
+    assert run_webhook(api, check) == (401, 200)
+    assert [text for _, text in api.sent[1]] == ["echo: hi"]
+
+
+def test_webhook_is_registered_on_startup_and_removed_on_shutdown(
+    monkeypatch,
+):
+    api = FakeBotApi()
+    monkeypatch.setattr(settings, "WEBHOOK_HOST", "https://example.com/")
+    monkeypatch.setattr(settings, "WEBHOOK_SECRET", "s3cret")
+
+    async def check(client):
+        return list(api.calls)
+
+    calls = run_webhook(
+        api,
+        check,
+        on_startup=webhook.register_webhook,
+        on_shutdown=webhook.unregister_webhook,
+    )
+
+    assert calls == ["setWebhook"]
+    (registered,) = api.calls["setWebhook"]
+    assert registered["url"] == f"https://example.com{settings.WEBHOOK_PATH}"
+    assert registered["secret_token"] == "s3cret"
+    assert registered["drop_pending_updates"] == "True"
+    assert len(api.calls["deleteWebhook"]) == 1
@@ -0,0 +1,114 @@
+import io
+import math
+import random
+
+import pytest
+from openpyxl import Workbook
+
+from app import file_parser, settings
+from app.xlsx import cell_value, read_sheet_rows
+
+HEADER = ("№", "ФИО", "месяц", "Дата", "Примечание")
+
+
+def make_workbook(rows, header=HEADER) -> io.BytesIO:
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(header)
+    for row in rows:
+        sheet.append(row)
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    buffer.seek(0)
+    return buffer
+
+
+def read_both(rows, header=HEADER):
+    return [
+        file_parser.read_birthday_records(
+            make_workbook(rows, header), engine=engine
+        )
+        for engine in ("pandas", "openpyxl")
+    ]
+
+
+def test_engines_agree_on_messy_sheet():
+    rows = [
+        (1, " Иванова ", "Март", 8, None),
+        (2, "Петрова", " май ", 10.0, "ok"),
+        (3, "Сидорова", "май", 10.5, None),
+        (4, "?", "июнь", 1, None),
+        (5, "Кузнецова", "?", 2, None),
+        (6, "Смирнова", "июль", "?", None),
+        (),
+        (7, None, "август", 3, None),
+        (8, "Орлова", None, 4, None),
+        (9, "Волкова", "сентябрь", None, None),
+        (10, "NA", "октябрь", 5, None),
+        (11, "Зайцева", "ноябрь", 0, None),
+        (12, "Соколова", "декабрь", 32, None),
+        (13, 42, "февраль", 6, None),
+    ]
+
+    pandas_records, openpyxl_records = read_both(rows)
+
+    assert openpyxl_records == pandas_records
+    assert list(map(tuple, openpyxl_records)) == [
+        (8, "март", "Иванова"),
+        (10, "май", "Петрова"),
+        (0, "ноябрь", "Зайцева"),
+    ]
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_engines_agree_on_random_sheets(seed):
+    rng = random.Random(seed)
+    months = ["январь", "Февраль ", "март", "?", None]
+    days = [1, 15, 31, 40, 7.0, "?", None]
+    rows = [
+        (
+            i,
+            rng.choice([f"Партнер {i}", "?", None]),
+            rng.choice(months),
+            rng.choice(days),
+        )
+        for i in range(2000)
+    ]
+
+    pandas_records, openpyxl_records = read_both(rows, HEADER[:4])
+
+    assert openpyxl_records == pandas_records
+    assert len(openpyxl_records) > 100
+
+
+def test_openpyxl_engine_accepts_sheet_with_numbers_only_in_day_column():
+    # pandas reads such column as int64 and its values fail `type: int`
+    rows = [(1, "Иванова", "март", 8), (2, "Петрова", "май", 10)]
+
+    pandas_records, openpyxl_records = read_both(rows, HEADER[:4])
+
+    assert pandas_records == []
+    assert list(map(tuple, openpyxl_records)) == [
+        (8, "март", "Иванова"),
+        (10, "май", "Петрова"),
+    ]
+
+
+def test_missing_columns_are_read_as_nan():
+    sheet = make_workbook([("Иванова", 8)], header=("ФИО", "Дата"))
+
+    ((day, month, name),) = read_sheet_rows(sheet, settings.COLUMNS)
+
+    assert (day, name) == (8, "Иванова") and math.isnan(month)
+
+
+def test_cell_values_are_typed_like_pandas():
+    assert cell_value(8.0) == 8 and type(cell_value(8.0)) is int
+    assert cell_value(8.5) == 8.5
+    assert math.isnan(cell_value(None)) and math.isnan(cell_value("N/A"))
+    assert cell_value("?") == "?"
+
+
+def test_unknown_parse_engine_is_rejected():
+    with pytest.raises(ValueError):
+        file_parser.read_birthday_records(make_workbook([]), engine="xlrd")
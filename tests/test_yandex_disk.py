@@ -0,0 +1,149 @@
+import asyncio
+import hashlib
+import threading
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from yadisk_async.api import resources
+
+from app import yandex_disk
+from app.yandex_disk import PooledYaDisk, YaDiskFileSync
+
+from .common import FakeDisk
+
+CONTENTS = b"birthdays workbook"
+
+
+@pytest.fixture
+def output_file(tmp_path):
+    return (tmp_path / "temp.xlsx").as_posix()
+
+
+def test_file_fetch_downloads_file_into_memory_only(tmp_path):
+    disk, file_sync = FakeDisk(CONTENTS), YaDiskFileSync()
+    content = asyncio.run(file_sync.fetch("disk:/b.xlsx", disk))
+    assert content.open().read() == CONTENTS
+    assert content.md5 == hashlib.md5(CONTENTS).hexdigest()
+    assert not any(tmp_path.iterdir())
+
+
+def test_file_fetch_reuses_unchanged_content(output_file):
+    disk, file_sync = FakeDisk(CONTENTS), YaDiskFileSync()
+    first = asyncio.run(file_sync.fetch("disk:/b.xlsx", disk, output_file))
+    second = asyncio.run(file_sync.fetch("disk:/b.xlsx", disk, output_file))
+    assert first is second
+    assert disk.downloads == 1
+    assert (file_sync.hits, file_sync.misses) == (1, 1)
+
+
+def test_file_fetch_downloads_modified_file(output_file):
+    disk, file_sync = FakeDisk(CONTENTS), YaDiskFileSync()
+    asyncio.run(file_sync.fetch("disk:/b.xlsx", disk, output_file))
+    disk.contents = b"updated birthdays workbook"
+    content = asyncio.run(file_sync.fetch("disk:/b.xlsx", disk, output_file))
+    assert content.data == disk.contents
+    assert disk.downloads == 2
+    with open(output_file, "rb") as f:
+        assert f.read() == disk.contents
+
+
+def test_file_fetch_reads_up_to_date_fallback_copy_after_restart(
+    output_file,
+):
+    disk = FakeDisk(CONTENTS)
+    asyncio.run(YaDiskFileSync().fetch("disk:/b.xlsx", disk, output_file))
+    with open(output_file, "rb") as f:
+        assert f.read() == CONTENTS
+
+    content = asyncio.run(
+        YaDiskFileSync().fetch("disk:/b.xlsx", disk, output_file)
+    )
+    assert content.data == CONTENTS
+    assert disk.downloads == 1
+
+
+def test_file_fetch_does_file_io_outside_event_loop_thread(
+    output_file, monkeypatch
+):
+    threads = []
+
+    def write_file_atomically(path, data):
+        threads.append(threading.current_thread())
+        write(path, data)
+
+    def local_md5(self, path):
+        threads.append(threading.current_thread())
+        return md5(self, path)
+
+    write, md5 = yandex_disk.write_file_atomically, YaDiskFileSync.local_md5
+    monkeypatch.setattr(
+        yandex_disk, "write_file_atomically", write_file_atomically
+    )
+    monkeypatch.setattr(YaDiskFileSync, "local_md5", local_md5)
+
+    disk = FakeDisk(CONTENTS)
+    asyncio.run(YaDiskFileSync().fetch("disk:/b.xlsx", disk, output_file))
+    asyncio.run(YaDiskFileSync().fetch("disk:/b.xlsx", disk, output_file))
+
+    assert len(threads) == 3
+    assert threading.main_thread() not in threads
+
+
+async def get_meta_from_local_server(monkeypatch, disk, requests: int):
+    async def get_meta(request):
+        return web.json_response({"type": "file", "md5": "md5"})
+
+    app = web.Application()
+    app.router.add_get("/v1/disk/resources", get_meta)
+    async with TestServer(app) as server:
+        monkeypatch.setattr(
+            resources.GetMetaRequest,
+            "url",
+            str(server.make_url("/v1/disk/resources")),
+        )
+        await disk.start()
+        for _ in range(requests):
+            await disk.get_meta("disk:/b.xlsx", n_retries=0)
+        await disk.close()
+
+
+def test_pooled_yadisk_reuses_connections_between_requests(monkeypatch):
+    disk = PooledYaDisk(token="token")
+    asyncio.run(get_meta_from_local_server(monkeypatch, disk, 5))
+    assert disk.pool_stats.as_dict() == {
+        "requests": 5,
+        "connections_created": 1,
+        "connections_reused": 4,
+    }
+    assert not disk.is_open
+
+
+def test_pooled_yadisk_makes_new_session_after_token_update():
+    async def get_sessions():
+        disk = PooledYaDisk(token="old")
+        old_session = disk.get_session()
+        disk.token = "new"
+        new_session = disk.get_session()
+        await disk.close()
+        return old_session, new_session
+
+    old_session, new_session = asyncio.run(get_sessions())
+    assert old_session is not new_session
+    assert new_session.headers["Authorization"] == "OAuth new"
+
+
+def test_pooled_yadisk_closes_sessions_of_replaced_token():
+    async def get_sessions():
+        disk = PooledYaDisk(token="old")
+        old_session = disk.get_session()
+        disk.token = "new"
+        new_session = disk.get_session()
+        cached = list(disk._sessions.values())
+        pool_open = disk.is_open
+        await disk.close()
+        return old_session, new_session, cached, pool_open
+
+    old_session, new_session, cached, pool_open = asyncio.run(get_sessions())
+    assert old_session.closed and cached == [new_session]
+    assert pool_open